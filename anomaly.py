@@ -0,0 +1,326 @@
+import math
+import re
+import threading
+import time
+from collections import deque, namedtuple
+
+from instrumentation import counter, histogram
+from io_metrics import io_summary
+from sampler import get_sampler
+
+# Event kinds
+SPIKE = "spike"        # one sample far outside the recent distribution
+SHIFT = "shift"        # sustained level change (CUSUM over EWMA residuals)
+LEAK = "leak"          # steady upward drift in a memory stream
+FLATLINE = "flatline"  # a value stuck at exactly the same non-zero reading
+
+# `stream` names the series, e.g. "cpu", "gpu0.utilization" or
+# "process.python.1234.memory"; `score` is the statistic that fired (z-score,
+# CUSUM sum, relative growth per hour, or samples unchanged), negative for
+# downward spikes and shifts
+AnomalyEvent = namedtuple("AnomalyEvent", ["timestamp", "stream", "kind", "value", "score", "message"])
+
+DEFAULT_OPTIONS = {
+    "alpha": 0.05,            # EWMA weight for mean and variance (about a 20-sample window)
+    "warmup": 30,             # samples before spikes and shifts are reported
+    "z_threshold": 4.0,
+    "min_std": 0.5,           # noise floor, so near-constant streams do not spike on tiny moves
+    "cusum_drift": 0.5,
+    "cusum_threshold": 8.0,
+    "leak": False,
+    "leak_window": 1800.0,    # seconds; time constant of the regression's exponential decay
+    "leak_min_span": 600.0,   # seconds of history before a leak can be reported
+    "leak_growth": 0.05,      # relative growth per hour that counts as a leak (5%/h)
+    "leak_r2": 0.8,           # how linear the growth must be
+    "flatline": False,
+    "flatline_samples": 60,
+    "flatline_min": 1.0,      # values at or below this never count as stuck (idle is fine)
+    "cooldown": 300.0,        # seconds before the same stream reports the same kind again
+}
+
+
+def stream_options(stream):
+    """Per-stream overrides: leak tests on memory streams, stuck-value tests on GPU utilization."""
+    if stream.endswith("memory"):
+        return {"leak": True}
+    if stream.startswith("gpu") and stream.endswith("utilization"):
+        return {"flatline": True}
+    return {}
+
+
+# Per-device GPU streams and the gpu_summary() key the allocators threshold them by
+_GPU_STREAM = re.compile(r"^gpu\d+\.(utilization|memory)$")
+_GPU_THRESHOLDS = {"utilization": "gpu", "memory": "gpu_memory"}
+
+
+def threshold_key(stream):
+    """Admission threshold a stream counts against: "gpu0.memory" -> "gpu_memory", "cpu" -> "cpu"."""
+    match = _GPU_STREAM.match(stream)
+    return _GPU_THRESHOLDS[match.group(1)] if match else stream
+
+
+class StreamDetector:
+    """
+    O(1) anomaly state for one metric stream.
+
+    An EWMA mean and variance give each sample a z-score (spikes) and feed
+    two one-sided CUSUM sums of the standardized residuals (level shifts).
+    Memory streams also keep exponentially decayed sums for a weighted
+    linear regression of value over time (leaks). GPU utilization streams
+    count identical consecutive readings (flatlines). Nothing is buffered.
+    """
+
+    __slots__ = ("options", "count", "mean", "variance", "last", "cusum_high", "cusum_low", "origin",
+                 "first_seen", "last_seen", "sums", "flat_count", "reported")
+
+    def __init__(self, options):
+        self.options = options
+        self.count = 0
+        self.mean = None
+        self.variance = 0.0
+        self.last = None
+        self.cusum_high = 0.0
+        self.cusum_low = 0.0
+        self.origin = None
+        self.first_seen = None
+        self.last_seen = None
+        # Decayed regression sums: weight, t, y, tt, ty, yy
+        self.sums = [0.0] * 6
+        self.flat_count = 0
+        self.reported = {}
+
+    def _report(self, events, stream, kind, timestamp, value, score, message):
+        last = self.reported.get(kind)
+        if last is not None and timestamp - last < self.options["cooldown"]:
+            return
+        self.reported[kind] = timestamp
+        events.append(AnomalyEvent(timestamp, stream, kind, value, score, message))
+
+    def update(self, stream, value, timestamp, events):
+        """Fold in one sample; anomalies are appended to `events`."""
+        if value is None or value != value:
+            return
+        options = self.options
+        self.count += 1
+        if self.mean is None:
+            self.mean = self.last = value
+            self.origin = self.first_seen = self.last_seen = timestamp
+            self._regress(value, timestamp)
+            return
+        warmed_up = self.count > options["warmup"]
+
+        residual = value - self.mean
+        z = residual / max(math.sqrt(self.variance), options["min_std"])
+        if warmed_up and abs(z) >= options["z_threshold"]:
+            self._report(events, stream, SPIKE, timestamp, value, z,
+                         f"{stream} at {value:.1f} is {z:+.1f} sigma from its recent mean {self.mean:.1f}")
+
+        drift = options["cusum_drift"]
+        self.cusum_high = max(0.0, self.cusum_high + z - drift)
+        self.cusum_low = max(0.0, self.cusum_low - z - drift)
+        if warmed_up and max(self.cusum_high, self.cusum_low) >= options["cusum_threshold"]:
+            score = self.cusum_high if self.cusum_high >= self.cusum_low else -self.cusum_low
+            self._report(events, stream, SHIFT, timestamp, value, score,
+                         f"{stream} shifted {'up' if score > 0 else 'down'} from {self.mean:.1f} to around {value:.1f}")
+            self.cusum_high = self.cusum_low = 0.0
+
+        alpha = options["alpha"]
+        self.mean += alpha * residual
+        self.variance = (1 - alpha) * (self.variance + alpha * residual * residual)
+
+        if options["leak"]:
+            self._regress(value, timestamp)
+            self._check_leak(events, stream, value, timestamp)
+
+        if options["flatline"]:
+            if value == self.last and value > options["flatline_min"]:
+                self.flat_count += 1
+                if self.flat_count == options["flatline_samples"]:
+                    self._report(events, stream, FLATLINE, timestamp, value, self.flat_count,
+                                 f"{stream} stuck at {value:.1f} for {self.flat_count} samples")
+            else:
+                self.flat_count = 0
+
+        self.last = value
+        self.last_seen = timestamp
+
+    def _regress(self, value, timestamp):
+        sums = self.sums
+        t = timestamp - self.origin
+        elapsed = timestamp - (self.last_seen if self.last_seen is not None else timestamp)
+        decay = math.exp(-max(0.0, elapsed) / self.options["leak_window"])
+        for i, term in enumerate((1.0, t, value, t * t, t * value, value * value)):
+            sums[i] = sums[i] * decay + term
+
+    def _check_leak(self, events, stream, value, timestamp):
+        options = self.options
+        if timestamp - self.first_seen < options["leak_min_span"]:
+            return
+        weight, st, sy, stt, sty, syy = self.sums
+        mean_t, mean_y = st / weight, sy / weight
+        var_t = stt / weight - mean_t * mean_t
+        var_y = syy / weight - mean_y * mean_y
+        if var_t <= 0 or var_y <= 0:
+            return
+        cov = sty / weight - mean_t * mean_y
+        slope = cov / var_t
+        r2 = cov * cov / (var_t * var_y)
+        growth = slope * 3600 / max(abs(mean_y), 1e-9)
+        if growth >= options["leak_growth"] and r2 >= options["leak_r2"]:
+            self._report(events, stream, LEAK, timestamp, value, growth,
+                         f"{stream} growing {growth:.1%} per hour (r2 {r2:.2f}), now {value:.1f}")
+
+
+def snapshot_streams(snapshot):
+    """Flatten a Snapshot into {stream: value} for the host, each GPU, disk and NIC load and the busiest processes."""
+    streams = {"cpu": snapshot.cpu, "memory": snapshot.memory, "disk": snapshot.disk}
+    io = snapshot.extra.get("io")
+    if io is not None and io.interval is not None:
+        streams.update(io_summary(io))
+    for gpu in snapshot.extra.get("gpus") or ():
+        streams[f"gpu{gpu.index}.utilization"] = gpu.utilization
+        streams[f"gpu{gpu.index}.memory"] = gpu.memory_percent
+        streams[f"gpu{gpu.index}.temperature"] = gpu.temperature
+    processes = snapshot.extra.get("processes")
+    if processes is not None:
+        for stats in processes.by_cpu + processes.by_rss:
+            prefix = f"process.{stats.name}.{stats.pid}"
+            streams[f"{prefix}.cpu"] = stats.cpu
+            streams[f"{prefix}.memory"] = stats.memory_percent
+    return streams
+
+
+_events_total = {
+    kind: counter("monitor_anomaly_events_total", "Anomaly events by kind.", {"kind": kind})
+    for kind in (SPIKE, SHIFT, LEAK, FLATLINE)
+}
+_snapshot_seconds = histogram("monitor_anomaly_snapshot_seconds", "Time to run every stream detector on one snapshot.")
+
+
+class AnomalyDetector:
+    """
+    One StreamDetector per stream, created on first sight. Streams that stop
+    reporting (exited processes, removed GPUs) are dropped after
+    `stream_ttl` seconds. Events go to subscribers and a short `recent` log.
+    """
+
+    def __init__(self, options=None, stream_ttl=600.0, history=100):
+        self.options = dict(DEFAULT_OPTIONS, **(options or {}))
+        self.stream_ttl = stream_ttl
+        self.streams = {}
+        self.recent = deque(maxlen=history)
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._last_prune = None
+
+    def subscribe(self, callback):
+        # `callback(event)` runs on the thread that fed the sample
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def observe(self, values, timestamp):
+        """Feed {stream: value} for one instant; returns the events raised."""
+        events = []
+        for stream, value in values.items():
+            detector = self.streams.get(stream)
+            if detector is None:
+                detector = self.streams[stream] = StreamDetector(dict(self.options, **stream_options(stream)))
+            detector.update(stream, value, timestamp, events)
+
+        if self._last_prune is None or timestamp - self._last_prune >= self.stream_ttl / 10:
+            self._last_prune = timestamp
+            for stream in [s for s, d in self.streams.items() if timestamp - d.last_seen > self.stream_ttl]:
+                del self.streams[stream]
+
+        if events:
+            with self._lock:
+                self.recent.extend(events)
+                subscribers = list(self._subscribers)
+            for event in events:
+                _events_total[event.kind].inc()
+                for callback in subscribers:
+                    try:
+                        callback(event)
+                    except Exception as e:
+                        print(f"Anomaly subscriber {callback!r} failed: {e}")
+        return events
+
+    def on_snapshot(self, snapshot):
+        with _snapshot_seconds.time():
+            self.observe(snapshot_streams(snapshot), snapshot.timestamp)
+
+    def attach(self, sampler):
+        sampler.subscribe(self.on_snapshot)
+        return self
+
+    def active(self, since, kinds=None, prefix=None):
+        """Recent events newer than `since`, optionally filtered by kind and stream prefix."""
+        with self._lock:
+            events = list(self.recent)
+        return [
+            event for event in events
+            if event.timestamp >= since
+            and (kinds is None or event.kind in kinds)
+            and (prefix is None or event.stream.startswith(prefix))
+        ]
+
+
+_default_detector = None
+_default_lock = threading.Lock()
+
+
+def get_anomaly_detector():
+    """Process-wide detector attached to the shared sampler."""
+    global _default_detector
+    with _default_lock:
+        if _default_detector is None:
+            _default_detector = AnomalyDetector().attach(get_sampler())
+        return _default_detector
+
+
+def print_event(event):
+    print(f"Anomaly [{event.kind}] {event.message}")
+
+
+class AnomalyGuardPolicy:
+    """
+    Admission policy wrapper: defers while any thresholded host resource
+    had an upward anomaly (a spike, shift or leak by default) in the last
+    `hold` seconds, and otherwise asks `policy`. Per-device GPU streams
+    count against the "gpu" and "gpu_memory" thresholds (see threshold_key).
+    Load the scheduler started itself is not held against it: events within
+    `ramp_seconds` of an admission this policy allowed are ignored, and so
+    is every event while reservations for ramping tasks are outstanding.
+    Streams in `unguarded` (disk and network busy %, which burst all the
+    time) are only checked against their thresholds, never held on.
+    """
+
+    def __init__(self, policy, detector, hold=30.0, kinds=(SPIKE, SHIFT, LEAK), clock=None, ramp_seconds=15.0,
+                 unguarded=("disk_io", "net_io")):
+        self.policy = policy
+        self.detector = detector
+        self.hold = hold
+        self.kinds = kinds
+        self.clock = clock or time.time
+        self.ramp_seconds = ramp_seconds
+        self.unguarded = frozenset(unguarded)
+        self._admissions = deque()
+
+    def _after_admission(self, timestamp):
+        return any(0 <= timestamp - admitted <= self.ramp_seconds for admitted in self._admissions)
+
+    def admit(self, needs, resources, reserved, thresholds, idle):
+        now = self.clock()
+        while self._admissions and self._admissions[0] < now - self.hold - self.ramp_seconds:
+            self._admissions.popleft()
+        if not any(reserved.values()):
+            for event in self.detector.active(now - self.hold, self.kinds):
+                # Only upward moves on resources we schedule against hold tasks back
+                key = threshold_key(event.stream)
+                if (key in thresholds and key not in self.unguarded and event.score > 0
+                        and not self._after_admission(event.timestamp)):
+                    return False
+        admitted = self.policy.admit(needs, resources, reserved, thresholds, idle)
+        if admitted:
+            self._admissions.append(now)
+        return admitted
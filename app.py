@@ -1,53 +1,162 @@
-import streamlit as st
-import psutil
-import pynvml
+import os
 import time
+import streamlit as st
+from anomaly import get_anomaly_detector
+from cluster import Collector
+from gpu_metrics import get_gpu_collector
+from instrumentation import SelfUsage, start_metrics_server
+from io_metrics import get_io_collector, io_throughput
+from process_metrics import get_process_collector
+from sampler import get_sampler
 
-# Initialize NVIDIA NVML for GPU monitoring
-try:
-    pynvml.nvmlInit()
-    gpu_available = True
-except:
-    gpu_available = False
-    st.warning("No NVIDIA GPU detected. GPU stats will not be displayed.")
+# Host sampling cadence shared by all viewers (seconds)
+SAMPLE_INTERVAL = float(os.getenv("MONITOR_SAMPLE_INTERVAL", "0.5"))
+
+# One background sampler per process; every session reads its latest snapshot.
+# GPUs are enumerated once and read in the same tick as CPU and memory.
+@st.cache_resource
+def get_background_sampler():
+    sampler = get_sampler(interval=SAMPLE_INTERVAL)
+    sampler.interval = SAMPLE_INTERVAL
+    sampler.add_collector("gpus", get_gpu_collector())
+    sampler.add_collector("processes", get_process_collector())
+    sampler.add_collector("io", get_io_collector())
+    sampler.add_collector("monitor", SelfUsage())
+    return sampler.start()
+
+# The monitor's own metrics in Prometheus format on http://127.0.0.1:$MONITOR_METRICS_PORT/metrics
+@st.cache_resource
+def get_metrics_server():
+    try:
+        return start_metrics_server()
+    except OSError as e:
+        print(f"Metrics endpoint not started: {e}")
+        return None
+
+# Anomaly detection runs on every sampler tick, whether or not a page is open
+@st.cache_resource
+def get_detector():
+    get_background_sampler()
+    return get_anomaly_detector()
+
+# With MONITOR_COLLECTOR_PORT set, this app also collects from `python cluster.py agent` nodes
+COLLECTOR_PORT = os.getenv("MONITOR_COLLECTOR_PORT")
+
+@st.cache_resource
+def get_collector():
+    if not COLLECTOR_PORT:
+        return None
+    try:
+        return Collector(port=int(COLLECTOR_PORT)).start()
+    except OSError as e:
+        print(f"Cluster collector not started: {e}")
+        return None
 
-# Function to get GPU stats
-def get_gpu_stats():
-    if gpu_available:
-        handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-        gpu_utilization = pynvml.nvmlDeviceGetUtilizationRates(handle).gpu
-        memory_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-        return gpu_utilization, memory_info.used / memory_info.total * 100
-    return None, None
+sampler = get_background_sampler()
+detector = get_detector()
+get_metrics_server()
+collector = get_collector()
+gpu_available = get_gpu_collector().available
 
 # Streamlit UI
 st.title("Real-Time Resource Monitoring")
 
-# Metrics display
-cpu_usage_placeholder = st.empty()
-ram_usage_placeholder = st.empty()
-gpu_util_placeholder = st.empty()
-gpu_mem_placeholder = st.empty()
+refresh_interval = st.sidebar.slider(
+    "Refresh interval (seconds)", min_value=0.1, max_value=5.0, value=1.0, step=0.1
+)
 
-st.write("Monitoring system resources in real-time. Refreshes every second.")
+if not gpu_available:
+    st.warning("No NVIDIA GPU detected. GPU stats will not be displayed.")
 
-while True:
-    # Get CPU and RAM usage
-    cpu_usage = psutil.cpu_percent(interval=1)
-    memory = psutil.virtual_memory()
-    ram_usage = memory.percent
+st.write(f"Monitoring system resources in real-time. Refreshes every {refresh_interval:g} seconds.")
 
-    # Get GPU stats
-    gpu_util, gpu_mem = get_gpu_stats()
+# Only this fragment reruns on the timer; the rest of the page stays put
+@st.fragment(run_every=refresh_interval)
+def live_metrics():
+    snapshot = sampler.latest()
 
     # Update metrics
-    cpu_usage_placeholder.metric("CPU Usage", f"{cpu_usage}%")
-    ram_usage_placeholder.metric("RAM Usage", f"{ram_usage}%")
-    if gpu_available:
-        gpu_util_placeholder.metric("GPU Utilization", f"{gpu_util}%")
-        gpu_mem_placeholder.metric("GPU Memory Usage", f"{gpu_mem:.2f}%")
-    else:
-        st.info("GPU stats are not available on this system.")
-
-    # Wait for a short interval to refresh
-    time.sleep(1)
+    st.metric("CPU Usage", f"{snapshot.cpu}%")
+    st.metric("RAM Usage", f"{snapshot.memory}%")
+
+    # How much of the above is the monitor itself
+    own = snapshot.extra.get("monitor")
+    if own is not None:
+        st.caption(f"Monitor overhead: {own['cpu']:.2f}% CPU, {own['rss'] / 1024 ** 2:.0f} MB RSS")
+
+    # One row of metrics per GPU
+    for gpu in snapshot.extra.get("gpus") or ():
+        st.caption(f"GPU {gpu.index}: {gpu.name}")
+        util_col, mem_col, temp_col, power_col = st.columns(4)
+        util_col.metric("Utilization", f"{gpu.utilization}%")
+        mem_col.metric("Memory Usage", f"{gpu.memory_percent:.2f}%")
+        temp_col.metric("Temperature", f"{gpu.temperature}°C" if gpu.temperature is not None else "n/a")
+        power_col.metric("Power", f"{gpu.power_watts:.0f} W" if gpu.power_watts is not None else "n/a")
+
+    # Disk and network throughput, host-wide and per device
+    io = snapshot.extra.get("io")
+    if io is not None and io.interval is not None:
+        mb = 1024 ** 2
+        totals = io_throughput(io)
+        read_col, write_col, recv_col, sent_col = st.columns(4)
+        read_col.metric("Disk Read", f"{totals['disk_read'] / mb:.1f} MB/s")
+        write_col.metric("Disk Write", f"{totals['disk_write'] / mb:.1f} MB/s")
+        recv_col.metric("Net In", f"{totals['net_recv'] / mb:.1f} MB/s")
+        sent_col.metric("Net Out", f"{totals['net_sent'] / mb:.1f} MB/s")
+        disk_col, nic_col = st.columns(2)
+        disk_col.dataframe(
+            [{"Disk": d.device, "Read (MB/s)": round(d.read_bytes / mb, 2), "Write (MB/s)": round(d.write_bytes / mb, 2),
+              "IOPS": round(d.read_iops + d.write_iops), "Busy %": d.busy_percent,
+              "Latency (ms)": round(d.await_ms, 2) if d.await_ms is not None else None}
+             for d in io.disks],
+            hide_index=True, use_container_width=True,
+        )
+        nic_col.dataframe(
+            [{"NIC": n.device, "In (MB/s)": round(n.recv_bytes / mb, 2), "Out (MB/s)": round(n.sent_bytes / mb, 2),
+              "Packets/s": round(n.recv_packets + n.sent_packets), "Link %": n.percent}
+             for n in io.nics],
+            hide_index=True, use_container_width=True,
+        )
+
+    # Busiest processes (refreshed every few seconds by the process collector)
+    top = snapshot.extra.get("processes")
+    if top is not None:
+        st.caption(f"Top processes ({top.count} running)")
+        cpu_col, rss_col = st.columns(2)
+        cpu_col.dataframe(
+            [{"PID": p.pid, "Name": p.name, "CPU %": p.cpu} for p in top.by_cpu],
+            hide_index=True, use_container_width=True,
+        )
+        rss_col.dataframe(
+            [{"PID": p.pid, "Name": p.name, "RSS (MB)": round(p.rss / 1024 ** 2)} for p in top.by_rss],
+            hide_index=True, use_container_width=True,
+        )
+
+    # Latest readings from every agent node
+    if collector is not None:
+        nodes = collector.nodes()
+        st.caption(f"Cluster ({len(collector.fresh_nodes())} of {len(nodes)} nodes live)")
+        st.dataframe(
+            [
+                {"Node": n.node, "Seen (s ago)": round(snapshot.timestamp - n.last_seen, 1),
+                 "CPU %": n.latest["cpu"], "RAM %": n.latest["memory"], "GPU %": n.latest["gpu"],
+                 "GPU Mem %": n.latest["gpu_memory"]}
+                for n in nodes
+            ],
+            hide_index=True, use_container_width=True,
+        )
+
+    # Anomalies from the last ten minutes, newest first
+    events = detector.active(snapshot.timestamp - 600)
+    if events:
+        st.caption("Recent anomalies")
+        st.dataframe(
+            [
+                {"Time": time.strftime("%H:%M:%S", time.localtime(e.timestamp)), "Kind": e.kind,
+                 "Stream": e.stream, "Details": e.message}
+                for e in reversed(events)
+            ],
+            hide_index=True, use_container_width=True,
+        )
+
+live_metrics()
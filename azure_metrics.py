@@ -0,0 +1,223 @@
+import argparse
+import math
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from instrumentation import histogram
+
+DEFAULT_METRICS = ["Percentage CPU", "Network In", "Network Out"]
+
+_call_seconds = histogram("monitor_azure_metrics_call_seconds", "Latency of one Azure metrics.list call.")
+_fetch_seconds = histogram("monitor_azure_fetch_seconds", "Time for one fetch() across all requested VMs.")
+
+
+def vm_resource_id(subscription_id, resource_group, vm_name):
+    return (
+        f"/subscriptions/{subscription_id}/resourceGroups/{resource_group}"
+        f"/providers/Microsoft.Compute/virtualMachines/{vm_name}"
+    )
+
+
+def parse_vm_list(value, subscription_id, default_group=None):
+    """Resource ids from "group/vm,vm2,..." (bare names use `default_group`)."""
+    resource_ids = []
+    for entry in filter(None, (part.strip() for part in (value or "").split(","))):
+        group, _, vm_name = entry.rpartition("/")
+        resource_ids.append(vm_resource_id(subscription_id, group or default_group, vm_name))
+    return resource_ids
+
+
+class AzureMetricsFetcher:
+    """
+    Long-lived Azure Monitor metrics reader for many VMs.
+
+    The MonitorManagementClient is created on first use and reused for every
+    request. Resources are fetched in parallel on a thread pool. After the
+    initial window, each resource only asks for points from the newest
+    timestamp it already holds on; that point is asked for again and
+    replaced, since Azure reports the current interval as a partial average.
+    A resource fetched less than `cache_ttl` seconds ago is served from
+    memory without calling Azure at all, and concurrent fetch() calls share
+    one request per resource.
+    """
+
+    def __init__(self, subscription_id=None, credential=None, client=None, metric_names=DEFAULT_METRICS,
+                 interval="PT1M", initial_window=timedelta(hours=1), cache_ttl=60.0, max_workers=8,
+                 max_points=1440):
+        self.subscription_id = subscription_id
+        self.credential = credential
+        self.metric_names = list(metric_names)
+        self.interval = interval
+        self.initial_window = initial_window
+        self.cache_ttl = cache_ttl
+        self.max_points = max_points
+        self.last_fetch_seconds = None
+        self._client = client
+        self._series = {}
+        self._last_timestamp = {}
+        self._fetched_at = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="azure-metrics")
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from azure.mgmt.monitor import MonitorManagementClient
+
+                if self.credential is None:
+                    from azure.identity import DefaultAzureCredential
+
+                    self.credential = DefaultAzureCredential()
+                self._client = MonitorManagementClient(self.credential, self.subscription_id)
+            return self._client
+
+    def _fetch_one(self, resource_id):
+        # Only one fetch per resource runs at a time (see fetch), so `last` cannot move under us
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            last = self._last_timestamp.get(resource_id)
+        # Only the delta since the newest point we hold, which may have been partial
+        start = last if last else now - self.initial_window
+        client = self.client
+        with _call_seconds.time():
+            result = client.metrics.list(
+                resource_id=resource_id,
+                timespan=f"{start.isoformat()}/{now.isoformat()}",
+                interval=self.interval,
+                metricnames=",".join(self.metric_names),
+                aggregation="Average",
+            )
+
+        fresh = {}
+        newest = last
+        for item in result.value:
+            points = fresh.setdefault(item.name.value, [])
+            for timeseries in item.timeseries:
+                for data in timeseries.data:
+                    if data.average is None or (last is not None and data.time_stamp < last):
+                        continue
+                    points.append((data.time_stamp, data.average))
+                    if newest is None or data.time_stamp > newest:
+                        newest = data.time_stamp
+
+        with self._lock:
+            series = self._series.setdefault(resource_id, {})
+            for name, points in fresh.items():
+                held = series.setdefault(name, [])
+                # Replace what we held from `last` on (the partial point) with the new values
+                while held and last is not None and held[-1][0] >= last:
+                    held.pop()
+                held.extend(sorted(points))
+                del held[:-self.max_points]
+            self._last_timestamp[resource_id] = newest
+            self._fetched_at[resource_id] = time.monotonic()
+
+    def _finished(self, resource_id, future):
+        with self._lock:
+            if self._in_flight.get(resource_id) is future:
+                del self._in_flight[resource_id]
+
+    def fetch(self, resource_ids):
+        """
+        Return {resource_id: {metric: [(timestamp, average), ...]}} for every
+        resource, or {resource_id: {"error": message}} where a fetch failed.
+        """
+        began = time.perf_counter()
+        futures = {}
+        with self._lock:
+            now = time.monotonic()
+            for rid in resource_ids:
+                # Join a fetch another caller already started rather than sending a second one
+                future = self._in_flight.get(rid)
+                if future is None and now - self._fetched_at.get(rid, -math.inf) >= self.cache_ttl:
+                    future = self._in_flight[rid] = self._executor.submit(self._fetch_one, rid)
+                    future.add_done_callback(lambda done, rid=rid: self._finished(rid, done))
+                if future is not None:
+                    futures[rid] = future
+
+        results = {}
+        for resource_id in resource_ids:
+            future = futures.get(resource_id)
+            if future is not None and future.exception() is not None:
+                results[resource_id] = {"error": str(future.exception())}
+                continue
+            with self._lock:
+                series = self._series.get(resource_id, {})
+                results[resource_id] = {name: list(points) for name, points in series.items()}
+        self.last_fetch_seconds = time.perf_counter() - began
+        _fetch_seconds.observe(self.last_fetch_seconds)
+        return results
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+class _FakeMetrics:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def list(self, resource_id, timespan, interval="PT1M", metricnames="", aggregation="Average"):
+        owner = self.owner
+        time.sleep(owner.latency)
+        with owner.lock:
+            owner.calls += 1
+        start, end = (datetime.fromisoformat(part) for part in timespan.split("/"))
+        # Points on whole minutes within the timespan
+        first = start.replace(second=0, microsecond=0)
+        if first < start:
+            first += timedelta(minutes=1)
+        minutes = max(0, int((end - first).total_seconds() // 60) + 1)
+        seed = zlib.crc32(resource_id.encode()) % 1000
+
+        value = []
+        for name in filter(None, (part.strip() for part in metricnames.split(","))):
+            data = []
+            for i in range(minutes):
+                stamp = first + timedelta(minutes=i)
+                phase = (stamp.timestamp() / 60 + seed) / 30
+                average = 50 + 40 * math.sin(phase + zlib.crc32(name.encode()) % 7)
+                data.append(SimpleNamespace(time_stamp=stamp, average=average))
+            value.append(SimpleNamespace(name=SimpleNamespace(value=name), timeseries=[SimpleNamespace(data=data)]))
+        owner.points += sum(len(item.timeseries[0].data) for item in value)
+        return SimpleNamespace(value=value)
+
+
+class FakeMonitorClient:
+    """
+    In-process stand-in for MonitorManagementClient: `metrics.list` returns
+    deterministic per-minute points for the requested timespan after
+    `latency` seconds, and counts calls and points served.
+    """
+
+    def __init__(self, latency=0.1):
+        self.latency = latency
+        self.calls = 0
+        self.points = 0
+        self.lock = threading.Lock()
+        self.metrics = _FakeMetrics(self)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure metrics fetch latency against the fake Azure client.")
+    parser.add_argument("--vms", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.1, help="fake seconds per metrics.list call")
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    client = FakeMonitorClient(latency=args.latency)
+    resource_ids = [vm_resource_id("sub", f"group-{i % 5}", f"vm-{i}") for i in range(args.vms)]
+    fetcher = AzureMetricsFetcher(client=client, max_workers=args.workers, cache_ttl=0)
+    for label in ("initial window", "delta"):
+        points_before = client.points
+        fetcher.fetch(resource_ids)
+        print(f"{label}: {args.vms} VMs in {fetcher.last_fetch_seconds:.2f}s, {client.points - points_before} points")
+    fetcher.cache_ttl = 60
+    fetcher.fetch(resource_ids)
+    print(f"cached: {args.vms} VMs in {fetcher.last_fetch_seconds * 1000:.1f}ms, {client.calls} calls total")
+    fetcher.shutdown()
@@ -32,25 +32,42 @@
 #     # Wait for 1 second before the next update
 #     time.sleep(1)
 
-import psutil
+import functools
 import time
+from log_writer import BackgroundLogWriter, RESOURCE_LOG_FIELDS
+from sampler import get_sampler
 
-# Open a file to log the data
-with open("resource_log.txt", "a") as log_file:
-    while True:
-        # Gather stats
-        cpu_usage = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
-
-        # Format the data
-        log_entry = (
-            f"CPU: {cpu_usage}%, "
-            f"Memory: {memory.percent}%, "
-            f"Disk: {disk.percent}%\n"
-        )
-        print(log_entry.strip())  # Print to console
-        log_file.write(log_entry)  # Write to file
-
-        # Wait for 1 second before the next update
-        time.sleep(1)
+# Console output happens on the writer thread, off the sampling path
+def print_entry(record):
+    _, cpu_usage, memory_usage, disk_usage = record
+    print(f"CPU: {cpu_usage}%, Memory: {memory_usage}%, Disk: {disk_usage}%")
+
+# Timestamped records go to a rotating CSV log (10 MB per file, 5 backups,
+# each compressed into a .rma archive when rotated)
+def open_log(path="resource_log.csv"):
+    return BackgroundLogWriter(
+        path,
+        RESOURCE_LOG_FIELDS,
+        max_bytes=10 * 1024 * 1024,
+        when_full="drop",
+        echo=print_entry,
+        archive_rotated=True,
+    )
+
+# Queue each snapshot; never blocks the sampler
+def log_snapshot(log_writer, snapshot):
+    log_writer.write((round(snapshot.timestamp, 3), snapshot.cpu, snapshot.memory, snapshot.disk))
+
+if __name__ == "__main__":
+    log_writer = open_log()
+    sampler = get_sampler(interval=1.0)
+    sampler.subscribe(functools.partial(log_snapshot, log_writer))
+    sampler.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nMonitoring stopped by user.")
+    finally:
+        sampler.stop()
+        log_writer.close()
@@ -0,0 +1,366 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from anomaly import AnomalyDetector
+from downsample import downsample
+from instrumentation import Registry
+from io_metrics import IOCollector
+from llm_log_cache import LLM_LOG_FIELDS, LLMUsageLog
+from log_archive import compare_formats
+from log_writer import RESOURCE_LOG_FIELDS, BackgroundLogWriter
+from process_metrics import ProcessCollector
+from replay import Simulation, synthetic_trace, task_mix
+from rollups import RollupPipeline
+from sampler import ResourceSampler
+from scheduler import AdmissionScheduler, ThresholdPolicy
+from timeseries_store import TimeSeriesStore
+from workloads import workload_mix
+
+# Every benchmark returns a list of results:
+# {"name": ..., "value": ..., "unit": ..., "better": "lower" | "higher"}
+
+
+class PartialFailure(Exception):
+    """Raised by a benchmark that measured some of its results; the rest failed."""
+
+    def __init__(self, message, results):
+        super().__init__(message)
+        self.results = results
+
+
+def _result(name, value, unit, better="lower"):
+    return {"name": name, "value": value, "unit": unit, "better": better}
+
+
+def _latencies(name, seconds):
+    milliseconds = sorted(s * 1000 for s in seconds)
+    return [
+        _result(f"{name}.p50", statistics.median(milliseconds), "ms"),
+        _result(f"{name}.p95", milliseconds[int(len(milliseconds) * 0.95) - 1], "ms"),
+    ]
+
+
+def _timed(fn, repeat):
+    seconds = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - began)
+    return seconds
+
+
+def bench_sampler(scale, workdir):
+    """Cost of one sampling tick, with the I/O and process collectors, and of a cached read."""
+    repeat = 200 * scale
+    sampler = ResourceSampler(interval=1.0)
+    results = _latencies("sampler.tick", _timed(sampler.sample, repeat))
+
+    io_sampler = ResourceSampler(interval=1.0)
+    io_sampler.add_collector("io", IOCollector())
+    results += _latencies("sampler.tick_with_io", _timed(io_sampler.sample, repeat))
+
+    sampler.add_collector("processes", ProcessCollector(min_interval=0))
+    results += _latencies("sampler.tick_with_processes", _timed(sampler.sample, repeat // 4))
+
+    sampler = ResourceSampler(interval=60.0)
+    sampler.sample()
+    results += _latencies("sampler.cached_latest", _timed(sampler.latest, repeat * 10))
+    return results
+
+
+def bench_log_writer(scale, workdir):
+    """Records per second through the background CSV writer, including the final flush."""
+    count = 100_000 * scale
+    writer = BackgroundLogWriter(os.path.join(workdir, "resource_log.csv"), RESOURCE_LOG_FIELDS, when_full="block")
+    began = time.perf_counter()
+    for i in range(count):
+        writer.write([1_700_000_000 + i, 12.5, 40.1, 55.0])
+    writer.close()
+    elapsed = time.perf_counter() - began
+    return [_result("log_writer.throughput", count / elapsed, "records/s", "higher")]
+
+
+def bench_usage_log(scale, workdir):
+    """Cold parse of the LLM usage log, then an incremental load after an append."""
+    rows = 50_000 * scale
+    path = os.path.join(workdir, "llm_usage_logs.csv")
+    with open(path, "w") as f:
+        f.write(",".join(LLM_LOG_FIELDS) + "\n")
+        for i in range(rows):
+            f.write(f"2024-01-01 00:00:00,{100 + i % 900},{60 + i % 300},{0.0002 * (i % 50):.4f},{40 + i % 600},gpt-4\n")
+
+    log = LLMUsageLog(path)
+    cold = _timed(log.load, 1)[0]
+    with open(path, "a") as f:
+        for i in range(100):
+            f.write(f"2024-01-02 00:00:00,{200 + i},{120 + i},0.0040,{80},gpt-3.5-turbo\n")
+    incremental = _timed(log.load, 1)[0]
+    unchanged = _timed(log.load, 100)
+    return [
+        _result("usage_log.cold_load", cold * 1000, "ms"),
+        _result("usage_log.incremental_load", incremental * 1000, "ms"),
+        _result("usage_log.unchanged_load", statistics.median(unchanged) * 1000, "ms"),
+    ]
+
+
+def bench_store(scale, workdir):
+    """Binary time-series store: batched append throughput and a full-range query."""
+    count = 1_000_000 * scale
+    store = TimeSeriesStore(os.path.join(workdir, "store"))
+    timestamps = 1_700_000_000 + np.arange(count, dtype=np.float64)
+    values = {name: np.linspace(0, 100, count) for name in store.columns}
+    began = time.perf_counter()
+    for start in range(0, count, 100_000):
+        store.append_many(timestamps[start:start + 100_000], {k: v[start:start + 100_000] for k, v in values.items()})
+    append = time.perf_counter() - began
+    query = _timed(lambda: store.query(timestamps[0], timestamps[-1], ["cpu"]), 5)
+    return [
+        _result("store.append_throughput", count / append, "records/s", "higher"),
+        _result("store.full_query", statistics.median(query) * 1000, "ms"),
+    ]
+
+
+def bench_rollups(scale, workdir):
+    """Per-sample cost of the raw + rollup ingest path."""
+    count = 20_000 * scale
+    pipeline = RollupPipeline(os.path.join(workdir, "rollups"))
+    began = time.perf_counter()
+    for i in range(count):
+        pipeline.add(1_700_000_000 + i, {"cpu": i % 100, "memory": 50.0, "disk": 20.0})
+    pipeline.flush()
+    elapsed = time.perf_counter() - began
+    return [_result("rollups.add", elapsed / count * 1e6, "us/sample")]
+
+
+def bench_scheduler(scale, workdir):
+    """Queue-drain time and throughput for a synthetic workload mix."""
+    workers = 4
+    tasks = workload_mix(
+        8 * scale,
+        cpu={"duration": 0.5},
+        memory={"megabytes": 32, "hold": 0.5},
+        io={"megabytes": 16, "directory": workdir},
+    )
+    sampler = ResourceSampler(interval=0.1)
+    # Thresholds well above any host load: this measures scheduling overhead, not admission
+    scheduler = AdmissionScheduler(
+        thresholds={"cpu": 1000, "memory": 1000}, max_workers=workers, sampler=sampler,
+        executor=ThreadPoolExecutor(max_workers=workers), policy=ThresholdPolicy(),
+    )
+    for task_id, target, needs in tasks:
+        scheduler.submit(task_id, target, needs=needs)
+    began = time.perf_counter()
+    completed = scheduler.run()
+    elapsed = time.perf_counter() - began
+    scheduler.shutdown()
+    return [
+        _result("scheduler.drain", elapsed, "s"),
+        _result("scheduler.tasks_per_second", len(completed) / elapsed, "tasks/s", "higher"),
+    ]
+
+
+def bench_instrumentation(scale, workdir):
+    """Hot-path cost of recording a histogram observation and a counter increment."""
+    count = 200_000 * scale
+    registry = Registry()
+    hist = registry.histogram("bench_seconds")
+    total = registry.counter("bench_total")
+    observe = _timed(lambda: [hist.observe(0.001) for _ in range(count)], 1)[0]
+    increment = _timed(lambda: [total.inc() for _ in range(count)], 1)[0]
+    return [
+        _result("instrumentation.observe", observe / count * 1e9, "ns"),
+        _result("instrumentation.inc", increment / count * 1e9, "ns"),
+    ]
+
+
+def bench_anomaly(scale, workdir):
+    """Cost of running every stream detector on one sample of 500 streams."""
+    repeat = 200 * scale
+    detector = AnomalyDetector()
+    streams = [f"process.worker.{i}.{'memory' if i % 2 else 'cpu'}" for i in range(500)]
+    ticks = iter(range(repeat * 2))
+
+    def observe():
+        tick = next(ticks)
+        detector.observe({stream: 50.0 + (tick * i) % 7 for i, stream in enumerate(streams)}, 1_700_000_000 + tick)
+
+    _timed(observe, repeat)  # warm up past the detectors' first samples
+    return _latencies("anomaly.observe_500", _timed(observe, repeat))
+
+
+def bench_archive(scale, workdir):
+    """Compression ratio and full decode time of log archives vs parsing the CSV."""
+    results = []
+    for entry in compare_formats(rows=20_000 * scale):
+        name = f"archive.{entry['log'].split('.')[0]}"
+        results += [
+            _result(f"{name}.ratio", entry["csv_bytes"] / entry["archive_bytes"], "x", "higher"),
+            _result(f"{name}.decode", entry["decode_seconds"] * 1000, "ms"),
+            _result(f"{name}.csv_parse", entry["csv_parse_seconds"] * 1000, "ms"),
+        ]
+    return results
+
+
+def bench_downsample(scale, workdir):
+    """Reducing a million-point series to an 800-pixel chart with LTTB and per-pixel min/max."""
+    rng = np.random.default_rng(0)
+    y = np.cumsum(rng.normal(size=1_000_000 * scale))
+    x = np.arange(len(y), dtype=np.float64)
+    return [
+        _result(f"downsample.{method}", min(_timed(lambda: downsample(x, y, 800, method), 5)) * 1000, "ms")
+        for method in ("lttb", "minmax")
+    ]
+
+
+def bench_replay(scale, workdir):
+    """Virtual seconds simulated per wall second when replaying a trace through the scheduler."""
+    simulation = Simulation(synthetic_trace(hours=6 * scale), task_mix(50 * scale), policy="forecast")
+    report = simulation.run()
+    return [_result("replay.speedup", report["simulated_seconds"] / report["wall_seconds"], "x", "higher")]
+
+
+def bench_startup(scale, workdir):
+    """Cold import and first-render latency (see startup_benchmark.py)."""
+    from startup_benchmark import run_benchmark
+
+    results, errors = [], []
+    for entry in run_benchmark(repeat=scale):
+        name = f"startup.{entry['kind']}.{entry['target']}"
+        if "error" in entry:
+            errors.append(f"{name}: {entry['error']}")
+        else:
+            results.append(_result(name, entry["seconds"] * 1000, "ms"))
+    if errors:
+        raise PartialFailure("; ".join(errors), results)
+    return results
+
+
+BENCHMARKS = {
+    "sampler": bench_sampler,
+    "log_writer": bench_log_writer,
+    "usage_log": bench_usage_log,
+    "store": bench_store,
+    "rollups": bench_rollups,
+    "scheduler": bench_scheduler,
+    "instrumentation": bench_instrumentation,
+    "anomaly": bench_anomaly,
+    "archive": bench_archive,
+    "downsample": bench_downsample,
+    "replay": bench_replay,
+    "startup": bench_startup,
+}
+
+
+def _revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(names=None, scale=1):
+    """Run the named benchmarks (all by default) in a scratch directory."""
+    report = {
+        "revision": _revision(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "scale": scale,
+        "benchmarks": list(names or BENCHMARKS),
+        "results": [],
+        # Benchmark name -> error, for benchmarks that raised
+        "failures": {},
+    }
+    workdir = tempfile.mkdtemp(prefix="monitor-bench-")
+    try:
+        for name in names or BENCHMARKS:
+            try:
+                # Keep progress messages (scheduler output, ...) off stdout, which may carry the report
+                with contextlib.redirect_stdout(sys.stderr):
+                    report["results"] += BENCHMARKS[name](scale, workdir)
+            except PartialFailure as e:
+                report["results"] += e.results
+                report["failures"][name] = str(e)
+                print(f"Benchmark {name} failed in part: {e}", file=sys.stderr)
+            except Exception as e:
+                report["failures"][name] = repr(e)
+                print(f"Benchmark {name} failed: {e!r}", file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def compare(report, baseline, tolerance=0.2):
+    """
+    Results that got worse than `baseline` by more than `tolerance` (a
+    fraction), and baseline results of the benchmarks that ran (result names
+    start with the benchmark's) that the report no longer has.
+    """
+    previous = {result["name"]: result for result in baseline["results"]}
+    current = {result["name"] for result in report["results"]}
+    ran = set(report.get("benchmarks") or BENCHMARKS)
+    regressions = [
+        f"{name}: missing from this run" for name in previous
+        if name not in current and name.split(".")[0] in ran
+    ]
+    for result in report["results"]:
+        before = previous.get(result["name"])
+        if before is None or not before["value"]:
+            continue
+        change = (result["value"] - before["value"]) / before["value"]
+        if result["better"] == "higher":
+            change = -change
+        if change > tolerance:
+            regressions.append(f"{result['name']}: {before['value']:.4g} -> {result['value']:.4g} {result['unit']}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the monitor's benchmark suite.")
+    parser.add_argument("benchmarks", nargs="*",
+                        help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all but startup)")
+    parser.add_argument("--scale", type=int, default=1, help="multiply workload sizes")
+    parser.add_argument("--output", default=None, help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", default=None, help="baseline JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    names = args.benchmarks or [name for name in BENCHMARKS if name != "startup"]
+    report = run_suite(names, args.scale)
+    for result in report["results"]:
+        print(f"{result['name']:40} {result['value']:>14.4g} {result['unit']}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+    if report["failures"]:
+        sys.exit(1)
@@ -0,0 +1,681 @@
+import argparse
+import math
+import selectors
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import weakref
+from collections import deque, namedtuple
+
+from gpu_metrics import gpu_summary
+from instrumentation import counter, gauge, histogram
+from ring_buffer import RingBuffer
+from sampler import get_sampler
+
+# Columns every agent sends and the collector keeps per node
+CLUSTER_COLUMNS = ["cpu", "memory", "disk", "gpu", "gpu_memory"]
+DEFAULT_PORT = 9109
+
+# Frame layout (little-endian):
+#   header    magic "RF", version (B), flags (B), sequence (I), sample count (H),
+#             node name length (B), node name
+#   keyframe  column names, NUL-separated, prefixed by their byte length (H)
+#   samples   timestamp in milliseconds, then every column in hundredths of a
+#             percent, as zigzag varints. The first sample of a keyframe is
+#             absolute; every other sample is a delta from the sample before
+#             it, including the last sample of the previous frame.
+# Over TCP each frame is preceded by its length (H); over UDP a frame is one datagram.
+MAGIC = b"RF"
+VERSION = 1
+FLAG_KEYFRAME = 1
+SCALE = 100
+_HEADER = struct.Struct("<2sBBIHB")
+_LENGTH = struct.Struct("<H")
+
+FrameHeader = namedtuple("FrameHeader", ["node", "keyframe", "sequence", "count", "offset"])
+
+
+def _put_varint(out, value):
+    # Zigzag first, so small negative deltas stay small
+    value = value * 2 if value >= 0 else -value * 2 - 1
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _get_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return (value >> 1) ^ -(value & 1), pos
+        shift += 7
+
+
+def snapshot_readings(snapshot):
+    """The cluster columns of one sampler Snapshot (busiest GPU, 0 without GPUs)."""
+    return {
+        "cpu": snapshot.cpu,
+        "memory": snapshot.memory,
+        "disk": snapshot.disk,
+        **gpu_summary(snapshot.extra.get("gpus")),
+    }
+
+
+class FrameEncoder:
+    """
+    Packs batches of samples from one node into delta-encoded frames. A
+    keyframe (absolute values plus the column names) goes out every
+    `keyframe_interval` frames and after reset(), so a collector that missed
+    a frame or restarted is back in sync within that many frames.
+    """
+
+    def __init__(self, node, columns=CLUSTER_COLUMNS, keyframe_interval=30):
+        self.node = node.encode()[:255]
+        self.columns = list(columns)
+        self.keyframe_interval = keyframe_interval
+        self.sequence = 0
+        self._previous = None
+        # Frames sent since (and including) the last keyframe
+        self._since_keyframe = keyframe_interval
+
+    def reset(self):
+        """Make the next frame a keyframe (e.g. after reconnecting)."""
+        self._since_keyframe = self.keyframe_interval
+
+    def encode(self, samples):
+        """`samples` is a list of (timestamp, {column: value}); returns the frame bytes."""
+        keyframe = self._since_keyframe >= self.keyframe_interval
+        out = bytearray(_HEADER.pack(MAGIC, VERSION, FLAG_KEYFRAME if keyframe else 0,
+                                     self.sequence, len(samples), len(self.node)))
+        out += self.node
+        previous = None
+        if keyframe:
+            names = "\0".join(self.columns).encode()
+            out += _LENGTH.pack(len(names)) + names
+        else:
+            previous = self._previous
+        for timestamp, readings in samples:
+            current = [round(timestamp * 1000)] + [round((readings.get(name) or 0.0) * SCALE) for name in self.columns]
+            if previous is None:
+                for value in current:
+                    _put_varint(out, value)
+            else:
+                for value, before in zip(current, previous):
+                    _put_varint(out, value - before)
+            previous = current
+        self._previous = previous
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        self._since_keyframe = 1 if keyframe else self._since_keyframe + 1
+        return bytes(out)
+
+
+def read_header(frame):
+    magic, version, flags, sequence, count, name_length = _HEADER.unpack_from(frame)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} frame")
+    offset = _HEADER.size + name_length
+    if offset > len(frame):
+        raise ValueError("truncated frame header")
+    node = frame[_HEADER.size:offset].decode(errors="replace")
+    return FrameHeader(node, bool(flags & FLAG_KEYFRAME), sequence, count, offset)
+
+
+class FrameDecoder:
+    """
+    Per-node decoding state. Delta frames are only accepted in sequence
+    after a keyframe; after a gap (a lost or reordered UDP datagram) they
+    are rejected until the next keyframe.
+    """
+
+    def __init__(self):
+        self.columns = None
+        self._previous = None
+        self._expected = None
+
+    def decode(self, header, frame):
+        """Samples as (timestamp, [value per column]), or None if the frame cannot be applied."""
+        pos = header.offset
+        if header.keyframe:
+            (length,) = _LENGTH.unpack_from(frame, pos)
+            pos += _LENGTH.size
+            self.columns = frame[pos:pos + length].decode().split("\0")
+            pos += length
+            previous = None
+        elif header.sequence != self._expected:
+            self._expected = None
+            return None
+        else:
+            previous = self._previous
+
+        width = len(self.columns) + 1
+        samples = []
+        for _ in range(header.count):
+            current = []
+            for i in range(width):
+                value, pos = _get_varint(frame, pos)
+                current.append(value if previous is None else previous[i] + value)
+            samples.append((current[0] / 1000, [value / SCALE for value in current[1:]]))
+            previous = current
+        self._previous = previous
+        self._expected = (header.sequence + 1) & 0xFFFFFFFF
+        return samples
+
+
+_agent_frames = counter("monitor_agent_frames_sent_total", "Frames sent to the collector.")
+_agent_bytes = counter("monitor_agent_bytes_sent_total", "Frame bytes sent to the collector.")
+_agent_dropped = counter("monitor_agent_samples_dropped_total", "Samples dropped before they could be sent.")
+
+
+class Agent:
+    """
+    Streams this host's sampler snapshots to a collector over TCP or UDP.
+
+    Snapshots are queued by the sampler subscriber and sent by a background
+    thread, which packs everything queued (up to `max_batch` samples) into
+    one frame. At 1 Hz that is one small frame per tick; when the network or
+    collector falls behind, the backlog goes out in fewer, larger frames.
+    `batch_interval` batches on purpose by pausing between frames. If the
+    collector is unreachable, up to `max_pending` samples are kept (oldest
+    dropped first) and sending resumes with a keyframe on reconnect.
+    """
+
+    def __init__(self, address, node=None, transport="tcp", keyframe_interval=30, max_batch=32,
+                 batch_interval=0.0, max_pending=3600, retry_delay=2.0):
+        if transport not in ("tcp", "udp"):
+            raise ValueError(f"transport must be 'tcp' or 'udp', not {transport!r}")
+        self.address = address
+        self.node = node or socket.gethostname()
+        self.transport = transport
+        self.max_batch = max_batch
+        self.batch_interval = batch_interval
+        self.retry_delay = retry_delay
+        self.encoder = FrameEncoder(self.node, keyframe_interval=keyframe_interval)
+        self._pending = deque(maxlen=max_pending)
+        self._cond = threading.Condition()
+        self._socket = None
+        self._running = False
+        self._thread = None
+        self._unreachable = False
+
+    def attach(self, sampler):
+        sampler.subscribe(self.on_snapshot)
+        return self
+
+    def on_snapshot(self, snapshot):
+        self.push(snapshot.timestamp, snapshot_readings(snapshot))
+
+    def push(self, timestamp, readings):
+        with self._cond:
+            if len(self._pending) == self._pending.maxlen:
+                _agent_dropped.inc()
+            self._pending.append((timestamp, readings))
+            self._cond.notify()
+
+    def _connect(self):
+        host, port = self.address
+        if self.transport == "tcp":
+            sock = socket.create_connection((host, port), timeout=5.0)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            family, kind, proto, _, target = socket.getaddrinfo(host, port, type=socket.SOCK_DGRAM)[0]
+            sock = socket.socket(family, kind, proto)
+            sock.connect(target)
+        self.encoder.reset()
+        return sock
+
+    def _send(self, batch):
+        if self._socket is None:
+            self._socket = self._connect()
+        frame = self.encoder.encode(batch)
+        if self.transport == "tcp":
+            self._socket.sendall(_LENGTH.pack(len(frame)) + frame)
+        else:
+            self._socket.send(frame)
+        _agent_frames.inc()
+        _agent_bytes.inc(len(frame))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                batch = [self._pending.popleft() for _ in range(min(len(self._pending), self.max_batch))]
+            try:
+                self._send(batch)
+            except OSError as e:
+                if not self._unreachable:
+                    print(f"Agent {self.node}: cannot reach collector at {self.address[0]}:{self.address[1]}: {e}")
+                    self._unreachable = True
+                if self._socket is not None:
+                    self._socket.close()
+                    self._socket = None
+                if self.transport == "tcp":
+                    # Keep the batch for the next connection; a UDP collector that is down just misses it
+                    with self._cond:
+                        self._pending.extendleft(reversed(batch))
+                time.sleep(self.retry_delay)
+                continue
+            if self._unreachable:
+                print(f"Agent {self.node}: reconnected to collector")
+                self._unreachable = False
+            if self.batch_interval:
+                time.sleep(self.batch_interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="cluster-agent", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+_frames_total = {
+    transport: counter("monitor_cluster_frames_total", "Frames received by the collector.", {"transport": transport})
+    for transport in ("tcp", "udp")
+}
+_bytes_total = counter("monitor_cluster_bytes_total", "Frame bytes received by the collector.")
+_samples_total = counter("monitor_cluster_samples_total", "Samples merged into node series.")
+_frames_dropped = {
+    reason: counter("monitor_cluster_frames_dropped_total", "Frames the collector could not apply.", {"reason": reason})
+    for reason in ("malformed", "out_of_sync")
+}
+_ingest_seconds = histogram("monitor_cluster_ingest_seconds", "Time to decode and store one frame.")
+_callback_errors = counter("monitor_cluster_callback_errors_total", "Socket handlers that raised in the collector loop.")
+
+# Started collectors; the node gauge sums them without keeping a stopped one alive
+_collectors = weakref.WeakSet()
+_collectors_lock = threading.Lock()
+
+
+def _fresh_node_count():
+    with _collectors_lock:
+        collectors = list(_collectors)
+    return sum(len(collector.fresh_nodes()) for collector in collectors)
+
+
+gauge("monitor_cluster_nodes", "Nodes heard from within the staleness window.", fn=_fresh_node_count)
+
+NodeStatus = namedtuple("NodeStatus", ["node", "address", "transport", "last_seen", "frames", "samples", "latest"])
+
+
+class _Node:
+    def __init__(self, name, columns, history):
+        self.name = name
+        self.decoder = FrameDecoder()
+        self.mapping = None
+        self.mapped_columns = None
+        # Column 0 is the timestamp
+        self.buffer = RingBuffer(history, columns=len(columns) + 1)
+        self.address = None
+        self.transport = None
+        self.last_seen = None
+        self.frames = 0
+        self.samples = 0
+
+
+class Collector:
+    """
+    Receives agent frames on one port (TCP and UDP) and merges them into a
+    RingBuffer per node holding the last `history` samples.
+
+    A single thread multiplexes the listening sockets and every agent
+    connection with `selectors`, so hundreds of 1 Hz agents cost a small
+    share of one core. A handler that raises only costs the connection it
+    was serving. Queries copy out of the buffers under a lock and are safe
+    from any thread. Nodes not heard from for `stale_after` seconds are
+    kept but left out of fresh_nodes() and least_loaded().
+    """
+
+    def __init__(self, host="0.0.0.0", port=DEFAULT_PORT, history=3600, columns=CLUSTER_COLUMNS, stale_after=10.0):
+        self.host = host
+        self.port = port
+        self.history = history
+        self.columns = list(columns)
+        self.stale_after = stale_after
+        self.cpu_seconds = 0.0
+        self._nodes = {}
+        self._buffers = {}
+        self._peers = {}
+        self._lock = threading.Lock()
+        self._selector = None
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.host, self.port))
+        # Port 0 picks a free port; UDP then shares the same number
+        self.port = listener.getsockname()[1]
+        listener.listen(1024)
+        listener.setblocking(False)
+        datagrams = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # Agents on the same sampling clock send in bursts; give the kernel room to queue them
+        datagrams.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 ** 2)
+        datagrams.bind((self.host, self.port))
+        datagrams.setblocking(False)
+
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(listener, selectors.EVENT_READ, self._accept)
+        self._selector.register(datagrams, selectors.EVENT_READ, self._read_datagrams)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="cluster-collector", daemon=True)
+        self._thread.start()
+        with _collectors_lock:
+            _collectors.add(self)
+        return self
+
+    def stop(self):
+        with _collectors_lock:
+            _collectors.discard(self)
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._selector is None:
+            # Never started, or already stopped
+            return
+        for key in list(self._selector.get_map().values()):
+            key.fileobj.close()
+        self._selector.close()
+        self._selector = None
+        self._buffers.clear()
+        self._peers.clear()
+
+    def _run(self):
+        began = time.thread_time()
+        while self._running:
+            for key, _ in self._selector.select(timeout=0.5):
+                try:
+                    key.data(key.fileobj)
+                except Exception as e:
+                    _callback_errors.inc()
+                    if key.fileobj in self._buffers:
+                        # A broken agent connection: drop it, keep serving the rest
+                        print(f"Collector: closing connection from {self._peers.get(key.fileobj)}: {e!r}")
+                        self._close(key.fileobj)
+                    else:
+                        print(f"Collector: {key.data.__name__} failed: {e!r}")
+            self.cpu_seconds = time.thread_time() - began
+
+    def _accept(self, listener):
+        try:
+            conn, address = listener.accept()
+        except BlockingIOError:
+            return
+        conn.setblocking(False)
+        self._buffers[conn] = bytearray()
+        self._peers[conn] = address
+        self._selector.register(conn, selectors.EVENT_READ, self._read_stream)
+
+    def _close(self, conn):
+        self._selector.unregister(conn)
+        self._buffers.pop(conn, None)
+        self._peers.pop(conn, None)
+        conn.close()
+
+    def _read_stream(self, conn):
+        try:
+            data = conn.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._close(conn)
+            return
+        buffer = self._buffers[conn]
+        buffer += data
+        pos = 0
+        while len(buffer) - pos >= _LENGTH.size:
+            (length,) = _LENGTH.unpack_from(buffer, pos)
+            end = pos + _LENGTH.size + length
+            if end > len(buffer):
+                break
+            self._ingest(bytes(buffer[pos + _LENGTH.size:end]), "tcp", self._peers[conn])
+            pos = end
+        del buffer[:pos]
+
+    def _read_datagrams(self, sock):
+        # Drain what has arrived, but yield to other sockets now and then
+        for _ in range(256):
+            try:
+                frame, address = sock.recvfrom(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                continue
+            self._ingest(frame, "udp", address)
+
+    def _ingest(self, frame, transport, address):
+        began = time.perf_counter()
+        _frames_total[transport].inc()
+        _bytes_total.inc(len(frame))
+        try:
+            header = read_header(frame)
+            node = self._nodes.get(header.node)
+            if node is None:
+                node = _Node(header.node, self.columns, self.history)
+            samples = node.decoder.decode(header, frame)
+        except (ValueError, IndexError, struct.error, UnicodeDecodeError):
+            _frames_dropped["malformed"].inc()
+            return
+        if samples is None:
+            _frames_dropped["out_of_sync"].inc()
+            return
+        if node.mapped_columns is not node.decoder.columns:
+            # Agents may send columns in another order, or a subset of ours
+            node.mapping = [node.decoder.columns.index(c) if c in node.decoder.columns else None for c in self.columns]
+            node.mapped_columns = node.decoder.columns
+        with self._lock:
+            self._nodes[header.node] = node
+            for timestamp, values in samples:
+                node.buffer.append([timestamp] + [values[i] if i is not None else math.nan for i in node.mapping])
+            node.address = address[0]
+            node.transport = transport
+            node.last_seen = time.time()
+            node.frames += 1
+            node.samples += len(samples)
+        _samples_total.inc(len(samples))
+        _ingest_seconds.observe(time.perf_counter() - began)
+
+    def _status(self, node):
+        latest = None
+        if len(node.buffer):
+            row = node.buffer.latest()
+            latest = {"timestamp": float(row[0]), **{name: float(v) for name, v in zip(self.columns, row[1:])}}
+        return NodeStatus(node.name, node.address, node.transport, node.last_seen, node.frames, node.samples, latest)
+
+    def nodes(self):
+        """Status of every node seen so far, by name."""
+        with self._lock:
+            return [self._status(node) for _, node in sorted(self._nodes.items())]
+
+    def fresh_nodes(self):
+        cutoff = time.time() - self.stale_after
+        return [status for status in self.nodes() if status.last_seen >= cutoff]
+
+    def resources(self, node):
+        """Latest readings of one node as {column: value} (check_resources shape); KeyError if unknown."""
+        with self._lock:
+            status = self._status(self._nodes[node])
+        return {name: status.latest[name] for name in self.columns}
+
+    def series(self, node, since=None):
+        """(timestamps, {column: values}) for one node, oldest first, as numpy copies."""
+        with self._lock:
+            data = self._nodes[node].buffer.view().copy()
+        if since is not None:
+            data = data[:, data[0] >= since]
+        return data[0], {name: data[i + 1] for i, name in enumerate(self.columns)}
+
+    def least_loaded(self, names=("cpu", "memory"), among=None):
+        """
+        (node, resources) for the fresh node whose busiest of `names` is
+        lowest, or (None, None). `among` limits the choice to those node names.
+        """
+        best = None
+        for status in self.fresh_nodes():
+            if among is not None and status.node not in among:
+                continue
+            load = max(status.latest[name] for name in names)
+            if best is None or load < best[0]:
+                best = (load, status)
+        if best is None:
+            return None, None
+        return best[1].node, {name: best[1].latest[name] for name in self.columns}
+
+
+def format_nodes(statuses, now=None):
+    now = time.time() if now is None else now
+    lines = []
+    for status in statuses:
+        latest = status.latest or {}
+        lines.append(
+            f"{status.node:24} {status.transport:3} {now - status.last_seen:5.1f}s ago  "
+            f"CPU {latest.get('cpu', 0):5.1f}%  RAM {latest.get('memory', 0):5.1f}%  "
+            f"GPU {latest.get('gpu', 0):5.1f}%  {status.samples} samples"
+        )
+    return "\n".join(lines)
+
+
+def _parse_address(value):
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def run_agent(args):
+    sampler = get_sampler(interval=args.interval)
+    sampler.interval = args.interval
+    agent = Agent(_parse_address(args.collector), node=args.node, transport=args.transport,
+                  batch_interval=args.batch_interval).attach(sampler).start()
+    sampler.start()
+    print(f"Agent {agent.node} streaming to {args.collector} over {args.transport}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        sampler.stop()
+        agent.stop()
+
+
+def run_collector(args):
+    collector = Collector(port=args.port, history=args.history).start()
+    print(f"Collector listening on port {collector.port} (TCP and UDP)")
+    try:
+        while True:
+            time.sleep(args.report)
+            print(format_nodes(collector.nodes()))
+            print(f"--- {len(collector.fresh_nodes())} live node(s), collector CPU {collector.cpu_seconds:.2f}s ---")
+    except KeyboardInterrupt:
+        collector.stop()
+
+
+def run_demo(args):
+    """Real agent processes on localhost, each sampling this host under its own node name."""
+    collector = Collector(host="127.0.0.1", port=0).start()
+    agents = [
+        subprocess.Popen([sys.executable, __file__, "agent", "--collector", f"127.0.0.1:{collector.port}",
+                          "--node", f"agent-{i + 1}", "--transport", args.transport])
+        for i in range(args.agents)
+    ]
+    try:
+        time.sleep(args.seconds)
+        print(format_nodes(collector.nodes()))
+    finally:
+        for process in agents:
+            process.terminate()
+        for process in agents:
+            process.wait()
+        collector.stop()
+
+
+def run_load(args):
+    """Simulated agents in this process: one connection (or UDP socket) and one encoder per node, at 1 Hz."""
+    collector = Collector(host="127.0.0.1", port=0, history=600).start()
+    address = ("127.0.0.1", collector.port)
+    nodes = []
+    for i in range(args.agents):
+        if args.transport == "tcp":
+            sock = socket.create_connection(address)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.connect(address)
+        nodes.append((FrameEncoder(f"node-{i + 1:04d}"), sock))
+
+    sent = bytes_sent = 0
+    began = time.monotonic()
+    tick = 0
+    while time.monotonic() - began < args.seconds:
+        now = time.time()
+        for i, (encoder, sock) in enumerate(nodes):
+            readings = {"cpu": (i + tick * 7) % 100, "memory": 40 + (tick % 10) / 10, "disk": 55.0,
+                        "gpu": (tick * 3) % 100, "gpu_memory": 20.0}
+            frame = encoder.encode([(now, readings)])
+            sock.sendall(_LENGTH.pack(len(frame)) + frame) if args.transport == "tcp" else sock.send(frame)
+            sent += 1
+            bytes_sent += len(frame)
+        tick += 1
+        time.sleep(max(0.0, began + tick - time.monotonic()))
+    time.sleep(0.5)
+    elapsed = time.monotonic() - began
+
+    received = sum(status.samples for status in collector.nodes())
+    print(f"{args.agents} agents over {args.transport} for {elapsed:.0f}s: {sent} frames sent, {received} samples stored, "
+          f"{bytes_sent / max(sent, 1):.1f} bytes/frame")
+    print(f"Collector thread CPU: {collector.cpu_seconds:.2f}s ({100 * collector.cpu_seconds / elapsed:.1f}% of one core)")
+    for _, sock in nodes:
+        sock.close()
+    collector.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream host metrics from agents to a central collector.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    agent_parser = commands.add_parser("agent", help="stream this host's samples to a collector")
+    agent_parser.add_argument("--collector", required=True, help="HOST:PORT of the collector")
+    agent_parser.add_argument("--node", default=None, help="node name (default: hostname)")
+    agent_parser.add_argument("--transport", choices=["tcp", "udp"], default="tcp")
+    agent_parser.add_argument("--interval", type=float, default=1.0, help="sampling interval in seconds")
+    agent_parser.add_argument("--batch-interval", type=float, default=0.0, help="pause between frames to batch samples")
+
+    collector_parser = commands.add_parser("collector", help="receive agent frames and print node status")
+    collector_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    collector_parser.add_argument("--history", type=int, default=3600, help="samples kept per node")
+    collector_parser.add_argument("--report", type=float, default=5.0, help="seconds between status reports")
+
+    demo_parser = commands.add_parser("demo", help="run a collector and agent processes on localhost")
+    demo_parser.add_argument("--agents", type=int, default=4)
+    demo_parser.add_argument("--transport", choices=["tcp", "udp"], default="tcp")
+    demo_parser.add_argument("--seconds", type=float, default=10.0)
+
+    load_parser = commands.add_parser("load", help="measure collector cost with simulated agents")
+    load_parser.add_argument("--agents", type=int, default=300)
+    load_parser.add_argument("--transport", choices=["tcp", "udp"], default="tcp")
+    load_parser.add_argument("--seconds", type=float, default=10.0)
+
+    args = parser.parse_args()
+    {"agent": run_agent, "collector": run_collector, "demo": run_demo, "load": run_load}[args.command](args)
@@ -0,0 +1,187 @@
+import functools
+import json
+import os
+import threading
+
+from lazy_import import lazy_import
+from log_writer import file_lock
+
+# Only needed once sums are updated; reading a saved model does not import numpy
+np = lazy_import("numpy")
+
+# Per 1k (prompt, completion) tokens; override with a JSON file of
+# {"model": [prompt_price, completion_price]} named by LLM_PRICING_FILE
+DEFAULT_PRICING = {"gpt-3.5-turbo": (0.002, 0.002), "gpt-4": (0.03, 0.03)}
+FALLBACK_PRICE = (0.001, 0.001)
+
+
+@functools.lru_cache(maxsize=None)
+def load_pricing():
+    pricing = dict(DEFAULT_PRICING)
+    pricing_file = os.getenv("LLM_PRICING_FILE")
+    if pricing_file:
+        with open(pricing_file) as file:
+            pricing.update({model: tuple(prices) for model, prices in json.load(file).items()})
+    return pricing
+
+
+def calculate_cost(prompt_tokens, completion_tokens, model):
+    prompt_price, completion_price = load_pricing().get(model, FALLBACK_PRICE)
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+# Pooled statistics across every model
+ALL_MODELS = "__all__"
+UNKNOWN_MODEL = "unknown"
+
+# Running sums kept per model: t = total tokens, p = prompt tokens,
+# c = completion tokens, y = cost
+_SUMS = ["n", "t", "y", "tt", "ty", "p", "c", "pp", "cc", "pc", "py", "cy"]
+
+
+def _zero_stats():
+    return {name: 0.0 for name in _SUMS}
+
+
+class CostModel:
+    """
+    Incremental least-squares cost model, split by LLM model.
+
+    Only running sums are kept, so folding in a logged request and making a
+    prediction are both O(1) however long the usage log grows. Two fits are
+    derived from the sums:
+
+    - cost ~ a + b * total_tokens, the same one-feature line the dashboard
+      used to refit with scikit-learn on every click;
+    - cost ~ wp * prompt_tokens + wc * completion_tokens, whose `wc` is the
+      estimated cost per completion token.
+
+    The sums are persisted as JSON next to the usage log, together with the
+    number of log rows they cover so new rows can be caught up on load.
+    Rows are only ever folded in by catch_up(), from the log itself, so
+    several processes appending to the same log (the dashboard and
+    LLMPipeline) each hold sums over a prefix of it, and a process adopts
+    saved sums that another one has already advanced further.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.stats = {}
+        self._lock = threading.Lock()
+        saved = self._load()
+        if saved is not None:
+            self.rows = saved.get("rows", 0)
+            self.stats = saved.get("stats", {})
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            print(f"Ignoring unreadable cost model {self.path}: {e}")
+            return None
+
+    @classmethod
+    def for_log(cls, log_path):
+        return cls(log_path + ".costmodel.json")
+
+    def _add(self, model, n, t, y, p, c):
+        # Scalars for one request, arrays when catching up on many
+        t, y, p, c = (np.asarray(v, dtype=float) for v in (t, y, p, c))
+        stats = self.stats.setdefault(model, _zero_stats())
+        stats["n"] += n
+        for name, values in (("t", t), ("y", y), ("tt", t * t), ("ty", t * y), ("p", p), ("c", c),
+                             ("pp", p * p), ("cc", c * c), ("pc", p * c), ("py", p * y), ("cy", c * y)):
+            stats[name] += float(values.sum())
+
+    def save(self):
+        with self._lock, file_lock(self.path):
+            self._save()
+
+    def catch_up(self, frame):
+        """
+        Fold in log rows beyond those already counted, in one vectorized pass
+        per model. `frame` is the full parsed usage log. The saved state is
+        read, folded and written under file_lock(), so processes sharing the
+        JSON file take turns.
+        """
+        with self._lock, file_lock(self.path):
+            # Another process may have saved sums over more of the log than ours
+            saved = self._load()
+            if saved is not None and self.rows < saved.get("rows", 0) <= len(frame):
+                self.rows = saved["rows"]
+                self.stats = saved.get("stats", {})
+            if len(frame) < self.rows:
+                # The log was truncated or replaced: start over
+                self.rows = 0
+                self.stats = {}
+            new_rows = frame.iloc[self.rows:]
+            if new_rows.empty:
+                return 0
+            prompt = new_rows["Prompt Tokens"].to_numpy(dtype=float)
+            total = new_rows["Total Tokens"].to_numpy(dtype=float)
+            if "Completion Tokens" in new_rows:
+                completion = new_rows["Completion Tokens"].to_numpy(dtype=float)
+                completion = np.where(np.isnan(completion), total - prompt, completion)
+            else:
+                completion = total - prompt
+            cost = new_rows["Cost"].to_numpy(dtype=float)
+            if "Model" in new_rows:
+                models = new_rows["Model"].fillna(UNKNOWN_MODEL).astype(str).replace("", UNKNOWN_MODEL).to_numpy()
+            else:
+                models = np.full(len(new_rows), UNKNOWN_MODEL)
+
+            # Rows with unusable numbers still count as read, but not as data
+            valid = ~(np.isnan(prompt) | np.isnan(completion) | np.isnan(cost))
+            for model in [ALL_MODELS] + sorted(set(models[valid])):
+                mask = valid if model == ALL_MODELS else valid & (models == model)
+                p, c, y = prompt[mask], completion[mask], cost[mask]
+                self._add(model, int(mask.sum()), p + c, y, p, c)
+            self.rows = len(frame)
+            self._save()
+            return len(new_rows)
+
+    def _save(self):
+        # Caller holds self._lock; write-then-rename so readers never see a partial file
+        temp = self.path + ".tmp"
+        with open(temp, "w") as f:
+            json.dump({"rows": self.rows, "stats": self.stats}, f)
+        os.replace(temp, self.path)
+
+    @property
+    def models(self):
+        return sorted(model for model in self.stats if model != ALL_MODELS)
+
+    def _stats(self, model):
+        return self.stats.get(model or ALL_MODELS)
+
+    def predict(self, total_tokens, model=None):
+        """Predicted cost of a request using `total_tokens`, or None without data."""
+        stats = self._stats(model)
+        if not stats or not stats["n"]:
+            return None
+        n = stats["n"]
+        variance = stats["tt"] - stats["t"] ** 2 / n
+        if n < 2 or variance <= 1e-12:
+            # Not enough spread for a line: fall back to average cost per token
+            return total_tokens * stats["y"] / stats["t"] if stats["t"] else stats["y"] / n
+        slope = (stats["ty"] - stats["t"] * stats["y"] / n) / variance
+        intercept = (stats["y"] - slope * stats["t"]) / n
+        return intercept + slope * total_tokens
+
+    def token_rates(self, model=None):
+        """Estimated (cost per prompt token, cost per completion token)."""
+        stats = self._stats(model)
+        if not stats or not stats["n"]:
+            return None, None
+        determinant = stats["pp"] * stats["cc"] - stats["pc"] ** 2
+        if abs(determinant) <= 1e-9 * max(stats["pp"] * stats["cc"], 1.0):
+            # Prompt and completion counts are collinear: one shared rate
+            tokens = stats["p"] + stats["c"]
+            rate = stats["y"] / tokens if tokens else None
+            return rate, rate
+        prompt_rate = (stats["py"] * stats["cc"] - stats["cy"] * stats["pc"]) / determinant
+        completion_rate = (stats["cy"] * stats["pp"] - stats["py"] * stats["pc"]) / determinant
+        return prompt_rate, completion_rate
@@ -0,0 +1,100 @@
+import numpy as np
+
+from instrumentation import histogram
+
+_downsample_seconds = histogram("monitor_downsample_seconds", "Time to reduce one series to chart resolution.")
+
+
+def _clean(x, y):
+    y = np.asarray(y, dtype=np.float64)
+    x = np.arange(len(y), dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+    finite = ~np.isnan(y)
+    if not finite.all():
+        x, y = x[finite], y[finite]
+    return x, y
+
+
+def lttb(x, y, points):
+    """
+    Largest-Triangle-Three-Buckets: keep `points` samples of a series whose
+    `x` is ascending. The first and last samples are always kept; every
+    bucket in between contributes the sample forming the largest triangle
+    with the previous pick and the next bucket's mean, which keeps peaks,
+    troughs and the overall shape. Returns index positions into `x`.
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    # Relative to the first sample so large timestamps keep their precision
+    x = x - x[0]
+    edges = np.linspace(1, n - 1, points - 1).astype(np.intp)
+    # Mean of each bucket's successor (the last bucket looks at the final sample)
+    next_lo = np.append(edges[1:-1], n - 1)
+    next_hi = np.append(edges[2:], n)
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    counts = next_hi - next_lo
+    mean_x = (cx[next_hi] - cx[next_lo]) / counts
+    mean_y = (cy[next_hi] - cy[next_lo]) / counts
+
+    picks = np.empty(points, dtype=np.intp)
+    picks[0], picks[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - mean_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (mean_y[i] - ay))
+        a = lo + int(area.argmax())
+        picks[i + 1] = a
+    return picks
+
+
+def _first_match(matches, bucket_of):
+    # Index of the first True in each bucket (every bucket has at least one)
+    hits = np.flatnonzero(matches)
+    buckets = bucket_of[hits]
+    first = np.empty(len(hits), dtype=bool)
+    first[:1] = True
+    np.not_equal(buckets[1:], buckets[:-1], out=first[1:])
+    return hits[first]
+
+
+def minmax(x, y, buckets):
+    """
+    Keep the minimum and maximum sample of each of `buckets` equal-width
+    slices of `x` (one per pixel column), plus the first and last samples,
+    so every spike survives. `x` must be ascending. Returns index positions.
+    """
+    n = len(x)
+    if n <= 2 * buckets or buckets < 1:
+        return np.arange(n)
+    bounds = np.linspace(x[0], x[-1], buckets + 1)[1:-1]
+    starts = np.unique(np.concatenate(([0], np.searchsorted(x, bounds))))
+    counts = np.diff(np.append(starts, n))
+    bucket_of = np.repeat(np.arange(len(starts)), counts)
+    lows = np.repeat(np.minimum.reduceat(y, starts), counts)
+    highs = np.repeat(np.maximum.reduceat(y, starts), counts)
+    picks = np.concatenate(([0, n - 1], _first_match(y == lows, bucket_of), _first_match(y == highs, bucket_of)))
+    return np.unique(picks)
+
+
+METHODS = {"lttb": lttb, "minmax": minmax}
+
+
+def downsample(x, y, width, method="lttb"):
+    """
+    Reduce a series to what a chart `width` pixels wide can show; `x` may be
+    None for a plain index. NaN samples are dropped. Returns (x, y) arrays,
+    at most `width` points for LTTB or about 2 * `width` for min/max.
+    """
+    with _downsample_seconds.time():
+        x, y = _clean(x, y)
+        picks = METHODS[method](x, y, max(int(width), 1))
+        if len(picks) == len(x):
+            return x, y
+        return x[picks], y[picks]
+
+
+def axes_width(ax):
+    """Width of a matplotlib Axes in device pixels."""
+    return int(ax.bbox.width)
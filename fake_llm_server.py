@@ -0,0 +1,82 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeChatCompletionsHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for the OpenAI chat completions endpoint.
+
+    Answers POST .../chat/completions after `server.latency` seconds with a
+    canned reply and a usage block (about one token per four characters), so
+    the LLM pipeline can be exercised and benchmarked offline.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        prompt = " ".join(message.get("content", "") for message in request.get("messages", []))
+
+        time.sleep(self.server.latency)
+        self.server.requests += 1
+
+        prompt_tokens = max(1, len(prompt) // 4)
+        content = f"Echo: {prompt[-200:]}"
+        completion_tokens = max(1, len(content) // 4)
+        body = json.dumps({
+            "id": f"fake-{self.server.requests}",
+            "object": "chat.completion",
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Many concurrent clients connect at once; the default backlog of 5 drops them
+    request_queue_size = 256
+
+
+def start_fake_server(host="127.0.0.1", port=0, latency=0.05):
+    """Start the fake server on a daemon thread; returns (server, base_url)."""
+    server = FakeLLMServer((host, port), FakeChatCompletionsHandler)
+    server.latency = latency
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, name="fake-llm-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local fake chat completions server.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per response")
+    args = parser.parse_args()
+
+    server, url = start_fake_server(port=args.port, latency=args.latency)
+    print(f"Fake LLM server listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,134 @@
+import math
+from collections import namedtuple
+
+from gpu_metrics import gpu_summary
+from io_metrics import io_summary
+
+Forecast = namedtuple("Forecast", ["mean", "lower", "upper"])
+
+
+class MetricForecaster:
+    """
+    Streaming short-horizon forecast for one utilization metric.
+
+    Holt's linear smoothing (EWMA level plus a per-second trend) with an
+    exponentially weighted variance of the one-step residuals. State is a
+    handful of floats, so each update and forecast is O(1).
+    """
+
+    def __init__(self, alpha=0.3, beta=0.1, variance_alpha=0.1):
+        self.alpha = alpha
+        self.beta = beta
+        self.variance_alpha = variance_alpha
+        self.level = None
+        self.trend = 0.0
+        self.variance = 0.0
+        self.step = None
+        self.last_timestamp = None
+
+    def update(self, value, timestamp):
+        if value is None or math.isnan(value):
+            return
+        if self.level is None:
+            self.level = value
+            self.last_timestamp = timestamp
+            return
+        dt = timestamp - self.last_timestamp
+        if dt <= 0:
+            return
+        predicted = self.level + self.trend * dt
+        residual = value - predicted
+        previous_level = self.level
+        self.level = self.alpha * value + (1 - self.alpha) * predicted
+        self.trend = self.beta * (self.level - previous_level) / dt + (1 - self.beta) * self.trend
+        self.variance = (1 - self.variance_alpha) * self.variance + self.variance_alpha * residual ** 2
+        self.step = dt if self.step is None else 0.9 * self.step + 0.1 * dt
+        self.last_timestamp = timestamp
+
+    @property
+    def ready(self):
+        return self.step is not None
+
+    def forecast(self, horizon, z=1.0):
+        """Expected value `horizon` seconds ahead with a +/- z-sigma band, clipped to 0-100%."""
+        if self.level is None:
+            return None
+        mean = self.level + self.trend * horizon
+        # Uncertainty grows with the number of sampling steps forecast ahead
+        steps = horizon / self.step if self.step else 0.0
+        spread = z * math.sqrt(self.variance * (1 + steps))
+        clip = lambda value: min(100.0, max(0.0, value))
+        return Forecast(clip(mean), clip(mean - spread), clip(mean + spread))
+
+
+def snapshot_resources(snapshot):
+    # CPU and memory, plus the busiest GPU, disk and NIC when those collectors are attached
+    resources = {"cpu": snapshot.cpu, "memory": snapshot.memory}
+    if "gpus" in snapshot.extra:
+        resources.update(gpu_summary(snapshot.extra["gpus"]))
+    if "io" in snapshot.extra:
+        resources.update(io_summary(snapshot.extra["io"]))
+    return resources
+
+
+class ResourceForecaster:
+    """One MetricForecaster per resource, fed from the shared sampler."""
+
+    def __init__(self, **options):
+        self.options = options
+        self.metrics = {}
+
+    def update(self, resources, timestamp):
+        for name, value in resources.items():
+            forecaster = self.metrics.get(name)
+            if forecaster is None:
+                forecaster = self.metrics[name] = MetricForecaster(**self.options)
+            forecaster.update(value, timestamp)
+
+    def on_snapshot(self, snapshot):
+        self.update(snapshot_resources(snapshot), snapshot.timestamp)
+
+    def attach(self, sampler):
+        sampler.subscribe(self.on_snapshot)
+        return self
+
+    def forecast(self, name, horizon, z=1.0):
+        forecaster = self.metrics.get(name)
+        if forecaster is None or not forecaster.ready:
+            return None
+        return forecaster.forecast(horizon, z)
+
+
+class ForecastPolicy:
+    """
+    Admission policy that looks `horizon` seconds ahead instead of at the
+    latest reading.
+
+    A task is admitted when the upper forecast bound plus reservations plus
+    the task's needs fits under every threshold. Once it has deferred, the
+    policy only resumes admitting after the projection drops `hysteresis`
+    points below the threshold, so admission does not flap around it.
+    Metrics without enough history fall back to the current reading.
+    """
+
+    def __init__(self, forecaster, horizon=10.0, z=1.0, hysteresis=5.0):
+        self.forecaster = forecaster
+        self.horizon = horizon
+        self.z = z
+        self.hysteresis = hysteresis
+        self.deferring = False
+
+    def projected(self, name, resources):
+        forecast = self.forecaster.forecast(name, self.horizon, self.z)
+        return resources.get(name, 0.0) if forecast is None else forecast.upper
+
+    def admit(self, needs, resources, reserved, thresholds, idle):
+        margin = self.hysteresis if self.deferring else 0.0
+        for name, threshold in thresholds.items():
+            projected = self.projected(name, resources)
+            demand = 0.0 if idle else reserved.get(name, 0.0) + needs.get(name, 0.0)
+            if projected + demand > threshold - margin or resources.get(name, 0.0) >= threshold:
+                self.deferring = True
+                return False
+        self.deferring = False
+        return True
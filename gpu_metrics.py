@@ -0,0 +1,207 @@
+import itertools
+import os
+import threading
+from collections import namedtuple
+from types import SimpleNamespace
+
+GPUStats = namedtuple(
+    "GPUStats",
+    ["index", "name", "utilization", "memory_used", "memory_total", "memory_percent",
+     "temperature", "power_watts", "processes"],
+)
+GPUProcess = namedtuple("GPUProcess", ["pid", "used_memory"])
+
+
+class GPUCollector:
+    """
+    Reads every NVIDIA GPU in one pass per tick.
+
+    Devices are enumerated and their handles cached once at start-up, so a
+    tick is just the per-device queries. `backend` is the pynvml module by
+    default; pass a FakeNVML to run on machines without a GPU. Register the
+    collector on the shared sampler with `sampler.add_collector("gpus", collector)`.
+    A device whose utilization or memory query fails is left out of that
+    tick's stats (and listed in `failing`) while the others are still read.
+    """
+
+    def __init__(self, backend=None):
+        if backend is None:
+            try:
+                import pynvml as backend
+            except ImportError:
+                backend = None
+        self.backend = backend
+        self.handles = []
+        self.names = []
+        self.failing = set()
+        if backend is None:
+            return
+        try:
+            backend.nvmlInit()
+            for index in range(backend.nvmlDeviceGetCount()):
+                handle = backend.nvmlDeviceGetHandleByIndex(index)
+                name = backend.nvmlDeviceGetName(handle)
+                self.handles.append(handle)
+                self.names.append(name.decode() if isinstance(name, bytes) else name)
+        except Exception:
+            # No driver / no devices: behave as a host without GPUs
+            self.handles = []
+            self.names = []
+
+    @property
+    def available(self):
+        return bool(self.handles)
+
+    def _optional(self, query, *args):
+        # Temperature, power and process queries are unsupported on some boards
+        try:
+            return query(*args)
+        except Exception:
+            return None
+
+    def collect(self):
+        nvml = self.backend
+        stats = []
+        for index, (handle, name) in enumerate(zip(self.handles, self.names)):
+            try:
+                utilization = nvml.nvmlDeviceGetUtilizationRates(handle)
+                memory = nvml.nvmlDeviceGetMemoryInfo(handle)
+            except Exception as e:
+                # e.g. a GPU that fell off the bus; report it once and keep reading the rest
+                if index not in self.failing:
+                    print(f"GPU {index} ({name}) could not be read: {e}")
+                    self.failing.add(index)
+                continue
+            self.failing.discard(index)
+            temperature = self._optional(nvml.nvmlDeviceGetTemperature, handle, nvml.NVML_TEMPERATURE_GPU)
+            power = self._optional(nvml.nvmlDeviceGetPowerUsage, handle)
+            processes = self._optional(nvml.nvmlDeviceGetComputeRunningProcesses, handle) or []
+            stats.append(GPUStats(
+                index=index,
+                name=name,
+                utilization=utilization.gpu,
+                memory_used=memory.used,
+                memory_total=memory.total,
+                memory_percent=round(memory.used / memory.total * 100, 2) if memory.total else 0.0,
+                temperature=temperature,
+                power_watts=power / 1000 if power is not None else None,
+                processes=tuple(GPUProcess(p.pid, p.usedGpuMemory) for p in processes),
+            ))
+        return tuple(stats)
+
+    __call__ = collect
+
+    def shutdown(self):
+        if self.handles:
+            self.backend.nvmlShutdown()
+            self.handles = []
+            self.names = []
+
+
+def gpu_summary(gpus):
+    """Busiest utilization and memory percent across GPUs (0 when there are none)."""
+    if not gpus:
+        return {"gpu": 0, "gpu_memory": 0}
+    return {
+        "gpu": max(gpu.utilization for gpu in gpus),
+        "gpu_memory": max(gpu.memory_percent for gpu in gpus),
+    }
+
+
+class FakeNVML:
+    """
+    In-process stand-in for the pynvml API with scripted readings.
+
+    Each device is a dict; any of "utilization", "memory_used", "temperature",
+    "power" (milliwatts) and "processes" (list of (pid, bytes)) may be a
+    constant or a list that is stepped through, cycling, on every read. An
+    exception instance in place of a reading is raised by that read.
+    """
+
+    NVML_TEMPERATURE_GPU = 0
+
+    def __init__(self, devices):
+        self.devices = [dict(device) for device in devices]
+        self.initialized = False
+        self._scripts = [
+            {key: self._script(value) for key, value in device.items()}
+            for device in self.devices
+        ]
+
+    @staticmethod
+    def _script(value):
+        if isinstance(value, list):
+            return itertools.cycle(value)
+        return itertools.repeat(value)
+
+    def _next(self, handle, key, default=None):
+        script = self._scripts[handle].get(key)
+        value = next(script) if script is not None else default
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def nvmlInit(self):
+        self.initialized = True
+
+    def nvmlShutdown(self):
+        self.initialized = False
+
+    def nvmlDeviceGetCount(self):
+        return len(self.devices)
+
+    def nvmlDeviceGetHandleByIndex(self, index):
+        if not 0 <= index < len(self.devices):
+            raise ValueError(f"no fake GPU at index {index}")
+        return index
+
+    def nvmlDeviceGetName(self, handle):
+        return self.devices[handle].get("name", f"Fake GPU {handle}")
+
+    def nvmlDeviceGetUtilizationRates(self, handle):
+        return SimpleNamespace(gpu=self._next(handle, "utilization", 0), memory=0)
+
+    def nvmlDeviceGetMemoryInfo(self, handle):
+        total = self.devices[handle].get("memory_total", 16 * 1024 ** 3)
+        used = self._next(handle, "memory_used", 0)
+        return SimpleNamespace(total=total, used=used, free=total - used)
+
+    def nvmlDeviceGetTemperature(self, handle, sensor):
+        return self._next(handle, "temperature", 40)
+
+    def nvmlDeviceGetPowerUsage(self, handle):
+        return self._next(handle, "power", 50000)
+
+    def nvmlDeviceGetComputeRunningProcesses(self, handle):
+        processes = self._next(handle, "processes", [])
+        return [SimpleNamespace(pid=pid, usedGpuMemory=used) for pid, used in processes]
+
+
+def fake_backend_from_env():
+    """FakeNVML with MONITOR_FAKE_GPUS devices of varying load, or None."""
+    count = int(os.getenv("MONITOR_FAKE_GPUS", "0"))
+    if count <= 0:
+        return None
+    gib = 1024 ** 3
+    return FakeNVML([
+        {
+            "utilization": [(10 * i + step * 7) % 100 for step in range(20)],
+            "memory_used": [(2 + (i + step) % 10) * gib for step in range(20)],
+            "temperature": [55 + (i + step) % 15 for step in range(20)],
+            "power": [(80 + 10 * ((i + step) % 12)) * 1000 for step in range(20)],
+        }
+        for i in range(count)
+    ])
+
+
+_default_collector = None
+_default_lock = threading.Lock()
+
+
+def get_gpu_collector():
+    """Return the process-wide collector (fake devices if MONITOR_FAKE_GPUS is set)."""
+    global _default_collector
+    with _default_lock:
+        if _default_collector is None:
+            _default_collector = GPUCollector(backend=fake_backend_from_env())
+        return _default_collector
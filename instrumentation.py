@@ -0,0 +1,244 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import psutil
+
+# Default latency buckets in seconds: 50us .. 10s
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing count; inc() it, or read it from `fn` at scrape time."""
+
+    kind = "counter"
+
+    def __init__(self, labels, fn=None):
+        self.labels = labels
+        self.value = 0
+        self.fn = fn
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name):
+        yield name, self.labels, self.fn() if self.fn is not None else self.value
+
+
+class Gauge:
+    """A value that goes up and down; set it, or read it from `fn` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, labels, fn=None):
+        self.labels = labels
+        self.value = 0.0
+        self.fn = fn
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, name):
+        yield name, self.labels, self.fn() if self.fn is not None else self.value
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. observe() is a bisect and three additions under
+    a lock, cheap enough for per-tick and per-record hot paths.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, labels, buckets=DEFAULT_BUCKETS):
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - began)
+
+    def samples(self, name):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            yield f"{name}_bucket", dict(self.labels, le=_format_value(float(bound))), cumulative
+        yield f"{name}_sum", self.labels, total
+        yield f"{name}_count", self.labels, count
+
+
+class Registry:
+    """
+    Named metrics, each optionally split by a fixed set of label values.
+    Asking for the same name and labels again returns the same metric, so
+    modules can look metrics up where they use them.
+    """
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labels, **kwargs):
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = {"kind": cls.kind, "help": help_text, "metrics": {}}
+            elif family["kind"] != cls.kind:
+                raise ValueError(f"Metric {name} is already registered as a {family['kind']}")
+            metric = family["metrics"].get(key)
+            if metric is None:
+                metric = family["metrics"][key] = cls(dict(key), **kwargs)
+            return metric
+
+    def counter(self, name, help_text="", labels=None, fn=None):
+        return self._get(Counter, name, help_text, labels, fn=fn)
+
+    def gauge(self, name, help_text="", labels=None, fn=None):
+        return self._get(Gauge, name, help_text, labels, fn=fn)
+
+    def histogram(self, name, help_text="", labels=None, buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            families = [(name, dict(family), list(family["metrics"].values()))
+                        for name, family in sorted(self._families.items())]
+        lines = []
+        for name, family, metrics in families:
+            if family["help"]:
+                lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            for metric in metrics:
+                for sample_name, labels, value in metric.samples(name):
+                    lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help_text="", labels=None, fn=None):
+    return REGISTRY.counter(name, help_text, labels, fn)
+
+
+def gauge(name, help_text="", labels=None, fn=None):
+    return REGISTRY.gauge(name, help_text, labels, fn)
+
+
+def histogram(name, help_text="", labels=None, buckets=DEFAULT_BUCKETS):
+    return REGISTRY.histogram(name, help_text, labels, buckets)
+
+
+def _register_process_metrics(registry):
+    # The monitor's own footprint, read at scrape time
+    process = psutil.Process()
+    registry.counter("monitor_process_cpu_seconds_total", "CPU time used by the monitor process.",
+                   fn=lambda: sum(process.cpu_times()[:2]))
+    registry.gauge("monitor_process_resident_memory_bytes", "Resident memory of the monitor process.",
+                   fn=lambda: process.memory_info().rss)
+    registry.gauge("monitor_process_threads", "Threads in the monitor process.", fn=process.num_threads)
+
+
+_register_process_metrics(REGISTRY)
+
+
+class SelfUsage:
+    """
+    Sampler collector reporting the monitor process's own share of the
+    host: {"cpu": percent of all cores (comparable to snapshot.cpu), "rss": bytes}.
+    """
+
+    def __init__(self):
+        self._process = psutil.Process()
+        self._cores = psutil.cpu_count() or 1
+        self._cpu_time = sum(self._process.cpu_times()[:2])
+        self._measured_at = time.monotonic()
+
+    def __call__(self):
+        cpu_time = sum(self._process.cpu_times()[:2])
+        now = time.monotonic()
+        elapsed = now - self._measured_at
+        cpu = 100.0 * (cpu_time - self._cpu_time) / (elapsed * self._cores) if elapsed > 0 else 0.0
+        self._cpu_time, self._measured_at = cpu_time, now
+        return {"cpu": round(cpu, 2), "rss": self._process.memory_info().rss}
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the console
+        pass
+
+
+class MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None, host="127.0.0.1", registry=REGISTRY):
+    """
+    Serve /metrics on a daemon thread (once per process); returns the server.
+    The port defaults to MONITOR_METRICS_PORT, or 9108.
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            port = int(os.getenv("MONITOR_METRICS_PORT", "9108")) if port is None else port
+            _server = MetricsServer((host, port), MetricsHandler)
+            _server.registry = registry
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
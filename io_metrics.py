@@ -0,0 +1,285 @@
+import argparse
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import psutil
+
+from instrumentation import counter
+
+# Per-second rates over the last tick. `busy_percent` is the share of the tick
+# the device had I/O in flight, `service_ms` the busy time per operation and
+# `await_ms` the time per operation including queueing. Platforms without
+# busy_time report None for the first two.
+DiskRates = namedtuple(
+    "DiskRates",
+    ["device", "read_bytes", "write_bytes", "read_iops", "write_iops", "busy_percent", "service_ms", "await_ms"],
+)
+
+# `percent` is the busier direction as a share of the link speed (None when
+# the driver does not report one)
+NetRates = namedtuple(
+    "NetRates",
+    ["device", "recv_bytes", "sent_bytes", "recv_packets", "sent_packets", "errors", "drops", "percent"],
+)
+
+# What the collector hands the sampler each tick; `interval` is None on the first one
+IORates = namedtuple("IORates", ["interval", "disks", "nics"])
+
+DISK_IGNORE = r"^(loop|ram|zram)\d+$"
+NIC_IGNORE = r"^lo$"
+
+_counter_anomalies = {
+    result: counter("monitor_io_counter_anomalies_total", "I/O counters that went backwards.", {"result": result})
+    for result in ("wrap", "reset")
+}
+
+
+def _counter_bits():
+    # Linux /proc/diskstats keeps I/O and sector counts as unsigned long but the
+    # time fields as 32-bit; /proc/net/dev and the other platforms use 64-bit counters
+    if not sys.platform.startswith("linux"):
+        return {}
+    long_bits = struct.calcsize("l") * 8
+    bits = {field: long_bits for field in ("read_bytes", "write_bytes", "read_count", "write_count")}
+    bits.update({field: 32 for field in ("read_time", "write_time", "busy_time")})
+    return bits
+
+
+# Width of each psutil counter field; anything not listed is 64-bit
+COUNTER_BITS = _counter_bits()
+
+
+def counter_delta(previous, current, bits=64):
+    """
+    Increase of a monotonic `bits`-wide counter between two reads, or None
+    when it was reset (device re-created, driver reloaded). A drop is only
+    taken as a wrap when the counter was close enough to its maximum that
+    the increase across the wrap is small (under a quarter of the range).
+    """
+    if current >= previous:
+        return current - previous
+    increase = current + 2 ** bits - previous
+    if 0 < increase < 2 ** (bits - 2):
+        _counter_anomalies["wrap"].inc()
+        return increase
+    _counter_anomalies["reset"].inc()
+    return None
+
+
+def _deltas(previous, current, fields):
+    deltas = {}
+    for field in fields:
+        before, after = getattr(previous, field, None), getattr(current, field, None)
+        if before is None or after is None:
+            deltas[field] = None
+            continue
+        delta = counter_delta(before, after, COUNTER_BITS.get(field, 64))
+        if delta is None:
+            return None
+        deltas[field] = delta
+    return deltas
+
+
+def _whole_disks():
+    # Partitions would double count their disk; /sys/block lists only whole devices
+    try:
+        return {name.replace("!", "/") for name in os.listdir("/sys/block")}
+    except OSError:
+        return None
+
+
+DISK_FIELDS = ("read_bytes", "write_bytes", "read_count", "write_count", "read_time", "write_time", "busy_time")
+NIC_FIELDS = ("bytes_recv", "bytes_sent", "packets_recv", "packets_sent", "errin", "errout", "dropin", "dropout")
+
+
+class IOCollector:
+    """
+    Per-device disk and network throughput from psutil's cumulative counters.
+
+    Each tick reads disk_io_counters(perdisk=True) and net_io_counters(pernic=True)
+    once and turns the deltas since the previous tick into rates. psutil's own
+    wrap correction is turned off (it keeps global state); counters that go
+    backwards are handled by counter_delta. A device seen for the first time,
+    or whose counters were reset, reports no rates until its next tick; a
+    device that disappears is dropped. Loopback, loop and RAM devices and disk
+    partitions are skipped. The counter functions can be swapped for fakes;
+    `whole_disks` returns the names to keep, or None to keep every disk.
+    Register it with `sampler.add_collector("io", collector)`.
+    """
+
+    def __init__(self, disk_ignore=DISK_IGNORE, nic_ignore=NIC_IGNORE, disk_counters=None, net_counters=None,
+                 nic_speeds=None, whole_disks=_whole_disks, clock=None):
+        self.disk_ignore = re.compile(disk_ignore)
+        self.nic_ignore = re.compile(nic_ignore)
+        self.disk_counters = disk_counters or (lambda: psutil.disk_io_counters(perdisk=True, nowrap=False))
+        self.net_counters = net_counters or (lambda: psutil.net_io_counters(pernic=True, nowrap=False))
+        self.nic_speeds = nic_speeds or (lambda: {name: stats.speed for name, stats in psutil.net_if_stats().items()})
+        self.whole_disks = whole_disks
+        self.clock = clock or time.monotonic
+        self._disks = {}
+        self._nics = {}
+        self._disk_names = set()
+        self._whole = None
+        self._speeds = {}
+        self._read_at = None
+        self._lock = threading.Lock()
+
+    def _read(self, read, ignore):
+        try:
+            counters = read() or {}
+        except (OSError, RuntimeError):
+            # No disks/NICs visible (containers, some VMs)
+            return {}
+        return {name: values for name, values in counters.items() if not ignore.match(name)}
+
+    def _disk_rates(self, counters, elapsed):
+        # Re-list whole disks only when devices come or go
+        if set(counters) != self._disk_names:
+            self._disk_names = set(counters)
+            self._whole = self.whole_disks()
+        if self._whole is not None:
+            counters = {name: values for name, values in counters.items() if name in self._whole}
+        rates = []
+        for name, values in counters.items():
+            previous = self._disks.get(name)
+            deltas = previous and _deltas(previous, values, DISK_FIELDS)
+            if deltas:
+                ops = deltas["read_count"] + deltas["write_count"]
+                busy = deltas["busy_time"]
+                waited = None if deltas["read_time"] is None else deltas["read_time"] + deltas["write_time"]
+                rates.append(DiskRates(
+                    device=name,
+                    read_bytes=deltas["read_bytes"] / elapsed,
+                    write_bytes=deltas["write_bytes"] / elapsed,
+                    read_iops=deltas["read_count"] / elapsed,
+                    write_iops=deltas["write_count"] / elapsed,
+                    busy_percent=None if busy is None else round(min(100.0, busy / (elapsed * 10)), 1),
+                    service_ms=None if busy is None else (busy / ops if ops else 0.0),
+                    await_ms=None if waited is None else (waited / ops if ops else 0.0),
+                ))
+        self._disks = counters
+        return tuple(rates)
+
+    def _nic_rates(self, counters, elapsed):
+        if set(counters) - set(self._speeds):
+            try:
+                self._speeds = self.nic_speeds()
+            except OSError:
+                self._speeds = {}
+        rates = []
+        for name, values in counters.items():
+            previous = self._nics.get(name)
+            deltas = previous and _deltas(previous, values, NIC_FIELDS)
+            if deltas:
+                recv, sent = deltas["bytes_recv"] / elapsed, deltas["bytes_sent"] / elapsed
+                # Link speed is in Mbit/s; 0 means unknown
+                speed = self._speeds.get(name) or 0
+                rates.append(NetRates(
+                    device=name,
+                    recv_bytes=recv,
+                    sent_bytes=sent,
+                    recv_packets=deltas["packets_recv"] / elapsed,
+                    sent_packets=deltas["packets_sent"] / elapsed,
+                    errors=(deltas["errin"] + deltas["errout"]) / elapsed,
+                    drops=(deltas["dropin"] + deltas["dropout"]) / elapsed,
+                    percent=round(min(100.0, max(recv, sent) * 8 / (speed * 1e4)), 1) if speed else None,
+                ))
+        self._nics = counters
+        return tuple(rates)
+
+    def collect(self):
+        with self._lock:
+            disks = self._read(self.disk_counters, self.disk_ignore)
+            nics = self._read(self.net_counters, self.nic_ignore)
+            now = self.clock()
+            elapsed = None if self._read_at is None else now - self._read_at
+            self._read_at = now
+            if not elapsed or elapsed <= 0:
+                # First tick (or a clock that did not move): just take the baseline
+                self._disks, self._nics = disks, nics
+                return IORates(None, (), ())
+            return IORates(elapsed, self._disk_rates(disks, elapsed), self._nic_rates(nics, elapsed))
+
+    __call__ = collect
+
+
+def io_summary(io):
+    """Busiest disk (busy %) and busiest NIC (% of link speed), 0 when unknown."""
+    if not io:
+        return {"disk_io": 0, "net_io": 0}
+    busy = [disk.busy_percent for disk in io.disks if disk.busy_percent is not None]
+    links = [nic.percent for nic in io.nics if nic.percent is not None]
+    return {"disk_io": max(busy, default=0), "net_io": max(links, default=0)}
+
+
+def io_throughput(io):
+    """Host-wide bytes per second: disk reads and writes, network in and out."""
+    if not io:
+        return {"disk_read": 0.0, "disk_write": 0.0, "net_recv": 0.0, "net_sent": 0.0}
+    return {
+        "disk_read": sum(disk.read_bytes for disk in io.disks),
+        "disk_write": sum(disk.write_bytes for disk in io.disks),
+        "net_recv": sum(nic.recv_bytes for nic in io.nics),
+        "net_sent": sum(nic.sent_bytes for nic in io.nics),
+    }
+
+
+def format_io(io):
+    """One-line summary such as "disk 12.0 MB/s read 3.1 MB/s write (sda 40% busy), net 1.2 MB/s in 0.3 MB/s out"."""
+    if not io or io.interval is None:
+        return "n/a"
+    mb = 1024 ** 2
+    totals = io_throughput(io)
+    busiest = max((d for d in io.disks if d.busy_percent is not None), key=lambda d: d.busy_percent, default=None)
+    busy = f" ({busiest.device} {busiest.busy_percent:.0f}% busy)" if busiest is not None else ""
+    return (f"disk {totals['disk_read'] / mb:.1f} MB/s read {totals['disk_write'] / mb:.1f} MB/s write{busy}, "
+            f"net {totals['net_recv'] / mb:.1f} MB/s in {totals['net_sent'] / mb:.1f} MB/s out")
+
+
+def _percent(value):
+    return "n/a" if value is None else f"{value:.0f}%"
+
+
+def _millis(value):
+    return "n/a" if value is None else f"{value:.2f} ms"
+
+
+_default_collector = None
+_default_lock = threading.Lock()
+
+
+def get_io_collector():
+    """Process-wide collector, so every sampler shares one set of counter baselines."""
+    global _default_collector
+    with _default_lock:
+        if _default_collector is None:
+            _default_collector = IOCollector()
+        return _default_collector
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print per-device disk and network rates.")
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between reads")
+    args = parser.parse_args()
+
+    collector = IOCollector()
+    collector.collect()
+    for _ in range(args.ticks):
+        time.sleep(args.interval)
+        began = time.perf_counter()
+        io = collector.collect()
+        spent = (time.perf_counter() - began) * 1000
+        print(f"{format_io(io)}  [{len(io.disks)} disks, {len(io.nics)} NICs read in {spent:.2f} ms]")
+        for disk in io.disks:
+            print(f"  {disk.device:<12} {disk.read_bytes / 1024:>10.1f} KB/s r {disk.write_bytes / 1024:>10.1f} KB/s w "
+                  f"{disk.read_iops + disk.write_iops:>8.1f} IOPS  busy {_percent(disk.busy_percent)}  "
+                  f"await {_millis(disk.await_ms)}")
+        for nic in io.nics:
+            print(f"  {nic.device:<12} {nic.recv_bytes / 1024:>10.1f} KB/s in {nic.sent_bytes / 1024:>9.1f} KB/s out "
+                  f"{nic.recv_packets + nic.sent_packets:>8.1f} pkt/s  link {_percent(nic.percent)}")
@@ -0,0 +1,37 @@
+import importlib
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    `pd = lazy_import("pandas")` costs nothing at import time; the first
+    `pd.DataFrame` imports pandas and every later access goes straight to it.
+    Only attribute reads are forwarded, so set module attributes (such as
+    openai.api_key) on the real module returned by `load()`.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            # importlib holds a per-module lock, so concurrent first uses are safe
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attribute):
+        return getattr(self.load(), attribute)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
@@ -0,0 +1,198 @@
+import csv
+import io
+import os
+import threading
+import time
+
+from instrumentation import counter, histogram
+from lazy_import import lazy_import
+from log_writer import file_lock
+
+# Imported on first parse, so importing this module stays cheap
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+# Current schema of llm_usage_logs.csv; older logs lack the last two columns
+LLM_LOG_FIELDS = ["Timestamp", "Total Tokens", "Prompt Tokens", "Cost", "Completion Tokens", "Model"]
+
+# Columns that must be numeric for a row to count as a valid usage record
+NUMERIC_COLUMNS = ["Total Tokens", "Prompt Tokens", "Cost", "Completion Tokens"]
+
+_load_seconds = histogram("monitor_usage_log_load_seconds", "Time for one LLMUsageLog.load() that parsed new data.")
+_loads_total = {
+    outcome: counter("monitor_usage_log_loads_total", "LLMUsageLog.load() calls by outcome.", {"outcome": outcome})
+    for outcome in ("unchanged", "incremental", "full")
+}
+_rows_parsed = counter("monitor_usage_log_rows_parsed_total", "Usage log rows parsed.")
+
+
+_ensured = set()
+_ensured_lock = threading.Lock()
+
+
+def ensure_usage_log(path):
+    """
+    Create the usage log, or upgrade an older one in place to LLM_LOG_FIELDS.
+    Runs under the file_lock() appenders use, and once per path per process
+    (Streamlit reruns call it on every interaction).
+    """
+    key = os.path.abspath(path)
+    with _ensured_lock:
+        if key in _ensured:
+            return
+        with file_lock(path):
+            _ensure_usage_log(path)
+        _ensured.add(key)
+
+
+def _ensure_usage_log(path):
+    if not os.path.exists(path):
+        with open(path, mode="w", newline="") as file:
+            csv.writer(file).writerow(LLM_LOG_FIELDS)
+        return
+
+    with open(path, newline="") as file:
+        header = next(csv.reader(file), [])
+    if header == LLM_LOG_FIELDS:
+        return
+
+    # Older rows: completion tokens are total minus prompt, model is unknown
+    upgraded = path + ".upgrade"
+    with open(path, newline="") as source, open(upgraded, mode="w", newline="") as target:
+        reader = csv.DictReader(source)
+        writer = csv.writer(target)
+        writer.writerow(LLM_LOG_FIELDS)
+        for row in reader:
+            try:
+                completion = int(row["Total Tokens"]) - int(row["Prompt Tokens"])
+            except (TypeError, ValueError):
+                completion = ""
+            writer.writerow([
+                row.get("Timestamp"), row.get("Total Tokens"), row.get("Prompt Tokens"), row.get("Cost"),
+                row.get("Completion Tokens") or completion, row.get("Model") or "",
+            ])
+    os.replace(upgraded, path)
+
+
+class LLMUsageLog:
+    """
+    Incrementally parsed view of the LLM usage CSV.
+
+    The file is identified by (device, inode); while that identity holds and
+    the file only grows, each load() parses just the complete lines appended
+    since the previous call. A replaced, truncated or rewritten file is
+    re-read from scratch. Parsed rows are appended into preallocated column
+    arrays that grow by doubling, and the returned frame is a view over
+    them, so an incremental load costs O(new rows) rather than a copy of
+    the whole log. One instance is safe to share between threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._identity = None
+        self._size = 0
+        self._mtime = None
+        self._offset = 0
+        self._columns = None
+        self._arrays = {}
+        self._rows = 0
+        self._frame = pd.DataFrame()
+
+    def _append(self, new_rows):
+        count = self._rows + len(new_rows)
+        for name in self._columns:
+            values = new_rows[name].to_numpy()
+            if values.dtype.kind not in "biuf":
+                values = values.astype(object)
+            array = self._arrays.get(name)
+            dtype = values.dtype if array is None else np.result_type(array.dtype, values.dtype)
+            if array is None or array.dtype != dtype or len(array) < count:
+                # Double the capacity (or widen the dtype, e.g. ints meeting NaN) and copy once
+                capacity = count if array is None else max(count, 2 * len(array))
+                grown = np.empty(capacity, dtype=dtype)
+                if array is not None:
+                    grown[:self._rows] = array[:self._rows]
+                array = self._arrays[name] = grown
+            array[self._rows:count] = values
+        self._rows = count
+        # Views, not copies; text columns stay object so pandas does not convert them
+        self._frame = pd.DataFrame({
+            name: pd.Series(array[:count], dtype=array.dtype, copy=False)
+            for name, array in self._arrays.items()
+        }, copy=False)
+
+    def _coerce(self, frame):
+        # Vectorized validation: anything non-numeric becomes NaN
+        for column in NUMERIC_COLUMNS:
+            if column in frame:
+                frame[column] = pd.to_numeric(frame[column], errors="coerce")
+        return frame
+
+    def _read_new_bytes(self):
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        # Only parse complete lines; a partially written row waits for the next load
+        end = chunk.rfind(b"\n") + 1
+        chunk = chunk[:end]
+        self._offset += end
+        return chunk
+
+    def load(self):
+        """Return the parsed log; treat the frame as read-only, it is shared."""
+        began = time.perf_counter()
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._reset()
+                return self._frame
+
+            identity = (stat.st_dev, stat.st_ino)
+            if identity != self._identity or stat.st_size < self._size:
+                self._reset()
+            elif stat.st_size == self._size:
+                if stat.st_mtime_ns == self._mtime:
+                    _loads_total["unchanged"].inc()
+                    return self._frame
+                # Rewritten in place without changing size
+                self._reset()
+            self._identity = identity
+            self._size = stat.st_size
+            self._mtime = stat.st_mtime_ns
+
+            outcome = "full" if self._offset == 0 else "incremental"
+            chunk = self._read_new_bytes()
+            if self._columns is None:
+                header, _, chunk = chunk.partition(b"\n")
+                if not header:
+                    # Header not fully written yet
+                    self._offset = 0
+                    return self._frame
+                self._columns = header.decode().strip().split(",")
+            if not chunk:
+                if self._frame.empty:
+                    self._frame = pd.DataFrame(columns=self._columns)
+                return self._frame
+
+            new_rows = pd.read_csv(
+                io.BytesIO(chunk), header=None, names=self._columns, on_bad_lines="skip"
+            )
+            self._append(self._coerce(new_rows))
+            _loads_total[outcome].inc()
+            _rows_parsed.inc(len(new_rows))
+            _load_seconds.observe(time.perf_counter() - began)
+            return self._frame
+
+    def valid_rows(self):
+        """Rows with a whole, non-negative token count and a numeric cost."""
+        frame = self.load()
+        if frame.empty or "Total Tokens" not in frame or "Cost" not in frame:
+            return frame
+        tokens = frame["Total Tokens"]
+        mask = tokens.notna() & frame["Cost"].notna() & (tokens >= 0) & (tokens % 1 == 0)
+        return frame[mask]
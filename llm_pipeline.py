@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+import functools
+import os
+import time
+from collections import OrderedDict
+
+import httpx
+
+from cost_model import calculate_cost
+from instrumentation import counter, histogram
+from llm_log_cache import LLM_LOG_FIELDS, LLMUsageLog, ensure_usage_log
+from log_writer import BackgroundLogWriter
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+_request_seconds = histogram("monitor_llm_request_seconds", "Latency of one LLM HTTP request.")
+_rate_limit_wait = histogram("monitor_llm_rate_limit_wait_seconds", "Time a request waited for rate-limit budget.")
+_completions = {
+    outcome: counter("monitor_llm_completions_total", "complete() calls by outcome.", {"outcome": outcome})
+    for outcome in ("requested", "cache_hit", "coalesced", "error")
+}
+_tokens_total = counter("monitor_llm_tokens_total", "Tokens reported by LLM responses.")
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `per_minute` units a minute."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        # Waiters queue on the lock, so the budget is handed out in FIFO order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, amount):
+        # Correct an estimate once the real usage is known (may go negative)
+        self._refill()
+        self.tokens -= amount
+
+
+class ResponseCache:
+    """Bounded LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, max_entries=1024, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class LLMPipeline:
+    """
+    Sends many chat prompts concurrently over one pooled HTTP client.
+
+    Requests are bounded by `max_concurrency` and by request- and
+    token-per-minute budgets. Repeated (model, prompt) pairs are answered
+    from the response cache, and identical prompts already in flight share
+    one request. Usage rows go to a batched background writer; on close()
+    the optional cost model catches up on the log, rows from other writers
+    included.
+    """
+
+    def __init__(self, base_url=None, api_key=None, max_concurrency=16, requests_per_minute=3500,
+                 tokens_per_minute=90000, expected_completion_tokens=256, cache_size=1024, cache_ttl=3600,
+                 log_file="llm_usage_logs.csv", cost_model=None, timeout=60.0):
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY", "")
+        self.max_concurrency = max_concurrency
+        self.expected_completion_tokens = expected_completion_tokens
+        self.timeout = timeout
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.cache = ResponseCache(cache_size, cache_ttl)
+        self.log_file = log_file
+        self.cost_model = cost_model
+        self.stats = {"requests": 0, "cache_hits": 0, "coalesced": 0, "errors": 0}
+        self._in_flight = {}
+        self._client = None
+        self._semaphore = None
+        self._writer = None
+        if log_file:
+            ensure_usage_log(log_file)
+            # The dashboard appends to the same log; batches go in under the shared file lock
+            self._writer = BackgroundLogWriter(log_file, LLM_LOG_FIELDS, when_full="block", shared=True)
+
+    async def __aenter__(self):
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            limits=limits,
+            timeout=self.timeout,
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        # Joining the writer thread and re-reading the log block: keep them off the event loop
+        if self._writer is not None:
+            await asyncio.to_thread(self._writer.close)
+            self._writer = None
+        if self.cost_model is not None and self.log_file:
+            await asyncio.to_thread(self._catch_up)
+
+    def _catch_up(self):
+        self.cost_model.catch_up(LLMUsageLog(self.log_file).load())
+
+    def _estimate_tokens(self, prompt):
+        # Roughly four characters per token, plus the expected completion
+        return (len(SYSTEM_PROMPT) + len(prompt)) // 4 + self.expected_completion_tokens
+
+    async def _request(self, prompt, model):
+        estimate = self._estimate_tokens(prompt)
+        waited = time.perf_counter()
+        await self.requests.acquire()
+        await self.tokens.acquire(estimate)
+        _rate_limit_wait.observe(time.perf_counter() - waited)
+        async with self._semaphore:
+            began = time.perf_counter()
+            response = await self._client.post("/chat/completions", json={
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+            })
+            _request_seconds.observe(time.perf_counter() - began)
+        response.raise_for_status()
+        data = response.json()
+        usage = data["usage"]
+        self.tokens.adjust(usage["total_tokens"] - estimate)
+        self.stats["requests"] += 1
+        _completions["requested"].inc()
+        _tokens_total.inc(usage["total_tokens"])
+
+        prompt_tokens = usage["prompt_tokens"]
+        completion_tokens = usage["completion_tokens"]
+        cost = calculate_cost(prompt_tokens, completion_tokens, model)
+        if self._writer is not None:
+            # A full queue blocks write() (when_full="block"), so it waits on a worker thread
+            await asyncio.to_thread(self._writer.write, [
+                time.strftime("%Y-%m-%d %H:%M:%S"),
+                usage["total_tokens"], prompt_tokens, cost, completion_tokens, model,
+            ])
+
+        return {
+            "response": data["choices"][0]["message"]["content"],
+            "total_tokens": usage["total_tokens"],
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost": cost,
+        }
+
+    async def complete(self, prompt, model="gpt-3.5-turbo"):
+        """Result dict in the same shape as track_openai_usage, or {"error": ...}."""
+        key = (model, prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            _completions["cache_hit"].inc()
+            return dict(cached, cached=True)
+
+        # Share one request between identical prompts already in flight. Every
+        # caller, the first included, awaits it through a shield, so cancelling
+        # one caller never cancels the request the others are waiting on.
+        pending = self._in_flight.get(key)
+        coalesced = pending is not None
+        if coalesced:
+            self.stats["coalesced"] += 1
+            _completions["coalesced"].inc()
+        else:
+            pending = asyncio.ensure_future(self._request(prompt, model))
+            self._in_flight[key] = pending
+            pending.add_done_callback(functools.partial(self._finished, key))
+        try:
+            result = await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise
+            # The shared request itself was cancelled, not this caller: send it again
+            return await self.complete(prompt, model)
+        except Exception as e:
+            return {"error": str(e)}
+        return dict(result, cached=coalesced)
+
+    def _finished(self, key, pending):
+        # Runs once per request, whether or not anyone is still waiting on it
+        if self._in_flight.get(key) is pending:
+            del self._in_flight[key]
+        if pending.cancelled():
+            return
+        if pending.exception() is not None:
+            self.stats["errors"] += 1
+            _completions["error"].inc()
+            return
+        self.cache.put(key, pending.result())
+
+    async def run(self, prompts, model="gpt-3.5-turbo"):
+        """Complete every prompt concurrently; results keep the input order."""
+        return await asyncio.gather(*(self.complete(prompt, model) for prompt in prompts))
+
+
+async def _benchmark(args):
+    from fake_llm_server import start_fake_server
+
+    server, url = start_fake_server(latency=args.latency)
+    # A small set of distinct prompts, repeated, to exercise the cache
+    prompts = [f"Question {i % args.distinct}: what is {i % args.distinct} squared?" for i in range(args.prompts)]
+    async with LLMPipeline(base_url=url, api_key="fake", max_concurrency=args.concurrency, log_file=args.log,
+                           requests_per_minute=args.rpm, tokens_per_minute=args.tpm) as pipeline:
+        began = time.perf_counter()
+        results = await pipeline.run(prompts)
+        elapsed = time.perf_counter() - began
+    server.shutdown()
+
+    errors = sum("error" in result for result in results)
+    hits = pipeline.stats["cache_hits"] + pipeline.stats["coalesced"]
+    print(f"{len(prompts)} prompts in {elapsed:.2f}s ({len(prompts) / elapsed:.1f}/s), "
+          f"{pipeline.stats['requests']} HTTP requests, cache hit rate {hits / len(prompts):.1%}, {errors} errors")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the LLM pipeline against a local fake server.")
+    parser.add_argument("--prompts", type=int, default=1000)
+    parser.add_argument("--distinct", type=int, default=200, help="number of distinct prompts")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake server seconds per response")
+    parser.add_argument("--rpm", type=int, default=3500, help="requests-per-minute budget")
+    parser.add_argument("--tpm", type=int, default=90000, help="tokens-per-minute budget")
+    parser.add_argument("--log", default=None, help="usage log to append to (default: none)")
+    asyncio.run(_benchmark(parser.parse_args()))
@@ -0,0 +1,766 @@
+import argparse
+import csv
+import os
+import struct
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+# Column kinds
+FLOAT, INT, STRING = 0, 1, 2
+
+# Per-block column encodings
+ENC_XOR = 0      # Gorilla XOR of consecutive IEEE doubles (any float, NaN included)
+ENC_DECIMAL = 1  # exact fixed-point decimals (value * 10**scale) as zigzag varint deltas; integers use scale 0
+ENC_STRING = 2   # per-block dictionary of distinct values, then varint indices
+
+# Archive layout (little-endian):
+#   file header  magic "RMLA", version (B), column count (B), timestamp column name
+#                and time format (for CSV export), then per column its kind (B)
+#                and name; strings are prefixed by their byte length (B)
+#   blocks       byte length (I), block header, timestamp section, one section per column
+#   block header row count (I), first and last timestamp in seconds (dd), time
+#                scale (B, timestamps are integers in units of 10**-scale seconds),
+#                timestamp section length (I), then per column its encoding (B),
+#                decimal scale (B), min and max (dd, NaN for strings) and section length (I)
+# Every block stands alone, so a reader can skip any block after reading its header.
+MAGIC = b"RMLA"
+VERSION = 1
+ARCHIVE_SUFFIX = ".rma"
+_BLOCK_LENGTH = struct.Struct("<I")
+_BLOCK_HEADER = struct.Struct("<IddBI")
+_COLUMN_HEADER = struct.Struct("<BBddI")
+_MAX_EXACT = 2 ** 53
+
+BlockInfo = namedtuple("BlockInfo", ["offset", "rows", "start", "end", "ranges"])
+
+
+# --- Bit and varint primitives ---
+
+class BitWriter:
+    def __init__(self):
+        self.out = bytearray()
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value, bits):
+        self._acc = (self._acc << bits) | (value & ((1 << bits) - 1))
+        self._bits += bits
+        if self._bits >= 64:
+            spare = self._bits & 7
+            self.out += (self._acc >> spare).to_bytes(self._bits >> 3, "big")
+            self._acc &= (1 << spare) - 1
+            self._bits = spare
+
+    def finish(self):
+        if self._bits:
+            pad = -self._bits & 7
+            self.out += (self._acc << pad).to_bytes((self._bits + pad) >> 3, "big")
+            self._acc = self._bits = 0
+        return bytes(self.out)
+
+
+class BitReader:
+    def __init__(self, data):
+        # Padding lets read() run past the last value without bounds checks
+        self.data = bytes(data) + b"\0" * 9
+        self.pos = 0
+
+    def read(self, bits):
+        pos = self.pos
+        start = pos >> 3
+        end = (pos + bits + 7) >> 3
+        self.pos = pos + bits
+        return (int.from_bytes(self.data[start:end], "big") >> ((end << 3) - pos - bits)) & ((1 << bits) - 1)
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def _put_varints(out, values):
+    for value in values:
+        while value > 0x7F:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+
+def _get_varints(data, count):
+    """Decode `count` unsigned varints from `data` at once, as uint64."""
+    if count == 0:
+        return np.zeros(0, dtype=np.uint64)
+    raw = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(raw < 0x80)[:count]
+    if len(ends) < count:
+        raise ValueError("truncated varint section")
+    raw = raw[:ends[-1] + 1]
+    starts = np.empty(count, dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    shifts = (np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)) * 7
+    parts = (raw & 0x7F).astype(np.uint64) << shifts.astype(np.uint64)
+    return np.add.reduceat(parts, starts)
+
+
+def _unzigzag_array(values):
+    return (values >> np.uint64(1)).astype(np.int64) ^ -(values & np.uint64(1)).astype(np.int64)
+
+
+# --- Column encoders ---
+
+def _decimal_scale(values, max_scale=9):
+    """Smallest scale at which every value is an exact decimal, or None."""
+    if not len(values) or not np.all(np.isfinite(values)):
+        return None
+    for scale in range(max_scale + 1):
+        factor = 10.0 ** scale
+        scaled = np.round(values * factor)
+        if np.max(np.abs(scaled)) >= _MAX_EXACT:
+            return None
+        if np.array_equal(scaled / factor, values):
+            return scale
+    return None
+
+
+def _encode_decimal(values, scale):
+    scaled = np.round(np.asarray(values, dtype=np.float64) * 10.0 ** scale).astype(np.int64)
+    deltas = np.diff(scaled, prepend=np.int64(0))
+    zigzag = ((deltas << 1) ^ (deltas >> 63)).view(np.uint64)
+    out = bytearray()
+    _put_varints(out, zigzag.tolist())
+    return bytes(out)
+
+
+def _decode_decimal(data, rows, scale, kind):
+    scaled = np.cumsum(_unzigzag_array(_get_varints(data, rows)))
+    if kind == INT:
+        return scaled
+    return scaled / 10.0 ** scale
+
+
+def _encode_xor(values):
+    words = np.asarray(values, dtype=np.float64).view(np.uint64).tolist()
+    writer = BitWriter()
+    writer.write(words[0], 64)
+    previous = words[0]
+    leading = trailing = None
+    for word in words[1:]:
+        xor = word ^ previous
+        previous = word
+        if xor == 0:
+            writer.write(0, 1)
+            continue
+        lead = min(64 - xor.bit_length(), 31)
+        trail = (xor & -xor).bit_length() - 1
+        if leading is not None and lead >= leading and trail >= trailing:
+            # Fits the previous window: '10' + the same meaningful bits
+            writer.write(0b10, 2)
+            writer.write(xor >> trailing, 64 - leading - trailing)
+        else:
+            # New window: '11' + leading zeros (5 bits) + meaningful length (6 bits, 64 stored as 0)
+            leading, trailing = lead, trail
+            meaningful = 64 - lead - trail
+            writer.write((0b11 << 11) | (lead << 6) | (meaningful & 63), 13)
+            writer.write(xor >> trail, meaningful)
+    return writer.finish()
+
+
+def _decode_xor(data, rows):
+    reader = BitReader(data)
+    word = reader.read(64)
+    words = [word]
+    leading = trailing = 0
+    for _ in range(rows - 1):
+        if reader.read(1):
+            if reader.read(1):
+                header = reader.read(11)
+                leading = header >> 6
+                trailing = 64 - leading - ((header & 63) or 64)
+            word ^= reader.read(64 - leading - trailing) << trailing
+        words.append(word)
+    return np.array(words, dtype=np.uint64).view(np.float64)
+
+
+def _encode_strings(values):
+    index = {}
+    codes = [index.setdefault(value, len(index)) for value in values]
+    out = bytearray()
+    _put_varints(out, [len(index)])
+    for value in index:
+        encoded = value.encode()
+        _put_varints(out, [len(encoded)])
+        out += encoded
+    _put_varints(out, codes)
+    return bytes(out)
+
+
+def _decode_strings(data, rows):
+    pos = 0
+
+    def varint():
+        nonlocal pos
+        value = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    words = []
+    for _ in range(varint()):
+        length = varint()
+        words.append(data[pos:pos + length].decode())
+        pos += length
+    return np.array(words, dtype=object)[_get_varints(data[pos:], rows).astype(np.int64)]
+
+
+def _encode_timestamps(units):
+    """Gorilla delta-of-delta: '0' for an unchanged interval, else a prefix and a zigzag value."""
+    writer = BitWriter()
+    previous, previous_delta = units[0], 0
+    for unit in units[1:]:
+        delta = unit - previous
+        dod = _zigzag(delta - previous_delta)
+        if dod == 0:
+            writer.write(0, 1)
+        elif dod < 1 << 7:
+            writer.write((0b10 << 7) | dod, 9)
+        elif dod < 1 << 9:
+            writer.write((0b110 << 9) | dod, 12)
+        elif dod < 1 << 12:
+            writer.write((0b1110 << 12) | dod, 16)
+        else:
+            writer.write(0b1111, 4)
+            writer.write(dod, 64)
+        previous, previous_delta = unit, delta
+    return writer.finish()
+
+
+def _decode_timestamps(data, rows, first):
+    reader = BitReader(data)
+    units = [first]
+    previous, delta = first, 0
+    for _ in range(rows - 1):
+        prefix = reader.read(4)
+        if prefix < 0b1000:
+            reader.pos -= 3
+        elif prefix < 0b1100:
+            reader.pos -= 2
+            delta += _unzigzag(reader.read(7))
+        elif prefix < 0b1110:
+            reader.pos -= 1
+            delta += _unzigzag(reader.read(9))
+        elif prefix == 0b1110:
+            delta += _unzigzag(reader.read(12))
+        else:
+            delta += _unzigzag(reader.read(64))
+        previous += delta
+        units.append(previous)
+    return units
+
+
+def _time_scale(timestamps):
+    # Whole seconds, milliseconds or microseconds; finer timestamps are kept to the microsecond
+    for scale in (0, 3, 6):
+        factor = 10.0 ** scale
+        if np.array_equal(np.round(timestamps * factor) / factor, timestamps):
+            return scale
+    return 6
+
+
+# --- Archive files ---
+
+def _pack_string(value):
+    encoded = value.encode()
+    return struct.pack("<B", len(encoded)) + encoded
+
+
+class ArchiveWriter:
+    """
+    Streaming encoder: rows are buffered and written as one compressed block
+    every `block_rows` rows (and on flush()/close()). Appending to an existing
+    archive requires the same columns and kinds.
+    """
+
+    def __init__(self, path, columns, kinds=None, time_name="timestamp", time_format="", block_rows=4096):
+        self.path = path
+        self.columns = list(columns)
+        self.kinds = list(kinds) if kinds is not None else [FLOAT] * len(self.columns)
+        self.time_name = time_name
+        self.time_format = time_format
+        self.block_rows = block_rows
+        self.blocks_written = 0
+        self._timestamps = []
+        self._rows = []
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            existing = ArchiveReader(path)
+            if existing.columns != self.columns or existing.kinds != self.kinds:
+                raise ValueError(f"{path} holds columns {existing.columns}, not {self.columns}")
+            # Drop a block torn by a crash so new blocks do not land behind it
+            end = existing.complete_size()
+            self._file = open(path, "r+b")
+            self._file.truncate(end)
+            self._file.seek(end)
+        else:
+            self._file = open(path, "wb")
+            header = MAGIC + struct.pack("<BB", VERSION, len(self.columns))
+            header += _pack_string(time_name) + _pack_string(time_format)
+            for name, kind in zip(self.columns, self.kinds):
+                header += struct.pack("<B", kind) + _pack_string(name)
+            self._file.write(header)
+
+    def append(self, timestamp, values):
+        """One row: a timestamp in epoch seconds and values in column order."""
+        self._timestamps.append(timestamp)
+        self._rows.append(values)
+        if len(self._rows) >= self.block_rows:
+            self._write_block()
+
+    def append_many(self, timestamps, columns):
+        """Rows from a timestamp array and {column: array}, like TimeSeriesStore.append_many."""
+        for row in zip(timestamps, *(columns[name] for name in self.columns)):
+            self.append(row[0], row[1:])
+
+    def _write_block(self):
+        if not self._rows:
+            return
+        rows = len(self._rows)
+        timestamps = np.asarray(self._timestamps, dtype=np.float64)
+        order = np.argsort(timestamps, kind="stable")
+        timestamps = timestamps[order]
+        scale = _time_scale(timestamps)
+        units = np.round(timestamps * 10.0 ** scale).astype(np.int64).tolist()
+        sections = [struct.pack("<q", units[0]) + _encode_timestamps(units)]
+
+        headers = []
+        for i, kind in enumerate(self.kinds):
+            raw = [self._rows[j][i] for j in order]
+            if kind == STRING:
+                section = _encode_strings(["" if value is None else str(value) for value in raw])
+                headers.append(_COLUMN_HEADER.pack(ENC_STRING, 0, np.nan, np.nan, len(section)))
+            else:
+                values = np.array([np.nan if value is None else value for value in raw], dtype=np.float64)
+                decimal = 0 if kind == INT else _decimal_scale(values)
+                if decimal is None:
+                    section = _encode_xor(values)
+                else:
+                    section = _encode_decimal(values, decimal)
+                finite = values[np.isfinite(values)]
+                low, high = (float(finite.min()), float(finite.max())) if len(finite) else (np.nan, np.nan)
+                headers.append(_COLUMN_HEADER.pack(ENC_XOR if decimal is None else ENC_DECIMAL, decimal or 0,
+                                                   low, high, len(section)))
+            sections.append(section)
+
+        block = _BLOCK_HEADER.pack(rows, timestamps[0], timestamps[-1], scale, len(sections[0]))
+        block += b"".join(headers) + b"".join(sections)
+        self._file.write(_BLOCK_LENGTH.pack(len(block)) + block)
+        self.blocks_written += 1
+        self._timestamps = []
+        self._rows = []
+
+    def flush(self):
+        self._write_block()
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArchiveReader:
+    """
+    Streaming decoder. Blocks are read one at a time; blocks outside the
+    time range, or whose min/max rule out a `where` filter, are skipped
+    after reading only their header, and only the requested columns are
+    decoded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(4) != MAGIC:
+                raise ValueError(f"{path} is not a log archive")
+            version, count = struct.unpack("<BB", f.read(2))
+            if version != VERSION:
+                raise ValueError(f"{path} is archive version {version}, expected {VERSION}")
+            self.time_name = self._read_string(f)
+            self.time_format = self._read_string(f)
+            self.columns, self.kinds = [], []
+            for _ in range(count):
+                self.kinds.append(f.read(1)[0])
+                self.columns.append(self._read_string(f))
+            self._data_offset = f.tell()
+        self._header_size = _BLOCK_HEADER.size + _COLUMN_HEADER.size * len(self.columns)
+
+    @staticmethod
+    def _read_string(f):
+        return f.read(f.read(1)[0]).decode()
+
+    def _headers(self, f):
+        size = os.fstat(f.fileno()).st_size
+        f.seek(self._data_offset)
+        while True:
+            prefix = f.read(_BLOCK_LENGTH.size)
+            if len(prefix) < _BLOCK_LENGTH.size:
+                return
+            (length,) = _BLOCK_LENGTH.unpack(prefix)
+            offset = f.tell()
+            if length < self._header_size or offset + length > size:
+                # A block torn by a crash mid-write (header or body) ends the archive
+                return
+            header = f.read(self._header_size)
+            rows, start, end, scale, time_length = _BLOCK_HEADER.unpack_from(header)
+            columns = [_COLUMN_HEADER.unpack_from(header, _BLOCK_HEADER.size + i * _COLUMN_HEADER.size)
+                       for i in range(len(self.columns))]
+            yield offset, length, rows, start, end, scale, time_length, columns
+            f.seek(offset + length)
+
+    def complete_size(self):
+        """Bytes up to the end of the last complete block; anything after it is a torn write."""
+        end = self._data_offset
+        with open(self.path, "rb") as f:
+            for offset, length, *_ in self._headers(f):
+                end = offset + length
+        return end
+
+    def blocks(self):
+        """BlockInfo for every block: row count, time range and per-column (min, max)."""
+        with open(self.path, "rb") as f:
+            return [
+                BlockInfo(offset, rows, start, end,
+                          {name: (low, high) for name, (_, _, low, high, _) in zip(self.columns, columns)})
+                for offset, _, rows, start, end, _, _, columns in self._headers(f)
+            ]
+
+    def _skip(self, start, end, where, block_start, block_end, columns):
+        if block_end < start or block_start > end:
+            return True
+        for name, (low, high) in where.items():
+            _, _, block_low, block_high, _ = columns[self.columns.index(name)]
+            # All-NaN blocks have no range and cannot match
+            if block_low != block_low or (low is not None and block_high < low) or (high is not None and block_low > high):
+                return True
+        return False
+
+    def read(self, start=None, end=None, columns=None, where=None):
+        """
+        Yield one {"timestamp": array, column: array, ...} chunk per matching
+        block, for rows in [start, end] whose `where` columns lie in their
+        (low, high) ranges (either bound may be None).
+        """
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        names = self.columns if columns is None else list(columns)
+        where = dict(where or {})
+        for name in list(names) + list(where):
+            if name not in self.columns:
+                raise KeyError(name)
+            if name in where and self.kinds[self.columns.index(name)] == STRING:
+                raise ValueError(f"cannot range-filter string column {name}")
+
+        with open(self.path, "rb") as f:
+            for offset, length, rows, block_start, block_end, scale, time_length, headers in self._headers(f):
+                if self._skip(start, end, where, block_start, block_end, headers):
+                    continue
+                f.seek(offset + self._header_size)
+                body = f.read(length - self._header_size)
+                (first,) = struct.unpack_from("<q", body)
+                timestamps = np.array(_decode_timestamps(body[8:time_length], rows, first), dtype=np.float64)
+                timestamps /= 10.0 ** scale
+
+                positions = {}
+                pos = time_length
+                for name, header in zip(self.columns, headers):
+                    positions[name] = (pos, header)
+                    pos += header[4]
+                chunk = {"timestamp": timestamps}
+                for name in dict.fromkeys(names + list(where)):
+                    pos, (encoding, decimal, _, _, section_length) = positions[name]
+                    section = body[pos:pos + section_length]
+                    kind = self.kinds[self.columns.index(name)]
+                    if encoding == ENC_STRING:
+                        chunk[name] = _decode_strings(section, rows)
+                    elif encoding == ENC_DECIMAL:
+                        chunk[name] = _decode_decimal(section, rows, decimal, kind)
+                    else:
+                        chunk[name] = _decode_xor(section, rows)
+
+                mask = (timestamps >= start) & (timestamps <= end)
+                for name, (low, high) in where.items():
+                    if low is not None:
+                        mask &= chunk[name] >= low
+                    if high is not None:
+                        mask &= chunk[name] <= high
+                if not mask.all():
+                    chunk = {key: values[mask] for key, values in chunk.items()}
+                if len(chunk["timestamp"]):
+                    yield {key: chunk[key] for key in ["timestamp"] + names}
+
+    def query(self, start=None, end=None, columns=None, where=None):
+        """Every matching row at once, in the same shape as TimeSeriesStore.query()."""
+        names = self.columns if columns is None else list(columns)
+        parts = list(self.read(start, end, names, where))
+        if not parts:
+            return {key: np.zeros(0) for key in ["timestamp"] + names}
+        return {key: np.concatenate([part[key] for part in parts]) for key in ["timestamp"] + names}
+
+
+# --- Converting the existing logs ---
+
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _parse_timestamp(value):
+    """Epoch seconds from an epoch number or a 'YYYY-mm-dd HH:MM:SS[.ffffff]' string, and its format."""
+    value = value.strip()
+    try:
+        return float(value), ""
+    except ValueError:
+        pass
+    if "." in value:
+        return datetime.strptime(value, _TIME_FORMAT + ".%f").timestamp(), _TIME_FORMAT
+    return datetime.strptime(value, _TIME_FORMAT).timestamp(), _TIME_FORMAT
+
+
+def _infer_kind(current, value):
+    if current == STRING:
+        return STRING
+    if value == "":
+        # Missing readings are NaN, which integers cannot hold
+        return FLOAT
+    if current == INT:
+        try:
+            int(value)
+            return INT
+        except ValueError:
+            pass
+    try:
+        float(value)
+        return FLOAT
+    except ValueError:
+        return STRING
+
+
+def _convert(value, kind):
+    if kind == STRING:
+        return value
+    if value == "":
+        return None
+    try:
+        return int(value) if kind == INT else float(value)
+    except ValueError:
+        return None
+
+
+def _pad(cells, count):
+    return (cells + [""] * count)[:count]
+
+
+def archive_csv(path, output=None, block_rows=4096):
+    """
+    Compress a CSV log whose first column is a timestamp (resource_logs.csv,
+    resource_log.csv, llm_usage_logs.csv). Column kinds are inferred in a
+    first pass; the second pass streams rows into the archive. Rows with an
+    unparseable timestamp are skipped. Returns (output path, rows archived).
+    """
+    output = output or path + ARCHIVE_SUFFIX
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        kinds = [INT] * (len(header) - 1)
+        time_format = None
+        for row in reader:
+            if not row:
+                continue
+            try:
+                row_format = _parse_timestamp(row[0])[1]
+            except ValueError:
+                continue
+            if time_format is None:
+                time_format = row_format
+            # Short rows are padded with "" below, so their missing cells count here too
+            for i, value in enumerate(_pad(row[1:], len(kinds))):
+                kinds[i] = _infer_kind(kinds[i], value.strip())
+
+    count = 0
+    with open(path, newline="") as f, ArchiveWriter(output, header[1:], kinds, header[0], time_format or "",
+                                                   block_rows) as writer:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            if not row:
+                continue
+            try:
+                timestamp = _parse_timestamp(row[0])[0]
+            except ValueError:
+                continue
+            row = _pad(row[1:], len(kinds))
+            writer.append(timestamp, [_convert(value.strip(), kind) for value, kind in zip(row, kinds)])
+            count += 1
+    return output, count
+
+
+def archive_log(path, output=None, block_rows=4096, interval=1.0):
+    """Compress any of the resource or LLM usage logs; returns (output path, rows archived)."""
+    if path.endswith(".txt"):
+        from timeseries_store import read_legacy_text_log
+
+        timestamps, columns = read_legacy_text_log(path, interval=interval)
+        output = output or path + ARCHIVE_SUFFIX
+        with ArchiveWriter(output, ["cpu", "memory", "disk"], time_name="timestamp", block_rows=block_rows) as writer:
+            # float32 readings back to the decimals they were logged as (82.8, not 82.80000305175781)
+            writer.append_many(timestamps, {name: [float(str(v)) for v in columns[name]]
+                                            for name in ("cpu", "memory", "disk")})
+        return output, len(timestamps)
+    return archive_csv(path, output, block_rows)
+
+
+def _format_value(value, kind):
+    if kind == STRING:
+        return value
+    if value != value:
+        return ""
+    return str(int(value)) if kind == INT else repr(float(value))
+
+
+def export_csv(path, output):
+    """Write an archive back out as CSV, with timestamps in their original format."""
+    reader = ArchiveReader(path)
+    rows = 0
+    with open(output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([reader.time_name] + reader.columns)
+        for chunk in reader.read():
+            for i, timestamp in enumerate(chunk["timestamp"].tolist()):
+                if reader.time_format:
+                    moment = datetime.fromtimestamp(timestamp)
+                    stamp = moment.strftime(reader.time_format + (".%f" if moment.microsecond else ""))
+                else:
+                    stamp = repr(timestamp)
+                writer.writerow([stamp] + [_format_value(chunk[name][i], kind)
+                                           for name, kind in zip(reader.columns, reader.kinds)])
+                rows += 1
+    return rows
+
+
+# --- Benchmark ---
+
+def write_sample_logs(directory, rows):
+    """Synthetic resource and LLM usage CSVs shaped like the real ones."""
+    resource = os.path.join(directory, "resource_logs.csv")
+    start = datetime(2024, 12, 17, 11, 0, 0).timestamp()
+    with open(resource, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Time", "CPU Usage (%)", "Memory Usage (%)", "GPU Utilization (%)", "GPU Memory Usage (%)"])
+        for i in range(rows):
+            stamp = datetime.fromtimestamp(start + i * 2 + (i % 7 == 0)).strftime(_TIME_FORMAT)
+            writer.writerow([stamp, round(10 + (i * 37 % 600) / 10, 1), round(70 + (i % 90) / 10, 1), i * 13 % 100, 60 + i % 20])
+
+    usage = os.path.join(directory, "llm_usage_logs.csv")
+    with open(usage, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Timestamp", "Total Tokens", "Prompt Tokens", "Cost", "Completion Tokens", "Model"])
+        for i in range(rows):
+            stamp = datetime.fromtimestamp(start + i * 31.7).strftime(_TIME_FORMAT + ".%f")
+            prompt, completion = 20 + i * 7 % 900, 10 + i * 11 % 400
+            writer.writerow([stamp, prompt + completion, prompt, round((prompt + completion) * 2e-06, 6), completion,
+                             "gpt-4" if i % 3 else "gpt-3.5-turbo"])
+    return resource, usage
+
+
+def _parse_csv(path):
+    # The baseline: what reading a CSV log costs today (csv module plus timestamp parsing)
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader)
+        return [(_parse_timestamp(row[0])[0], *row[1:]) for row in reader if row]
+
+
+def compare_formats(rows=100_000, block_rows=4096):
+    """Size and full-decode time of CSV vs archive, per sample log; returns a list of dicts."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="log-archive-") as directory:
+        for path in write_sample_logs(directory, rows):
+            began = time.perf_counter()
+            archive, _ = archive_csv(path, block_rows=block_rows)
+            encode = time.perf_counter() - began
+            began = time.perf_counter()
+            _parse_csv(path)
+            parse = time.perf_counter() - began
+            reader = ArchiveReader(archive)
+            began = time.perf_counter()
+            reader.query()
+            decode = time.perf_counter() - began
+            results.append({
+                "log": os.path.basename(path),
+                "csv_bytes": os.path.getsize(path),
+                "archive_bytes": os.path.getsize(archive),
+                "encode_seconds": encode,
+                "csv_parse_seconds": parse,
+                "decode_seconds": decode,
+            })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compress resource and LLM usage logs into block archives.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compress_parser = commands.add_parser("compress", help="archive CSV or text logs (writes LOG.rma)")
+    compress_parser.add_argument("logs", nargs="+")
+    compress_parser.add_argument("--block-rows", type=int, default=4096)
+    compress_parser.add_argument("--remove", action="store_true", help="delete each log once archived")
+
+    export_parser = commands.add_parser("export", help="write an archive back out as CSV")
+    export_parser.add_argument("archive")
+    export_parser.add_argument("--output", default=None, help="CSV path (default: the archive name without .rma)")
+
+    info_parser = commands.add_parser("info", help="list an archive's blocks")
+    info_parser.add_argument("archive")
+
+    bench_parser = commands.add_parser("bench", help="compare size and decode time against CSV")
+    bench_parser.add_argument("--rows", type=int, default=100_000)
+
+    args = parser.parse_args()
+    if args.command == "compress":
+        for log in args.logs:
+            output, count = archive_log(log, block_rows=args.block_rows)
+            before, after = os.path.getsize(log), os.path.getsize(output)
+            print(f"{log}: {count} rows, {before} -> {after} bytes ({before / max(after, 1):.1f}x) in {output}")
+            if args.remove:
+                os.remove(log)
+    elif args.command == "export":
+        output = args.output or (args.archive[:-len(ARCHIVE_SUFFIX)] if args.archive.endswith(ARCHIVE_SUFFIX)
+                                 else args.archive + ".csv")
+        print(f"Wrote {export_csv(args.archive, output)} rows to {output}")
+    elif args.command == "info":
+        reader = ArchiveReader(args.archive)
+        print(f"Columns: {', '.join(reader.columns)}")
+        for block in reader.blocks():
+            ranges = ", ".join(f"{name} {low:g}..{high:g}" for name, (low, high) in block.ranges.items() if low == low)
+            print(f"{block.rows} rows {datetime.fromtimestamp(block.start)} .. {datetime.fromtimestamp(block.end)}: {ranges}")
+    else:
+        for result in compare_formats(args.rows):
+            print(f"{result['log']}: {result['csv_bytes'] / args.rows:.1f} -> "
+                  f"{result['archive_bytes'] / args.rows:.1f} bytes/row "
+                  f"({result['csv_bytes'] / result['archive_bytes']:.1f}x smaller); "
+                  f"CSV parse {result['csv_parse_seconds'] * 1000:.0f} ms, "
+                  f"archive decode {result['decode_seconds'] * 1000:.0f} ms, "
+                  f"encode {result['encode_seconds'] * 1000:.0f} ms")
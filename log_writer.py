@@ -0,0 +1,258 @@
+import contextlib
+import csv
+import functools
+import glob
+import io
+import os
+import queue
+import re
+import threading
+import time
+import weakref
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows): appends from several processes are not coordinated
+    fcntl = None
+
+from instrumentation import counter, gauge, histogram
+
+# Fixed schema of the structured resource log; timestamps are Unix epoch seconds
+RESOURCE_LOG_FIELDS = ["timestamp", "cpu", "memory", "disk"]
+
+_STOP = object()
+
+# Queues of the open writers, by log basename. The depth gauge sums them
+# without holding a reference, so a closed writer's queue can be freed.
+_open_queues = {}
+_open_queues_lock = threading.Lock()
+
+
+def _queue_depth(log):
+    with _open_queues_lock:
+        queues = list(_open_queues.get(log, ()))
+    return sum(pending.qsize() for pending in queues)
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """
+    Exclusive advisory lock shared by every process appending to `path`
+    (held on a `path`.lock side file, so rotating `path` does not drop it).
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class BackgroundLogWriter:
+    """
+    Writes CSV records from a bounded queue on a background thread.
+
+    Producers only enqueue, so a slow disk never delays the sampling thread.
+    Records are flushed in batches, and the file is rotated once it grows past
+    `max_bytes` or has been open for `rotate_interval` seconds. When the queue
+    is full, `when_full="drop"` discards the record (counted in `dropped`) and
+    `when_full="block"` waits for room. With `archive_rotated`, each rotated
+    file is compressed into a block archive (see log_archive.py) on the
+    writer thread and the CSV is removed. With `shared`, each batch is
+    appended in one write under file_lock(), so other processes appending
+    to the same file the same way never interleave with it mid-row. If
+    the writer thread dies, write() raises RuntimeError instead of blocking
+    or queueing records nobody will write.
+    """
+
+    def __init__(self, path, fields, max_queue=10000, batch_size=512, flush_interval=1.0,
+                 max_bytes=None, rotate_interval=None, backup_count=5, when_full="drop", echo=None,
+                 archive_rotated=False, shared=False):
+        if when_full not in ("drop", "block"):
+            raise ValueError(f"when_full must be 'drop' or 'block', not {when_full!r}")
+        self.path = path
+        self.fields = list(fields)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.when_full = when_full
+        self.echo = echo
+        self.archive_rotated = archive_rotated
+        self.shared = shared
+        self.dropped = 0
+        self.written = 0
+        self.error = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._file = None
+        self._writer = None
+        self._opened_at = 0.0
+        self._rows_since_open = 0
+        labels = {"log": os.path.basename(path)}
+        self._batch_seconds = histogram("monitor_log_batch_write_seconds", "Time to write and flush one batch.", labels)
+        self._written_total = counter("monitor_log_records_written_total", "Records written to the log.", labels)
+        self._dropped_total = counter("monitor_log_records_dropped_total", "Records dropped on a full queue.", labels)
+        self._rotations_total = counter("monitor_log_rotations_total", "Log file rotations.", labels)
+        with _open_queues_lock:
+            _open_queues.setdefault(labels["log"], weakref.WeakSet()).add(self._queue)
+        gauge("monitor_log_queue_depth", "Records waiting to be written.", labels,
+              fn=functools.partial(_queue_depth, labels["log"]))
+        self._open()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        """Queue one record (a sequence in `fields` order). Returns False if dropped."""
+        self._check_running()
+        if self.when_full == "block":
+            self._put(record)
+            return True
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            self._dropped_total.inc()
+            return False
+
+    def close(self):
+        if self._thread.is_alive():
+            try:
+                self._put(_STOP)
+            except RuntimeError:
+                pass
+        self._thread.join()
+        with _open_queues_lock:
+            _open_queues.get(os.path.basename(self.path), set()).discard(self._queue)
+
+    def _check_running(self):
+        if not self._thread.is_alive():
+            reason = f": {self.error!r}" if self.error is not None else ""
+            raise RuntimeError(f"log writer for {self.path} is not running{reason}")
+
+    def _put(self, item):
+        # Wait for room, but give up as soon as the thread that makes room is gone
+        while True:
+            try:
+                self._queue.put(item, timeout=self.flush_interval)
+                return
+            except queue.Full:
+                self._check_running()
+
+    def _open(self):
+        self._file = open(self.path, "a", newline="")
+        self._writer = csv.writer(self._file)
+        with file_lock(self.path) if self.shared else contextlib.nullcontext():
+            if os.path.getsize(self.path) == 0:
+                self._writer.writerow(self.fields)
+                self._file.flush()
+        self._opened_at = time.monotonic()
+        self._rows_since_open = 0
+
+    def _should_rotate(self):
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            return True
+        if (self.rotate_interval and self._rows_since_open
+                and time.monotonic() - self._opened_at >= self.rotate_interval):
+            return True
+        return False
+
+    def _rotate(self):
+        self._rotations_total.inc()
+        self._file.close()
+        rotated = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}"
+        suffix = 1
+        # An archived rotation leaves only its .rma file (log_archive.ARCHIVE_SUFFIX) behind
+        while os.path.exists(rotated) or os.path.exists(rotated + ".rma"):
+            rotated = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+            suffix += 1
+        os.replace(self.path, rotated)
+        if self.archive_rotated:
+            self._archive(rotated)
+
+        # Keep only the newest `backup_count` rotated files (not the .lock or other side files)
+        backups = sorted(self._backups(), key=os.path.getmtime)
+        for old in backups[:max(0, len(backups) - self.backup_count)]:
+            os.remove(old)
+        self._open()
+
+    def _backups(self):
+        # Exactly the names _rotate() produces: path.YYYYmmdd-HHMMSS[-N][.rma]
+        rotated = re.compile(re.escape(os.path.basename(self.path)) + r"\.\d{8}-\d{6}(-\d+)?(\.rma)?$")
+        candidates = glob.glob(glob.escape(self.path) + ".*")
+        return [path for path in candidates if rotated.match(os.path.basename(path))]
+
+    def _archive(self, rotated):
+        # Imported here so plain CSV logging never loads numpy
+        from log_archive import archive_csv
+
+        try:
+            archive_csv(rotated)
+        except (OSError, ValueError) as e:
+            print(f"Could not archive {rotated}, keeping the CSV: {e}")
+            return
+        os.remove(rotated)
+
+    def _write_batch(self, batch):
+        if self._should_rotate():
+            self._rotate()
+        began = time.perf_counter()
+        if self.shared:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(batch)
+            with file_lock(self.path):
+                self._file.write(buffer.getvalue())
+                self._file.flush()
+        else:
+            self._writer.writerows(batch)
+            self._file.flush()
+        self._batch_seconds.observe(time.perf_counter() - began)
+        self._written_total.inc(len(batch))
+        self.written += len(batch)
+        self._rows_since_open += len(batch)
+        if self.echo is not None:
+            for record in batch:
+                self.echo(record)
+
+    def _run(self):
+        try:
+            self._drain()
+        except Exception as e:
+            self.error = e
+            print(f"Log writer for {self.path} stopped: {e!r}")
+
+    def _drain(self):
+        while True:
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                # Idle: still honour time-based rotation
+                if self.rotate_interval and self._should_rotate():
+                    self._rotate()
+                continue
+
+            # Drain whatever else is waiting, up to one batch
+            batch = []
+            stop = record is _STOP
+            if not stop:
+                batch.append(record)
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stop = True
+                else:
+                    batch.append(record)
+
+            if batch:
+                self._write_batch(batch)
+            if stop:
+                self._file.close()
+                return
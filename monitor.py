@@ -1,12 +1,17 @@
-import psutil
+import time
+from sampler import get_sampler
+
+sampler = get_sampler()
+
+# CPU usage is measured over a one-second window
+time.sleep(1)
+snapshot = sampler.sample()
 
 # Monitor CPU usage
-print(f"CPU Usage: {psutil.cpu_percent(interval=1)}%")
+print(f"CPU Usage: {snapshot.cpu}%")
 
 # Monitor memory usage
-memory = psutil.virtual_memory()
-print(f"Memory Usage: {memory.percent}%")
+print(f"Memory Usage: {snapshot.memory}%")
 
 # Monitor disk usage
-disk = psutil.disk_usage('/')
-print(f"Disk Usage: {disk.percent}%")
+print(f"Disk Usage: {snapshot.disk}%")
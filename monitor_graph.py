@@ -28,47 +28,92 @@
 # plt.show()
 
 
-import psutil
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
-
-# Lists to store data
-cpu_data = []
-memory_data = []
-disk_data = []
+from downsample import axes_width, downsample
+from ring_buffer import RingBuffer
+from sampler import get_sampler
+
+sampler = get_sampler()
+
+# Preallocated history of (CPU, memory, disk) samples and the plot artists
+history = RingBuffer(50, columns=3)
+x_positions = np.arange(history.capacity)
+lines = []
+last_timestamp = None
+
+# Build the figure and its line artists once; frames only update their data
+def setup_figure(window):
+    global history, x_positions
+
+    history = RingBuffer(window, columns=3)
+    x_positions = np.arange(window)
+
+    fig, ax = plt.subplots()
+    lines[:] = [
+        ax.plot([], [], label="CPU Usage (%)", linestyle="--")[0],
+        ax.plot([], [], label="Memory Usage (%)", linestyle="-")[0],
+        ax.plot([], [], label="Disk Usage (%)", linestyle=":")[0],
+    ]
+    ax.set_xlim(0, max(window - 1, 1))
+    ax.set_ylim(0, 100)  # All metrics are in percentages
+    ax.legend(loc="upper right")
+    ax.set_title("Real-Time Resource Usage Monitoring")
+    ax.set_xlabel("Time (most recent)")
+    ax.set_ylabel("Usage (%)")
+    ax.grid(True)
+    fig.tight_layout()
+    return fig
 
 # Update function for the graph
 def update(frame):
-    # Append data to the lists
-    cpu_data.append(psutil.cpu_percent(interval=0))
-    memory_data.append(psutil.virtual_memory().percent)
-    disk_data.append(psutil.disk_usage('/').percent)
-
-    # Keep only the last 50 data points for smooth real-time updates
-    cpu_data[:] = cpu_data[-50:]
-    memory_data[:] = memory_data[-50:]
-    disk_data[:] = disk_data[-50:]
-
-    # Clear the current axes and plot new data
-    plt.cla()
-    plt.plot(cpu_data, label="CPU Usage (%)", linestyle="--")
-    plt.plot(memory_data, label="Memory Usage (%)", linestyle="-")
-    plt.plot(disk_data, label="Disk Usage (%)", linestyle=":")
-    plt.ylim(0, 100)  # All metrics are in percentages
-    plt.legend(loc="upper right")
-    plt.title("Real-Time Resource Usage Monitoring")
-    plt.xlabel("Time (most recent)")
-    plt.ylabel("Usage (%)")
-    plt.grid(True)
-    plt.tight_layout()
-
-    # Save the current frame to a file (optional)
-    plt.savefig("monitor_graph.png")
+    global last_timestamp
+
+    # Append the latest shared snapshot to the ring buffer; without a new
+    # sample the artists already show everything
+    snapshot = sampler.latest()
+    if snapshot.timestamp == last_timestamp:
+        return lines
+    last_timestamp = snapshot.timestamp
+    history.append((snapshot.cpu, snapshot.memory, snapshot.disk))
+
+    # Point the existing artists at the buffer's ordered view (no copies).
+    # Windows wider than the plot are cut to each pixel column's min and max.
+    data = history.view()
+    x = x_positions[:len(history)]
+    width = axes_width(lines[0].axes)
+    for line, series in zip(lines, data):
+        if len(series) > 2 * width:
+            line.set_data(*downsample(x, series, width, method="minmax"))
+        else:
+            line.set_data(x, series)
+    return lines
+
+# Save the current figure to a file (press "s" or use snapshot_interval)
+def save_snapshot(fig, path="monitor_graph.png"):
+    fig.savefig(path)
 
 # Set up the real-time graph
-def run_monitor(interval=1000):
-    # Create the animation
-    ani = FuncAnimation(plt.gcf(), update, interval=interval)
+def run_monitor(interval=1000, window=50, snapshot_interval=None):
+    # Sample at the same rate the graph refreshes
+    sampler.interval = interval / 1000
+    fig = setup_figure(window)
+
+    def on_key(event):
+        if event.key == "s":
+            save_snapshot(fig)
+
+    fig.canvas.mpl_connect("key_press_event", on_key)
+
+    # Optionally write PNG snapshots on a much slower timer than the plot
+    if snapshot_interval:
+        timer = fig.canvas.new_timer(interval=int(snapshot_interval * 1000))
+        timer.add_callback(save_snapshot, fig)
+        timer.start()
+
+    # Create the animation; blitting redraws only the line artists
+    ani = FuncAnimation(fig, update, interval=interval, blit=True, cache_frame_data=False)
 
     # Display the graph
     plt.show()
@@ -77,6 +122,7 @@ def run_monitor(interval=1000):
 if __name__ == "__main__":
     try:
         # Set the update interval in milliseconds (default is 1000 ms = 1 second)
-        run_monitor(interval=1000)
+        # and save a PNG snapshot once a minute
+        run_monitor(interval=1000, snapshot_interval=60)
     except KeyboardInterrupt:
         print("\nMonitoring stopped by user.")
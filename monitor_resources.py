@@ -57,22 +57,35 @@
 #         print("\nMonitoring stopped by user.")
 
 
-import psutil
 import time
+from anomaly import get_anomaly_detector, print_event
+from io_metrics import format_io, get_io_collector
+from process_metrics import format_top, get_process_collector
+from sampler import get_sampler
 
 def monitor_resources(interval=1):
+    sampler = get_sampler()
+    sampler.add_collector("processes", get_process_collector())
+    sampler.add_collector("io", get_io_collector())
+    get_anomaly_detector().subscribe(print_event)
     while True:
+        snapshot = sampler.latest()
+
         # CPU usage
-        cpu_usage = psutil.cpu_percent(interval=0)
-        print(f"CPU Usage: {cpu_usage}%")
+        print(f"CPU Usage: {snapshot.cpu}%")
 
         # Memory usage
-        memory = psutil.virtual_memory()
-        print(f"Memory Usage: {memory.percent}%")
+        print(f"Memory Usage: {snapshot.memory}%")
 
         # Disk usage
-        disk = psutil.disk_usage('/')
-        print(f"Disk Usage: {disk.percent}%")
+        print(f"Disk Usage: {snapshot.disk}%")
+
+        # Disk and network throughput since the previous tick
+        print(f"I/O: {format_io(snapshot.extra.get('io'))}")
+
+        # Busiest processes
+        print(f"Top CPU: {format_top(snapshot.extra.get('processes'))}")
+        print(f"Top memory: {format_top(snapshot.extra.get('processes'), key='by_rss')}")
 
         # Add a delay for the next reading
         time.sleep(interval)
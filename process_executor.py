@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+import resource
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# What a task run in a worker process reports back to the allocator
+TaskResult = namedtuple("TaskResult", ["task_id", "result", "cpu_time", "peak_rss", "cores", "pid"])
+
+# Core set this worker process is pinned to (set by _init_worker)
+_worker_cores = ()
+
+
+def _available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _init_worker(slots, inter_op_threads):
+    global _worker_cores
+    _worker_cores = tuple(slots.get())
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, _worker_cores)
+
+    # Size the TensorFlow / OpenMP thread pools to this worker's cores. These
+    # must be set before TensorFlow is first imported in the process.
+    intra_op_threads = str(len(_worker_cores))
+    os.environ["OMP_NUM_THREADS"] = intra_op_threads
+    os.environ["TF_NUM_INTRAOP_THREADS"] = intra_op_threads
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(inter_op_threads)
+
+
+def _reset_peak_rss():
+    # Linux lets a process reset its high-water mark, so peak RSS is per task
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # Fallback: lifetime peak of the worker (kilobytes on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _run_task(target, task_id, args):
+    _reset_peak_rss()
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    result = target(task_id, *args)
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_time = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return TaskResult(task_id, result, cpu_time, _peak_rss(), _worker_cores, os.getpid())
+
+
+class ProcessTaskExecutor:
+    """
+    Runs each task in a pooled worker process pinned to its own core set.
+
+    Workers split the cores available to the allocator into equal groups,
+    and each worker sizes its intra-op thread pool to its group. A crashing
+    task fails its own future; if it takes its worker down, the pool is
+    rebuilt on the next submit instead of taking the allocator with it.
+    Futures resolve to a TaskResult with the task's CPU time and peak RSS.
+    `max_workers` is clamped so that every worker gets `cores_per_worker`
+    cores of its own.
+    """
+
+    def __init__(self, max_workers=None, cores_per_worker=None, inter_op_threads=1):
+        cores = _available_cores()
+        if cores_per_worker is not None and not 1 <= cores_per_worker <= len(cores):
+            raise ValueError(f"cores_per_worker must be between 1 and {len(cores)}, not {cores_per_worker}")
+        if max_workers is not None and max_workers < 1:
+            raise ValueError(f"max_workers must be at least 1, not {max_workers}")
+        most = len(cores) // (cores_per_worker or 1)
+        max_workers = most if max_workers is None else min(max_workers, most)
+        cores_per_worker = cores_per_worker or len(cores) // max_workers
+        self.max_workers = max_workers
+        self.inter_op_threads = inter_op_threads
+        self.slots = [
+            tuple(cores[i * cores_per_worker:(i + 1) * cores_per_worker])
+            for i in range(max_workers)
+        ]
+        # spawn, not fork: forking a process that already runs threads is unsafe
+        self._context = multiprocessing.get_context("spawn")
+        self._pool = None
+        self._start_pool()
+
+    def _start_pool(self):
+        slots = self._context.Queue()
+        for slot in self.slots:
+            slots.put(slot)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(slots, self.inter_op_threads),
+        )
+
+    def submit(self, target, task_id, *args):
+        try:
+            return self._pool.submit(_run_task, target, task_id, args)
+        except BrokenProcessPool:
+            print("Worker pool broken by a crashed task; restarting it")
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._start_pool()
+            return self._pool.submit(_run_task, target, task_id, args)
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,204 @@
+import argparse
+import heapq
+import os
+import threading
+import time
+from collections import namedtuple
+
+import psutil
+
+# `cpu` is percent of one core (can exceed 100 for multi-threaded processes),
+# `memory_percent` is RSS as a share of physical memory
+ProcessStats = namedtuple("ProcessStats", ["pid", "name", "cpu", "rss", "memory_percent"])
+
+# What the collector hands the sampler each tick
+ProcessTable = namedtuple("ProcessTable", ["count", "by_cpu", "by_rss"])
+
+
+class _Tracked:
+    __slots__ = ("process", "name", "cpu_total", "measured_at", "stats")
+
+    def __init__(self, process, name):
+        self.process = process
+        self.name = name
+        self.cpu_total = None
+        self.measured_at = None
+        self.stats = None
+
+
+class ProcessCollector:
+    """
+    Top-N processes by CPU and by RSS.
+
+    psutil.Process objects are cached by PID across refreshes. A process is
+    read in one oneshot() batch (CPU times and memory, plus the name for
+    processes currently in the table). CPU % comes from CPU-time deltas
+    since that process was last read, so a first sighting reports 0%.
+
+    Not every process is read on every refresh. Processes in the last table
+    or using any CPU are read each time. The idle rest is read in a rotating
+    1/`scan_ticks` slice and keeps its last stats in between. Any process
+    that becomes busy is therefore picked up within `scan_ticks` refreshes.
+    Reused PIDs are caught when the CPU-time counter goes backwards, and
+    every row about to be published is checked against its create_time.
+
+    Refreshes run at most every `min_interval` seconds; in between, the
+    previous table is returned. Register it with
+    `sampler.add_collector("processes", collector)`.
+    """
+
+    def __init__(self, top_n=10, min_interval=2.0, scan_ticks=5):
+        self.top_n = top_n
+        self.min_interval = min_interval
+        self.scan_ticks = scan_ticks
+        self.last_refresh_seconds = 0.0
+        self.last_reads = 0
+        self._total_memory = psutil.virtual_memory().total
+        self._cache = {}
+        self._hot = set()
+        self._ticks = 0
+        self._table = ProcessTable(0, (), ())
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def _track(self, pid, now):
+        process = psutil.Process(pid)
+        tracked = _Tracked(process, process.name())
+        self._cache[pid] = tracked
+        self._read(pid, tracked, now)
+        return tracked
+
+    def _read(self, pid, tracked, now, with_name=False):
+        process = tracked.process
+        with process.oneshot():
+            if with_name:
+                # Names change on exec, so refresh them for rows that are shown
+                tracked.name = process.name()
+            times = process.cpu_times()
+            rss = process.memory_info().rss
+        cpu_total = times.user + times.system
+
+        if tracked.cpu_total is None or cpu_total < tracked.cpu_total:
+            # First sighting, or the counter went backwards: a new process on this PID
+            cpu = 0.0
+        else:
+            elapsed = now - tracked.measured_at
+            cpu = 100.0 * (cpu_total - tracked.cpu_total) / elapsed if elapsed > 0 else 0.0
+        tracked.cpu_total = cpu_total
+        tracked.measured_at = now
+        tracked.stats = ProcessStats(
+            pid, tracked.name, round(cpu, 1), rss, round(rss / self._total_memory * 100, 2)
+        )
+        self.last_reads += 1
+
+    def _build_table(self):
+        stats = [tracked.stats for tracked in self._cache.values() if tracked.stats is not None]
+        return ProcessTable(
+            count=len(stats),
+            by_cpu=tuple(heapq.nlargest(self.top_n, stats, key=lambda s: s.cpu)),
+            by_rss=tuple(heapq.nlargest(self.top_n, stats, key=lambda s: s.rss)),
+        )
+
+    def _verify(self, table, now):
+        # Rows are about to be published: make sure each PID is still the same process
+        reused = False
+        for pid in {stats.pid for stats in table.by_cpu + table.by_rss}:
+            if self._cache[pid].process.is_running():
+                continue
+            reused = True
+            del self._cache[pid]
+            try:
+                self._track(pid, now)
+            except psutil.Error:
+                pass
+        return reused
+
+    def refresh(self):
+        """Read the due processes now and rebuild the top-N table."""
+        began = time.perf_counter()
+        self.last_reads = 0
+        pids = psutil.pids()
+        live = set(pids)
+        for pid in [pid for pid in self._cache if pid not in live]:
+            del self._cache[pid]
+
+        self._ticks += 1
+        now = time.monotonic()
+        for pid in pids:
+            try:
+                tracked = self._cache.get(pid)
+                if tracked is None:
+                    self._track(pid, now)
+                elif pid in self._hot:
+                    self._read(pid, tracked, now, with_name=True)
+                elif (pid + self._ticks) % self.scan_ticks == 0:
+                    self._read(pid, tracked, now)
+            except psutil.NoSuchProcess:
+                self._cache.pop(pid, None)
+            except psutil.AccessDenied:
+                continue
+
+        table = self._build_table()
+        if self._verify(table, now):
+            table = self._build_table()
+
+        self._table = table
+        self._hot = {stats.pid for stats in table.by_cpu + table.by_rss}
+        self._hot.update(pid for pid, tracked in self._cache.items() if tracked.stats and tracked.stats.cpu > 0)
+        self._refreshed_at = now
+        self.last_refresh_seconds = time.perf_counter() - began
+        return table
+
+    def collect(self):
+        with self._lock:
+            if self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.min_interval:
+                return self.refresh()
+            return self._table
+
+    __call__ = collect
+
+
+def format_top(table, limit=3, key="by_cpu"):
+    """One-line summary such as "python (1234) 95.0% CPU 812 MB"."""
+    if table is None:
+        return "n/a"
+    return ", ".join(
+        f"{stats.name} ({stats.pid}) {stats.cpu:.1f}% CPU {stats.rss / 1024 ** 2:.0f} MB"
+        for stats in getattr(table, key)[:limit]
+    ) or "n/a"
+
+
+_default_collector = None
+_default_lock = threading.Lock()
+
+
+def get_process_collector():
+    """Process-wide collector, so every sampler shares one PID cache."""
+    global _default_collector
+    with _default_lock:
+        if _default_collector is None:
+            _default_collector = ProcessCollector(
+                top_n=int(os.getenv("MONITOR_TOP_PROCESSES", "10")),
+                min_interval=float(os.getenv("MONITOR_PROCESS_INTERVAL", "2.0")),
+            )
+        return _default_collector
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the per-refresh cost of the process collector.")
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between refreshes")
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    collector = ProcessCollector(top_n=args.top, min_interval=0)
+    own = psutil.Process()
+    cpu_before = sum(own.cpu_times()[:2])
+    began = time.monotonic()
+    for _ in range(args.ticks):
+        table = collector.refresh()
+        print(f"{table.count} processes, {collector.last_reads} read in {collector.last_refresh_seconds * 1000:.1f} ms; "
+              f"top CPU: {format_top(table, args.top)}")
+        time.sleep(args.interval)
+    overhead = 100.0 * (sum(own.cpu_times()[:2]) - cpu_before) / (time.monotonic() - began)
+    print(f"Collector overhead: {overhead:.2f}% of one core at a {args.interval}s interval")
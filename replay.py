@@ -0,0 +1,388 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+
+import numpy as np
+
+from anomaly import AnomalyDetector, AnomalyGuardPolicy
+from forecast import ForecastPolicy, ResourceForecaster
+from sampler import Snapshot
+from scheduler import AdmissionScheduler, ThresholdPolicy
+from timeseries_store import RESOURCE_COLUMNS, TimeSeriesStore, read_legacy_text_log, read_resource_csv
+from workloads import WORKLOAD_NEEDS
+
+# Replays a recorded (or synthetic) host trace on a virtual clock and runs the
+# allocators' real admission logic (AdmissionScheduler plus a policy) against
+# it. Tasks are not executed: each one adds its usage to the trace for its
+# duration, so a day of history takes seconds to simulate.
+
+# `usage` is what the task really adds to the host once ramped up (percent);
+# `needs` is what it declares to the scheduler
+SimTask = namedtuple("SimTask", ["task_id", "kind", "arrival", "duration", "needs", "usage"])
+
+# Nominal needs per task kind; "train" matches the TensorFlow jobs the allocators submit
+TASK_NEEDS = dict(WORKLOAD_NEEDS, train={"cpu": 30, "memory": 10, "gpu": 20, "gpu_memory": 20})
+# Duration range per kind, in virtual seconds
+TASK_DURATIONS = {"cpu": (60, 600), "memory": (120, 900), "io": (30, 300), "train": (300, 1800)}
+# Seconds a task takes to reach its full usage
+TASK_RAMP = 15.0
+# Without an explicit limit, a run stops this many trace loops after the last arrival
+# (or once every task could have run back to back, if that is later)
+DEFAULT_LOOPS = 3
+
+# Thresholds, concurrency and declared needs of each allocator script. The Ray
+# allocator keeps no reservations and declares no needs by default.
+ALLOCATORS = {
+    "resource_allocator": {
+        "thresholds": {"cpu": 70, "memory": 80}, "max_workers": 2, "ramp_seconds": 10.0,
+        "needs": {"cpu": 30, "memory": 10},
+    },
+    "resource_allocator_tf": {
+        "thresholds": {"cpu": 70, "memory": 80, "gpu": 70, "gpu_memory": 80}, "max_workers": 2, "ramp_seconds": 10.0,
+        "needs": {"cpu": 30, "memory": 10, "gpu": 20, "gpu_memory": 20},
+    },
+    "resource_allocator_ray": {
+        "thresholds": {"cpu": 70, "memory": 80}, "max_workers": 4, "ramp_seconds": 0.0,
+        "needs": {},
+    },
+}
+
+POLICIES = {
+    "threshold": lambda simulation: ThresholdPolicy(),
+    "forecast": lambda simulation: ForecastPolicy(simulation.forecaster),
+    "guarded": lambda simulation: AnomalyGuardPolicy(ForecastPolicy(simulation.forecaster), simulation.detector,
+                                                     clock=simulation.clock, ramp_seconds=TASK_RAMP),
+}
+
+
+class Trace:
+    """
+    Background host usage over time, as a step function of the recorded
+    samples. Gaps longer than `max_gap` seconds (the monitor was not
+    running) are shortened to `max_gap`, and the trace loops if the
+    simulation outlasts it.
+    """
+
+    def __init__(self, timestamps, columns, max_gap=60.0):
+        order = np.argsort(timestamps, kind="stable")
+        timestamps = np.asarray(timestamps, dtype=np.float64)[order]
+        if not len(timestamps):
+            raise ValueError("trace has no samples")
+        gaps = np.diff(timestamps)
+        if max_gap is not None:
+            gaps = np.minimum(gaps, max_gap)
+        self.start = float(timestamps[0])
+        self.offsets = np.concatenate(([0.0], np.cumsum(gaps)))
+        step = float(np.median(gaps)) if len(gaps) else 1.0
+        self.duration = float(self.offsets[-1]) + step
+        self.columns = {
+            name: np.nan_to_num(np.asarray(columns[name], dtype=np.float64)[order]) if name in columns
+            else np.zeros(len(timestamps))
+            for name in RESOURCE_COLUMNS
+        }
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def index(self, elapsed):
+        return int(np.searchsorted(self.offsets, elapsed % self.duration, side="right")) - 1
+
+    def at(self, elapsed):
+        i = self.index(elapsed)
+        return {name: float(values[i]) for name, values in self.columns.items()}
+
+
+def load_trace(path, max_gap=60.0, interval=1.0):
+    """
+    Trace from resource_logs.csv / resource_log.csv, resource_log.txt, a log
+    archive (.rma) or a TimeSeriesStore directory.
+    """
+    if os.path.isdir(path):
+        data = TimeSeriesStore(path).query()
+        return Trace(data.pop("timestamp"), data, max_gap)
+    if path.endswith(".rma"):
+        from log_archive import ArchiveReader
+
+        reader = ArchiveReader(path)
+        data = reader.query()
+        if "cpu" in reader.columns:
+            columns = {name: data[name] for name in RESOURCE_COLUMNS if name in data}
+        else:
+            # Archived resource_logs.csv keeps its original headers: CPU, memory, GPU, GPU memory
+            columns = dict(zip(["cpu", "memory", "gpu", "gpu_memory"], (data[name] for name in reader.columns)))
+        return Trace(data["timestamp"], columns, max_gap)
+    if path.endswith(".csv"):
+        return Trace(*read_resource_csv(path), max_gap)
+    return Trace(*read_legacy_text_log(path, interval=interval), max_gap)
+
+
+def synthetic_trace(hours=24.0, interval=1.0, seed=0):
+    """A day-shaped host trace: a diurnal CPU and GPU cycle, slow memory drift, noise and short bursts."""
+    rng = np.random.default_rng(seed)
+    count = int(hours * 3600 / interval)
+    elapsed = np.arange(count) * interval
+    day = np.sin(2 * np.pi * elapsed / 86400 - np.pi / 2)
+    bursts = np.zeros(count)
+    for start in rng.integers(0, count, size=max(1, int(hours * 2))):
+        bursts[start:start + int(rng.integers(30, 300) / interval)] += rng.uniform(15, 35)
+    cpu = np.clip(25 + 15 * day + rng.normal(0, 4, count) + bursts, 0, 100)
+    memory = np.clip(45 + 10 * day + np.cumsum(rng.normal(0, 0.02, count)), 0, 100)
+    gpu = np.clip(20 + 20 * day + rng.normal(0, 5, count), 0, 100)
+    columns = {"cpu": cpu, "memory": memory, "disk": np.full(count, 55.0), "gpu": gpu,
+               "gpu_memory": np.clip(gpu * 0.8, 0, 100)}
+    return Trace(1_700_000_000 + elapsed, columns, max_gap=None)
+
+
+def task_mix(count, kinds=("cpu", "memory", "io", "train"), arrival_interval=60.0, spread=0.3, seed=0):
+    """
+    `count` tasks cycling through `kinds`, one every `arrival_interval`
+    virtual seconds. Each really uses its nominal needs scaled by a factor
+    in [1 - spread, 1 + spread], so declared needs are only estimates.
+    """
+    rng = np.random.default_rng(seed)
+    tasks = []
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        needs = TASK_NEEDS[kind]
+        usage = {name: value * rng.uniform(1 - spread, 1 + spread) for name, value in needs.items()}
+        low, high = TASK_DURATIONS[kind]
+        tasks.append(SimTask(f"{kind}-{i + 1}", kind, i * arrival_interval, float(rng.uniform(low, high)), needs, usage))
+    return tasks
+
+
+class _VirtualSampler:
+    # The scheduler only reads latest() (for its "Top processes" line) when it defers
+    def __init__(self, simulation):
+        self.simulation = simulation
+        self.interval = simulation.step
+        self.running = True
+
+    def latest(self, max_age=None):
+        return self.simulation.snapshot
+
+
+class _VirtualExecutor:
+    # Records starts; the simulation completes each future at its virtual end time
+    def __init__(self, simulation):
+        self.simulation = simulation
+
+    def submit(self, task, task_id, *args):
+        future = Future()
+        self.simulation.start_task(task, future)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class Simulation:
+    """
+    One allocator configuration and policy replayed over `trace` with
+    `tasks`, advancing a virtual clock `step` seconds at a time. Stops once
+    every task has finished, or after `max_seconds` of virtual time (by
+    default DEFAULT_LOOPS trace loops after the last arrival, so a trace
+    whose background load never drops below a threshold still ends; the
+    report then counts the tasks left undrained). Tasks declare the
+    allocator's fixed needs, or their own nominal needs with `needs="task"`.
+    """
+
+    def __init__(self, trace, tasks, allocator="resource_allocator", policy="forecast", step=1.0, max_seconds=None,
+                 needs="allocator"):
+        config = ALLOCATORS[allocator]
+        if needs not in ("allocator", "task"):
+            raise ValueError(f"needs must be 'allocator' or 'task', not {needs!r}")
+        self.trace = trace
+        self.tasks = sorted(tasks, key=lambda task: task.arrival)
+        self.allocator = allocator
+        self.policy_name = policy
+        self.step = step
+        self.max_seconds = self.default_max_seconds() if max_seconds is None else max_seconds
+        self.thresholds = dict(config["thresholds"])
+        self.declared_needs = config["needs"] if needs == "allocator" else None
+        self.now = trace.start
+        self.snapshot = Snapshot(self.now, 0.0, 0.0, 0.0, {})
+        self.forecaster = ResourceForecaster()
+        self.detector = AnomalyDetector()
+        self.scheduler = AdmissionScheduler(
+            thresholds=self.thresholds, max_workers=config["max_workers"], ramp_seconds=config["ramp_seconds"],
+            sampler=_VirtualSampler(self), check_resources=self.resources, executor=_VirtualExecutor(self),
+            policy=POLICIES[policy](self), clock=self.clock,
+        )
+        self._running = []  # (finish time, started, task, future)
+        self._resources = {}
+        self.waits = []
+        self.finished = 0
+
+    def default_max_seconds(self):
+        if not self.tasks:
+            return 0.0
+        serial = sum(task.duration for task in self.tasks)
+        return self.tasks[-1].arrival + max(DEFAULT_LOOPS * self.trace.duration, serial)
+
+    def clock(self):
+        return self.now
+
+    def resources(self):
+        return self._resources
+
+    def start_task(self, task, future):
+        self.waits.append(self.now - (self.trace.start + task.arrival))
+        self._running.append((self.now + task.duration, self.now, task, future))
+
+    def _usage(self, background):
+        usage = dict(background)
+        for _, started, task, _ in self._running:
+            ramp = min(1.0, (self.now - started) / TASK_RAMP)
+            for name, value in task.usage.items():
+                usage[name] = usage.get(name, 0.0) + value * ramp
+        return {name: min(100.0, value) for name, value in usage.items()}
+
+    def run(self):
+        """Simulate to completion; returns the report dict."""
+        began = time.perf_counter()
+        peaks = {name: 0.0 for name in self.thresholds}
+        over = {name: 0.0 for name in self.thresholds}
+        background_over = 0.0
+        episodes = 0
+        violating = False
+        arrivals = 0
+        last_finish = None
+
+        # The scheduler narrates every start and deferral; keep that out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            while True:
+                elapsed = self.now - self.trace.start
+                while arrivals < len(self.tasks) and self.tasks[arrivals].arrival <= elapsed:
+                    task = self.tasks[arrivals]
+                    needs = task.needs if self.declared_needs is None else self.declared_needs
+                    # Zero needs must stay zero, not fall back to the scheduler's DEFAULT_NEEDS
+                    self.scheduler.submit(task.task_id, task, needs=needs or {name: 0 for name in self.thresholds})
+                    arrivals += 1
+
+                still_running = []
+                for entry in self._running:
+                    if entry[0] <= self.now:
+                        entry[3].set_result(None)
+                        self.finished += 1
+                        last_finish = self.now
+                    else:
+                        still_running.append(entry)
+                self._running = still_running
+
+                background = self.trace.at(elapsed)
+                usage = self._usage(background)
+                self._resources = {name: usage.get(name, 0.0) for name in self.thresholds}
+                self.snapshot = Snapshot(self.now, usage["cpu"], usage["memory"], usage["disk"], {})
+                self.forecaster.update(self._resources, self.now)
+                self.detector.observe(self._resources, self.now)
+
+                breached = False
+                for name, threshold in self.thresholds.items():
+                    peaks[name] = max(peaks[name], usage[name])
+                    if usage[name] > threshold:
+                        over[name] += self.step
+                        breached = True
+                if breached and not violating:
+                    episodes += 1
+                violating = breached
+                if any(background[name] > threshold for name, threshold in self.thresholds.items()):
+                    background_over += self.step
+
+                self.scheduler.admit_pending()
+
+                if self.finished == len(self.tasks):
+                    break
+                if elapsed >= self.max_seconds:
+                    break
+                self.now += self.step
+
+        wall = time.perf_counter() - began
+        simulated = self.now - self.trace.start
+        waits = sorted(self.waits)
+        first_arrival = self.tasks[0].arrival if self.tasks else 0.0
+        return {
+            "allocator": self.allocator,
+            "policy": self.policy_name,
+            "tasks": len(self.tasks),
+            "completed": self.finished,
+            "undrained": len(self.tasks) - self.finished,
+            "drain_seconds": (last_finish - self.trace.start - first_arrival) if last_finish is not None else None,
+            "mean_wait_seconds": float(np.mean(waits)) if waits else 0.0,
+            "p95_wait_seconds": waits[max(0, math.ceil(len(waits) * 0.95) - 1)] if waits else 0.0,
+            "peak": peaks,
+            "violation_seconds": over,
+            "violation_episodes": episodes,
+            "background_violation_seconds": background_over,
+            "simulated_seconds": simulated,
+            "wall_seconds": wall,
+        }
+
+
+def compare_policies(trace, tasks, allocators=("resource_allocator",), policies=tuple(POLICIES), step=1.0,
+                     max_seconds=None, needs="allocator"):
+    """Run every allocator/policy pair over the same trace and tasks."""
+    return [
+        Simulation(trace, tasks, allocator, policy, step, max_seconds, needs).run()
+        for allocator in allocators
+        for policy in policies
+    ]
+
+
+def format_report(reports):
+    lines = [f"{'allocator':24} {'policy':10} {'done':>9} {'drain':>9} {'mean wait':>10} {'p95 wait':>9} "
+             f"{'peak cpu':>9} {'peak mem':>9} {'over (s)':>9} {'bg over':>8} {'episodes':>9} {'speedup':>8}"]
+    for report in reports:
+        drain = report["drain_seconds"]
+        lines.append(
+            f"{report['allocator']:24} {report['policy']:10} {report['completed']:>4}/{report['tasks']:<4} "
+            f"{(f'{drain / 3600:.2f}h' if drain is not None else 'n/a'):>9} "
+            f"{report['mean_wait_seconds']:>9.0f}s {report['p95_wait_seconds']:>8.0f}s "
+            f"{report['peak']['cpu']:>8.1f}% {report['peak']['memory']:>8.1f}% "
+            f"{sum(report['violation_seconds'].values()):>9.0f} {report['background_violation_seconds']:>8.0f} "
+            f"{report['violation_episodes']:>9} "
+            f"{report['simulated_seconds'] / max(report['wall_seconds'], 1e-9):>7.0f}x"
+        )
+    for report in reports:
+        if report["undrained"]:
+            lines.append(f"{report['allocator']}/{report['policy']}: stopped after "
+                         f"{report['simulated_seconds'] / 3600:.2f}h with {report['undrained']} task(s) undrained")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a resource trace through the allocators on a virtual clock.")
+    parser.add_argument("trace", nargs="?", default=None,
+                        help="resource_logs.csv, resource_log.txt, a .rma archive or a store directory "
+                             "(default: a synthetic day)")
+    parser.add_argument("--allocators", nargs="+", default=["resource_allocator"], choices=list(ALLOCATORS))
+    parser.add_argument("--policies", nargs="+", default=list(POLICIES), choices=list(POLICIES))
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--arrival-interval", type=float, default=300.0, help="virtual seconds between task arrivals")
+    parser.add_argument("--hours", type=float, default=24.0, help="length of the synthetic trace")
+    parser.add_argument("--step", type=float, default=1.0, help="virtual seconds per simulation step")
+    parser.add_argument("--max-gap", type=float, default=60.0, help="shorten trace gaps longer than this")
+    parser.add_argument("--max-hours", type=float, default=None,
+                        help=f"stop after this much virtual time (default: {DEFAULT_LOOPS} trace loops after the "
+                             "last arrival)")
+    parser.add_argument("--needs", choices=["allocator", "task"], default="allocator",
+                        help="declare the allocator's fixed needs or each task's nominal needs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace, args.max_gap) if args.trace else synthetic_trace(args.hours, seed=args.seed)
+    tasks = task_mix(args.tasks, arrival_interval=args.arrival_interval, seed=args.seed)
+    max_seconds = args.max_hours * 3600 if args.max_hours is not None else None
+    reports = compare_policies(trace, tasks, args.allocators, args.policies, args.step, max_seconds, args.needs)
+    if args.json:
+        json.dump(reports, sys.stdout, indent=2)
+        print()
+    else:
+        print(format_report(reports))
@@ -1,36 +1,81 @@
-import psutil
+import os
 from queue import Queue
-import threading
-import time
+from anomaly import AnomalyGuardPolicy, get_anomaly_detector, print_event
+from forecast import ForecastPolicy, ResourceForecaster
+from io_metrics import get_io_collector, io_summary
+from process_executor import ProcessTaskExecutor
+from process_metrics import get_process_collector
+from scheduler import AdmissionScheduler
+from sampler import get_sampler
 from simulate_tensorflow_workload import tensorflow_training_task  # Import the TensorFlow task
+from workloads import cpu_burn
+
+_detector = None
+
+# Called by the allocator, not at import: spawned task workers re-import this module
+def start_monitoring():
+    global _detector
+    if _detector is None:
+        # Track the busiest processes so deferrals show what is using the host, and
+        # per-device disk and network rates so I/O-bound hosts stop taking tasks
+        get_sampler().add_collector("processes", get_process_collector())
+        get_sampler().add_collector("io", get_io_collector())
+
+        # Report anomalies on the shared stream; spikes, shifts and leaks also pause admission
+        _detector = get_anomaly_detector()
+        _detector.subscribe(print_event)
+    return _detector
 
 # Check available resources
 def check_resources():
+    snapshot = get_sampler().latest()
     return {
-        "cpu": psutil.cpu_percent(interval=0),
-        "memory": psutil.virtual_memory().percent
+        "cpu": snapshot.cpu,
+        "memory": snapshot.memory,
+        **io_summary(snapshot.extra.get("io")),
     }
 
-# Allocate tasks based on resource thresholds
-def resource_allocator(task_queue, cpu_threshold=70, memory_threshold=80):
+# Allocate tasks based on resource thresholds and per-task reservations.
+# Each task runs in its own pinned worker process (see process_executor), and
+# admission looks at a short-horizon forecast rather than one noisy reading.
+# `disk_io_threshold` is the busiest disk's busy %, `net_io_threshold` the busiest NIC's share of its link speed.
+def resource_allocator(task_queue, cpu_threshold=70, memory_threshold=80, max_workers=2, policy=None,
+                       task=tensorflow_training_task, disk_io_threshold=90, net_io_threshold=90):
+    detector = start_monitoring()
+    if policy is None:
+        policy = AnomalyGuardPolicy(ForecastPolicy(ResourceForecaster().attach(get_sampler())), detector)
+    scheduler = AdmissionScheduler(
+        thresholds={
+            "cpu": cpu_threshold,
+            "memory": memory_threshold,
+            "disk_io": disk_io_threshold,
+            "net_io": net_io_threshold,
+        },
+        max_workers=max_workers,
+        check_resources=check_resources,
+        executor=ProcessTaskExecutor(max_workers=max_workers),
+        policy=policy,
+    )
     while not task_queue.empty():
-        resources = check_resources()
-        print(f"Resources: CPU {resources['cpu']}%, Memory {resources['memory']}%")
-
-        # If resources are below thresholds, start a task
-        if resources["cpu"] < cpu_threshold and resources["memory"] < memory_threshold:
-            task_id, task_params = task_queue.get()
-            threading.Thread(target=tensorflow_training_task, args=(task_id, *task_params)).start()
-        else:
-            print("Resources too high, waiting...")
-        time.sleep(2)
-
-# Create a queue of TensorFlow tasks
-task_queue = Queue()
-for i in range(3):  # 3 TensorFlow tasks
-    # Each task has (task_id, (epochs, batch_size)) as parameters
-    task_queue.put((f"Task-{i+1}", (10, 32)))
+        # Entries are (task_id, task_params) or (task_id, task_params, needs)
+        task_id, task_params, *needs = task_queue.get()
+        scheduler.submit(task_id, task, *task_params, needs=needs[0] if needs else None)
+
+    # Admission is driven by task completions and sampler ticks, not a fixed sleep
+    scheduler.run()
+    scheduler.shutdown()
 
 # Start the resource allocator
 if __name__ == "__main__":
-    resource_allocator(task_queue)
+    # MONITOR_WORKLOAD=synthetic runs deterministic CPU burns instead of TensorFlow
+    synthetic = os.getenv("MONITOR_WORKLOAD") == "synthetic"
+
+    # Create a queue of TensorFlow tasks
+    task_queue = Queue()
+    for i in range(3):  # 3 TensorFlow tasks
+        # Each task has (task_id, (epochs, batch_size), expected host usage in %) as parameters
+        # (for synthetic tasks the parameters are (duration, shape))
+        task_params = (5, "constant") if synthetic else (10, 32)
+        task_queue.put((f"Task-{i+1}", task_params, {"cpu": 30, "memory": 10}))
+
+    resource_allocator(task_queue, task=cpu_burn if synthetic else tensorflow_training_task)
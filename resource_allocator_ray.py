@@ -1,15 +1,36 @@
-import psutil
 import ray
 import time
+from collections import deque
 import numpy as np
-import tensorflow as tf
+from ray.util.scheduling_strategies import NodeAffinitySchedulingStrategy
+from anomaly import AnomalyGuardPolicy, get_anomaly_detector, print_event
+from forecast import ForecastPolicy, ResourceForecaster
+from io_metrics import get_io_collector, io_summary
+from process_metrics import format_top, get_process_collector
+from sampler import get_sampler
+from scheduler import ThresholdPolicy
 
-# Initialize Ray
-ray.init()
+_detector = None
+
+# Called by the allocator, not at import: Ray workers import this module to run tasks
+def start_monitoring():
+    global _detector
+    if _detector is None:
+        sampler = get_sampler()
+        sampler.add_collector("processes", get_process_collector())
+        sampler.add_collector("io", get_io_collector())
+
+        # Report anomalies on the shared stream; spikes, shifts and leaks also pause admission
+        _detector = get_anomaly_detector()
+        _detector.subscribe(print_event)
+    return _detector
 
 # Define TensorFlow task as a remote function
 @ray.remote
 def tensorflow_task(task_id, duration=30):
+    # TensorFlow is only loaded in the Ray worker that runs the task
+    import tensorflow as tf
+
     print(f"Starting TensorFlow Task {task_id}...")
     x_train = np.random.rand(1000, 10)
     y_train = np.random.randint(2, size=(1000, 1))
@@ -23,29 +44,100 @@ def tensorflow_task(task_id, duration=30):
     print(f"Task {task_id} completed.")
     return f"Task {task_id} completed."
 
+# Ray node ids of the live nodes, by hostname (agents are named after their host by default)
+def ray_node_ids():
+    return {node["NodeManagerHostname"]: node["NodeID"] for node in ray.nodes() if node.get("Alive")}
+
 # Resource monitor
 def check_resources():
-    return {"cpu": psutil.cpu_percent(interval=0), "memory": psutil.virtual_memory().percent}
-
-# Allocate tasks with Ray
-def resource_allocator_ray(num_tasks=5, cpu_threshold=70, memory_threshold=80):
-    futures = []
-    for i in range(num_tasks):
-        resources = check_resources()
-        print(f"Resources: CPU {resources['cpu']}%, Memory {resources['memory']}%")
-
-        # Allocate tasks only when resources are available
-        if resources["cpu"] < cpu_threshold and resources["memory"] < memory_threshold:
-            task_id = f"Task-{i+1}"
-            futures.append(tensorflow_task.remote(task_id, duration=5))
-            print(f"Submitted {task_id}")
-        else:
-            print("Resources too high, waiting...")
-            time.sleep(2)
-
-    # Wait for all tasks to complete
-    ray.get(futures)
+    snapshot = get_sampler().latest()
+    return {"cpu": snapshot.cpu, "memory": snapshot.memory, **io_summary(snapshot.extra.get("io"))}
+
+# Allocate tasks with Ray, keeping at most `max_in_flight` submitted at a time.
+# Tasks deferred because resources are too high stay queued and are retried;
+# results are collected as each task finishes. The admit/defer decision comes
+# from `policy` (a short-horizon forecast behind an anomaly guard by default,
+# see forecast.py and anomaly.py). With a cluster.Collector, admission looks
+# at the least loaded agent node that is also a Ray node, and the task is
+# pinned to that node so it runs where it was admitted. Disk and network load
+# (busiest device, in %) are only measured on this host.
+def resource_allocator_ray(num_tasks=5, cpu_threshold=70, memory_threshold=80, max_in_flight=4,
+                           task=tensorflow_task, duration=5, task_cpus=1, task_memory=None, retry_delay=2,
+                           policy=None, task_needs=None, collector=None, disk_io_threshold=90, net_io_threshold=90):
+    if not ray.is_initialized():
+        ray.init()
+
+    thresholds = {"cpu": cpu_threshold, "memory": memory_threshold, "disk_io": disk_io_threshold,
+                  "net_io": net_io_threshold}
+    task_needs = task_needs or {}
+    detector = start_monitoring()
+    sampler = get_sampler()
+    if policy is None and collector is not None:
+        # The forecaster and anomaly detector only see this host
+        policy = ThresholdPolicy()
+    elif policy is None:
+        policy = AnomalyGuardPolicy(ForecastPolicy(ResourceForecaster().attach(sampler)), detector)
+    stop_sampler = not sampler.running
+    sampler.start()
+
+    # Declare per-task requirements so Ray packs tasks onto available CPUs/memory itself
+    options = {"num_cpus": task_cpus}
+    if task_memory is not None:
+        options["memory"] = task_memory
+    remote_task = task.options(**options)
+
+    pending = deque(f"Task-{i+1}" for i in range(num_tasks))
+    in_flight = {}
+    results = {}
+    failed = {}
+
+    try:
+        while pending or in_flight:
+            # Fill the pipeline while there is headroom
+            node_ids = ray_node_ids() if collector is not None and pending else {}
+            while pending and len(in_flight) < max_in_flight:
+                submit = remote_task
+                if collector is not None:
+                    node, resources = collector.least_loaded(among=node_ids)
+                    if resources is None:
+                        print("No live agent nodes in the Ray cluster, waiting...")
+                        break
+                    submit = remote_task.options(
+                        scheduling_strategy=NodeAffinitySchedulingStrategy(node_id=node_ids[node], soft=False)
+                    )
+                else:
+                    resources = check_resources()
+                if not policy.admit(task_needs, resources, {}, thresholds, idle=not in_flight):
+                    print(f"Resources: CPU {resources['cpu']}%, Memory {resources['memory']}%, "
+                          f"Disk I/O {resources.get('disk_io', 0)}%, Network {resources.get('net_io', 0)}%")
+                    print(f"Top processes: {format_top(sampler.latest().extra.get('processes'))}")
+                    print(f"Resources too high, deferring {len(pending)} task(s)...")
+                    break
+                task_id = pending.popleft()
+                in_flight[submit.remote(task_id, duration=duration)] = task_id
+                print(f"Submitted {task_id}" + (f" to {node}" if collector is not None else ""))
+
+            if not in_flight:
+                # Nothing running to wait on: back off before re-checking resources
+                time.sleep(retry_delay)
+                continue
+
+            # Stream completions instead of one barrier at the end
+            done, _ = ray.wait(list(in_flight), num_returns=1, timeout=retry_delay)
+            for ref in done:
+                task_id = in_flight.pop(ref)
+                try:
+                    results[task_id] = ray.get(ref)
+                except Exception as e:
+                    failed[task_id] = e
+                    print(f"{task_id} failed: {e}")
+    finally:
+        # Also on Ctrl-C or a failing ray.wait, so the sampler thread does not outlive the run
+        if stop_sampler:
+            sampler.stop()
+    return results, failed
 
 if __name__ == "__main__":
     print("Starting Resource Allocator with Ray...")
+    ray.init()
     resource_allocator_ray(num_tasks=5)
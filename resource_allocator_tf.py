@@ -1,13 +1,38 @@
-import psutil
 from queue import Queue
-import threading
-import time
-import tensorflow as tf
 import numpy as np
-import random  # For mocking GPU metrics
+from anomaly import AnomalyGuardPolicy, get_anomaly_detector, print_event
+from gpu_metrics import get_gpu_collector, gpu_summary
+from forecast import ForecastPolicy, ResourceForecaster
+from io_metrics import get_io_collector, io_summary
+from process_executor import ProcessTaskExecutor
+from process_metrics import get_process_collector
+from sampler import get_sampler
+from scheduler import AdmissionScheduler
+
+_detector = None
+
+# Called by the allocator, not at import: spawned task workers re-import this
+# module and must not initialise NVML or register collectors of their own
+def start_monitoring():
+    global _detector
+    if _detector is None:
+        # Read every GPU (plus the busiest processes and disk/network rates) alongside CPU and memory on each
+        # sampler tick (set MONITOR_FAKE_GPUS=N to use scripted fake devices on CPU-only hosts)
+        sampler = get_sampler()
+        sampler.add_collector("gpus", get_gpu_collector())
+        sampler.add_collector("processes", get_process_collector())
+        sampler.add_collector("io", get_io_collector())
+
+        # Report anomalies on the shared stream; spikes, shifts and leaks also pause admission
+        _detector = get_anomaly_detector()
+        _detector.subscribe(print_event)
+    return _detector
 
 # Simulated TensorFlow workload
 def tensorflow_task(task_id, duration=30):
+    # TensorFlow is only loaded in the worker process that runs the task
+    import tensorflow as tf
+
     print(f"Starting TensorFlow Task {task_id}...")
 
     # Dummy TensorFlow model training
@@ -25,43 +50,52 @@ def tensorflow_task(task_id, duration=30):
 
     print(f"Task {task_id} completed.")
 
-# Function to check system CPU, memory, and MOCKED GPU resources
+# Function to check system CPU, memory, GPU and I/O resources (busiest GPU, disk and NIC)
 def check_resources():
+    snapshot = get_sampler().latest()
     return {
-        "cpu": psutil.cpu_percent(interval=0),
-        "memory": psutil.virtual_memory().percent,
-        "gpu": random.randint(0, 70),  # Mocked GPU utilization (0% - 70%)
-        "gpu_memory": random.randint(0, 80)  # Mocked GPU memory usage (0% - 80%)
+        "cpu": snapshot.cpu,
+        "memory": snapshot.memory,
+        **gpu_summary(snapshot.extra.get("gpus")),
+        **io_summary(snapshot.extra.get("io")),
     }
 
-# Resource allocator function
-def resource_allocator(task_queue, cpu_threshold=70, memory_threshold=80, gpu_threshold=70, gpu_memory_threshold=80):
+# Resource allocator function: tasks run in pinned worker processes and are
+# admitted while forecast CPU, memory, GPU and disk/network load (plus ramp-up reservations) stay under thresholds
+def resource_allocator(task_queue, cpu_threshold=70, memory_threshold=80, gpu_threshold=70, gpu_memory_threshold=80,
+                       max_workers=2, policy=None, disk_io_threshold=90, net_io_threshold=90):
+    detector = start_monitoring()
+    if policy is None:
+        policy = AnomalyGuardPolicy(ForecastPolicy(ResourceForecaster().attach(get_sampler())), detector)
+    scheduler = AdmissionScheduler(
+        thresholds={
+            "cpu": cpu_threshold,
+            "memory": memory_threshold,
+            "gpu": gpu_threshold,
+            "gpu_memory": gpu_memory_threshold,
+            "disk_io": disk_io_threshold,
+            "net_io": net_io_threshold,
+        },
+        max_workers=max_workers,
+        check_resources=check_resources,
+        executor=ProcessTaskExecutor(max_workers=max_workers),
+        policy=policy,
+    )
     while not task_queue.empty():
-        resources = check_resources()
-        print(f"Resources: CPU {resources['cpu']}%, Memory {resources['memory']}%, GPU {resources['gpu']}%, GPU Memory {resources['gpu_memory']}%")
-
-        # Check if system and mocked GPU resources are available
-        if (resources["cpu"] < cpu_threshold and
-            resources["memory"] < memory_threshold and
-            resources["gpu"] < gpu_threshold and
-            resources["gpu_memory"] < gpu_memory_threshold):
-
-            # Start TensorFlow task
-            task_id, duration = task_queue.get()
-            threading.Thread(target=tensorflow_task, args=(task_id, duration)).start()
-        else:
-            print("Resources too high, waiting...")
-        time.sleep(2)
-
-# Create a queue of TensorFlow tasks
-task_queue = Queue()
-for i in range(5):  # 5 tasks with a duration of 5 epochs each
-    task_queue.put((f"Task-{i+1}", 5))
+        task_id, duration = task_queue.get()
+        scheduler.submit(task_id, tensorflow_task, duration, needs={"cpu": 30, "memory": 10, "gpu": 20, "gpu_memory": 20})
+    scheduler.run()
+    scheduler.shutdown()
 
 # Start the resource allocator
 if __name__ == "__main__":
+    # Create a queue of TensorFlow tasks
+    task_queue = Queue()
+    for i in range(5):  # 5 tasks with a duration of 5 epochs each
+        task_queue.put((f"Task-{i+1}", 5))
+
     try:
-        print("Starting Resource Allocator with TensorFlow Workloads and Mocked GPU Metrics...")
+        print("Starting Resource Allocator with TensorFlow Workloads and GPU Metrics...")
         resource_allocator(task_queue)
     except KeyboardInterrupt:
         print("\nResource Allocator stopped by user.")
@@ -1,57 +1,127 @@
 import os
 import time
 import csv
-import pandas as pd
-import numpy as np
+import io
+import threading
 import streamlit as st
 from dotenv import load_dotenv
-from sklearn.linear_model import LinearRegression
-import matplotlib.pyplot as plt
-import openai
-from azure.identity import DefaultAzureCredential
-from azure.mgmt.monitor import MonitorManagementClient
+from azure_metrics import AzureMetricsFetcher, FakeMonitorClient, parse_vm_list
+from cost_model import CostModel, calculate_cost
+from downsample import axes_width, downsample
+from instrumentation import histogram
+from lazy_import import lazy_import
+from llm_log_cache import LLMUsageLog, ensure_usage_log
+from log_writer import file_lock
+
+# Heavy dependencies are imported when the panel that needs them first runs,
+# so the first render does not wait for pandas, matplotlib, openai or Azure
+pd = lazy_import("pandas")
+plt = lazy_import("matplotlib.pyplot")
 
 # Load environment variables
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
-# Azure credentials setup
-credential = DefaultAzureCredential()
+# Azure settings; VMs are listed as "group/vm" (or bare "vm" in AZURE_RESOURCE_GROUP)
 subscription_id = os.getenv("AZURE_SUBSCRIPTION_ID")
 resource_group = os.getenv("AZURE_RESOURCE_GROUP")
+azure_resource_ids = parse_vm_list(os.getenv("AZURE_VM_NAMES"), subscription_id, resource_group)
 
 # File paths
 llm_log_file = "llm_usage_logs.csv"
 
-# Ensure log file exists
-if not os.path.exists(llm_log_file):
-    with open(llm_log_file, mode="w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow(["Timestamp", "Total Tokens", "Prompt Tokens", "Cost"])
+# Ensure log file exists (and has the Completion Tokens / Model columns);
+# runs under the log's file lock, once per process rather than on every rerun
+ensure_usage_log(llm_log_file)
+
+# Incrementally parsed usage log, shared by every Streamlit session
+@st.cache_resource
+def get_usage_log():
+    return LLMUsageLog(llm_log_file)
+
+# Running cost model persisted next to the log. Loading it only reads the saved
+# sums; panels that use it call synced_cost_model() to fold in unseen log rows.
+@st.cache_resource
+def get_cost_model():
+    return CostModel.for_log(llm_log_file)
+
+def synced_cost_model():
+    cost_model = get_cost_model()
+    cost_model.catch_up(get_usage_log().load())
+    return cost_model
+
+# OpenAI client module, imported and keyed on first use
+@st.cache_resource
+def get_openai():
+    import openai
+
+    openai.api_key = os.getenv("OPENAI_API_KEY")
+    return openai
+
+llm_request_seconds = histogram("monitor_llm_request_seconds", "Latency of one LLM HTTP request.")
+
+# Trend charts, rendered to PNG once per parsed log frame. load() hands back the
+# same frame object until new rows arrive, so reruns reuse the image.
+@st.cache_resource
+def get_trend_cache():
+    return {"frame": None, "png": None, "lock": threading.Lock()}
+
+# Draw one series at the axes' pixel width; markers only while every point is shown
+def plot_trend(ax, series, label, color):
+    x, y = downsample(series.index, series, axes_width(ax))
+    ax.plot(x, y, label=label, marker="o" if len(y) == len(series) else None, linestyle="--", color=color)
+
+def usage_trends_png(df):
+    cache = get_trend_cache()
+    with cache["lock"]:
+        if cache["frame"] is df:
+            return cache["png"]
+
+        fig, ax = plt.subplots(1, 2, figsize=(12, 6))
+
+        plot_trend(ax[0], df["Total Tokens"], "Total Tokens", "blue")
+        ax[0].set_title("Token Usage Over Time")
+        ax[0].set_xlabel("Requests")
+        ax[0].set_ylabel("Tokens")
+        ax[0].legend()
+
+        plot_trend(ax[1], df["Cost"], "Cost", "green")
+        ax[1].set_title("Cost Over Time")
+        ax[1].set_xlabel("Requests")
+        ax[1].set_ylabel("Cost ($)")
+        ax[1].legend()
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png")
+        plt.close(fig)
+        cache["frame"], cache["png"] = df, buffer.getvalue()
+        return cache["png"]
 
 # Function to track OpenAI usage
 def track_openai_usage(prompt, model="gpt-3.5-turbo"):
     try:
-        response = openai.ChatCompletion.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt}
-            ]
-        )
+        with llm_request_seconds.time():
+            response = get_openai().ChatCompletion.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant."},
+                    {"role": "user", "content": prompt}
+                ]
+            )
 
         total_tokens = response["usage"]["total_tokens"]
         prompt_tokens = response["usage"]["prompt_tokens"]
         completion_tokens = response["usage"]["completion_tokens"]
-        cost = calculate_cost(total_tokens, model)
+        cost = calculate_cost(prompt_tokens, completion_tokens, model)
 
-        # Log usage
-        with open(llm_log_file, mode="a", newline="") as file:
+        # Log the request (under the lock LLMPipeline also appends with), then
+        # fold it and any rows other writers added in from the log
+        with file_lock(llm_log_file), open(llm_log_file, mode="a", newline="") as file:
             writer = csv.writer(file)
             writer.writerow([
                 time.strftime("%Y-%m-%d %H:%M:%S"),
-                total_tokens, prompt_tokens, cost
+                total_tokens, prompt_tokens, cost, completion_tokens, model
             ])
+        synced_cost_model()
 
         return {
             "response": response["choices"][0]["message"]["content"],
@@ -63,31 +133,11 @@ def track_openai_usage(prompt, model="gpt-3.5-turbo"):
     except Exception as e:
         return {"error": str(e)}
 
-# Function to calculate cost
-def calculate_cost(total_tokens, model):
-    pricing = {"gpt-3.5-turbo": 0.002, "gpt-4": 0.03}  # Per 1k tokens
-    cost_per_token = pricing.get(model, 0.001)
-    return (total_tokens / 1000) * cost_per_token
-
-# Function to fetch Azure resource metrics
-def fetch_azure_metrics():
-    try:
-        monitor_client = MonitorManagementClient(credential, subscription_id)
-        metrics_data = monitor_client.metrics.list(
-            resource_id=f"/subscriptions/{subscription_id}/resourceGroups/{resource_group}/providers/Microsoft.Compute/virtualMachines/",
-            timespan="PT1H",
-            interval="PT1M",
-            metricnames="Percentage CPU, Network In, Network Out",
-            aggregation="Average"
-        )
-
-        metrics = {}
-        for item in metrics_data.value:
-            metrics[item.name.value] = [data.average for data in item.timeseries[0].data if data.average is not None]
-
-        return metrics
-    except Exception as e:
-        return {"error": str(e)}
+# One metrics fetcher (and Azure client) shared by every session; AZURE_METRICS_FAKE=1 runs offline
+@st.cache_resource
+def get_metrics_fetcher():
+    client = FakeMonitorClient() if os.getenv("AZURE_METRICS_FAKE") == "1" else None
+    return AzureMetricsFetcher(subscription_id, client=client)
 
 # Streamlit App
 st.title("🌟 Resource Monitor with Predictive Insights")
@@ -115,61 +165,57 @@ if st.sidebar.button("Track Usage"):
 st.sidebar.header("Historical LLM Logs")
 if st.sidebar.button("View Historical LLM Usage"):
     try:
-        df = pd.read_csv(llm_log_file, header=0)
+        df = get_usage_log().load()
 
         st.subheader("🗂️ Historical LLM Usage Logs")
         st.dataframe(df, use_container_width=True)
 
         st.subheader("📈 LLM Usage Trends")
-        fig, ax = plt.subplots(1, 2, figsize=(12, 6))
-
-        ax[0].plot(df["Total Tokens"], label="Total Tokens", marker="o", linestyle="--", color="blue")
-        ax[0].set_title("Token Usage Over Time")
-        ax[0].set_xlabel("Requests")
-        ax[0].set_ylabel("Tokens")
-        ax[0].legend()
-
-        ax[1].plot(df["Cost"], label="Cost", marker="o", linestyle="--", color="green")
-        ax[1].set_title("Cost Over Time")
-        ax[1].set_xlabel("Requests")
-        ax[1].set_ylabel("Cost ($)")
-        ax[1].legend()
-
-        st.pyplot(fig)
+        st.image(usage_trends_png(df), use_container_width=True)
     except Exception as e:
         st.error(f"Error loading historical data: {e}")
 
 # Predict Future Token Usage and Costs
 st.sidebar.header("Predict Future Costs")
 future_token_usage = st.sidebar.number_input("Enter future token usage:", min_value=1, step=1)
+cost_model = get_cost_model()
+model_choice = st.sidebar.selectbox("Model", ["All models"] + cost_model.models)
 if st.sidebar.button("Predict Cost"):
     try:
-        df = pd.read_csv(llm_log_file, header=0)
-        df = df.dropna()  # Remove rows with missing values
-
-        df = df[df["Total Tokens"].apply(lambda x: str(x).isdigit())]
-
-        token_usage = df["Total Tokens"].astype(float).values.reshape(-1, 1)
-        costs = df["Cost"].astype(float).values
-
-        model = LinearRegression()
-        model.fit(token_usage, costs)
-
-        predicted_cost = model.predict([[future_token_usage]])[0]
+        # Fold in any rows logged by other processes, then predict in O(1)
+        synced_cost_model()
+        selected_model = None if model_choice == "All models" else model_choice
+        predicted_cost = cost_model.predict(future_token_usage, selected_model)
+        if predicted_cost is None:
+            raise ValueError("no usage has been logged yet")
+        _, completion_rate = cost_model.token_rates(selected_model)
 
         st.subheader("🔮 Future Token Usage Prediction")
         st.metric("Predicted Cost", f"${predicted_cost:.4f}")
+        if completion_rate is not None:
+            st.metric("Cost per 1k Completion Tokens", f"${completion_rate * 1000:.4f}")
     except Exception as e:
         st.error(f"Error during prediction: {e}")
 
 # Azure Resource Metrics
 st.sidebar.header("Azure Resource Metrics")
 if st.sidebar.button("Fetch Azure Metrics"):
-    metrics = fetch_azure_metrics()
-    if "error" in metrics:
-        st.error(metrics["error"])
+    if not azure_resource_ids:
+        st.error("Set AZURE_VM_NAMES to the VMs to monitor, e.g. group/vm-1,group/vm-2")
     else:
+        fetcher = get_metrics_fetcher()
+        results = fetcher.fetch(azure_resource_ids)
         st.subheader("☁️ Azure Resource Metrics")
-        for key, values in metrics.items():
-            st.metric(key, ", ".join([str(round(v, 2)) for v in values]))
-        st.success("Fetched Azure metrics successfully.")
+        for resource_id, metrics in results.items():
+            st.markdown(f"**{resource_id.rsplit('/', 1)[-1]}**")
+            if "error" in metrics:
+                st.error(metrics["error"])
+                continue
+            columns = st.columns(max(len(metrics), 1))
+            for column, (key, points) in zip(columns, metrics.items()):
+                latest = round(points[-1][1], 2) if points else "n/a"
+                column.metric(key, latest)
+            if metrics:
+                frame = pd.DataFrame({key: dict(points) for key, points in metrics.items()})
+                st.line_chart(frame)
+        st.success(f"Fetched Azure metrics for {len(results)} VMs in {fetcher.last_fetch_seconds:.2f}s.")
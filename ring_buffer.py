@@ -0,0 +1,51 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed-capacity, preallocated buffer of samples with O(1) append.
+
+    Every row is written twice, `capacity` slots apart, so the newest
+    `len(self)` samples always sit in one contiguous slice and `view()`
+    can return them oldest-to-newest without copying.
+    """
+
+    def __init__(self, capacity, columns=1, dtype=np.float64):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.columns = columns
+        # Column-major so each metric's ordered view is itself contiguous
+        self._data = np.zeros((columns, 2 * capacity), dtype=dtype)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, values):
+        i = self._next
+        self._data[:, i] = values
+        self._data[:, i + self.capacity] = values
+        self._next = (i + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def view(self):
+        """Return a read-only (columns, len) view, oldest sample first."""
+        start = (self._next - self._size) % self.capacity
+        view = self._data[:, start:start + self._size]
+        view.flags.writeable = False
+        return view
+
+    def column(self, index):
+        return self.view()[index]
+
+    def latest(self):
+        if not self._size:
+            raise IndexError("ring buffer is empty")
+        return self._data[:, (self._next - 1) % self.capacity].copy()
+
+    def clear(self):
+        self._next = 0
+        self._size = 0
@@ -0,0 +1,255 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from timeseries_store import RESOURCE_COLUMNS, TimeSeriesStore, read_legacy_text_log, read_resource_csv
+
+DAY = 24 * 3600
+
+# (resolution in seconds, retention in seconds or None to keep forever)
+RAW_RETENTION = 2 * DAY
+DEFAULT_RESOLUTIONS = [(60, 90 * DAY), (3600, None)]
+
+AGGREGATES = ["min", "max", "mean", "last", "count"]
+
+# Buckets still open at flush(), picked up again by the next pipeline on the directory
+OPEN_BUCKETS = "open_buckets.npz"
+
+
+def rollup_columns(metrics):
+    return [f"{metric}_{aggregate}" for metric in metrics for aggregate in AGGREGATES]
+
+
+class _Bucket:
+    """Running min/max/sum/last/count for every metric in one time bucket."""
+
+    def __init__(self, size):
+        self.start = None
+        self.mins = np.full(size, np.inf)
+        self.maxs = np.full(size, -np.inf)
+        self.sums = np.zeros(size)
+        self.lasts = np.full(size, np.nan)
+        self.counts = np.zeros(size)
+
+    def reset(self, start):
+        self.start = start
+        self.mins.fill(np.inf)
+        self.maxs.fill(-np.inf)
+        self.sums.fill(0.0)
+        self.lasts.fill(np.nan)
+        self.counts.fill(0.0)
+
+    def state(self):
+        return np.vstack([self.mins, self.maxs, self.sums, self.lasts, self.counts])
+
+    def restore(self, start, state):
+        self.start = start
+        self.mins, self.maxs, self.sums, self.lasts, self.counts = (row.copy() for row in state)
+
+    def merge(self, mins, maxs, sums, lasts, counts):
+        # NaN inputs (metric missing from this sample) leave the bucket untouched
+        present = counts > 0
+        np.fmin(self.mins, np.where(present, mins, np.inf), out=self.mins)
+        np.fmax(self.maxs, np.where(present, maxs, -np.inf), out=self.maxs)
+        self.sums += np.where(present, sums, 0.0)
+        self.counts += counts
+        self.lasts = np.where(present, lasts, self.lasts)
+
+    def record(self):
+        # Interleave [min, max, mean, last, count] per metric, matching rollup_columns()
+        empty = self.counts == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = self.sums / self.counts
+        mins = np.where(empty, np.nan, self.mins)
+        maxs = np.where(empty, np.nan, self.maxs)
+        return np.column_stack([mins, maxs, means, self.lasts, self.counts]).ravel()
+
+
+class _Tier:
+    def __init__(self, directory, metrics, resolution, retention):
+        self.resolution = resolution
+        self.retention = retention
+        self.columns = rollup_columns(metrics)
+        self.store = TimeSeriesStore(directory, columns=self.columns, segment_records=max(1024, DAY // resolution))
+        self.bucket = _Bucket(len(metrics))
+
+
+class RollupPipeline:
+    """
+    Keeps raw samples plus min/max/mean/last/count rollups at coarser
+    resolutions (1m and 1h by default).
+
+    Each sample updates the open bucket of the finest tier in O(1); when a
+    bucket closes it is written out and merged into the next tier's bucket,
+    so coarse tiers never re-read raw data. Every tier expires whole
+    segments older than its retention. Only closed buckets reach the tier
+    stores: flush() saves the open ones to a side file, and a pipeline
+    opened on the same directory resumes them, so a bucket is written once.
+    """
+
+    def __init__(self, directory, metrics=RESOURCE_COLUMNS, raw_retention=RAW_RETENTION,
+                 resolutions=DEFAULT_RESOLUTIONS):
+        self.metrics = list(metrics)
+        self.open_path = os.path.join(directory, OPEN_BUCKETS)
+        self.raw_retention = raw_retention
+        self.raw = TimeSeriesStore(os.path.join(directory, "raw"), columns=self.metrics, segment_records=DAY)
+        self.tiers = [
+            _Tier(os.path.join(directory, f"{resolution}s"), self.metrics, resolution, retention)
+            for resolution, retention in sorted(resolutions)
+        ]
+        self._last_expire = 0.0
+        self._load_open()
+
+    def _load_open(self):
+        if not os.path.exists(self.open_path):
+            return
+        with np.load(self.open_path) as saved:
+            if list(saved["metrics"]) != self.metrics:
+                print(f"Ignoring {self.open_path}: saved for metrics {list(saved['metrics'])}")
+                return
+            for tier in self.tiers:
+                key = str(tier.resolution)
+                if f"{key}_start" in saved:
+                    tier.bucket.restore(float(saved[f"{key}_start"]), saved[f"{key}_state"])
+
+    def add(self, timestamp, values):
+        """Record one sample; `values` is a dict keyed by metric name."""
+        # None (metric unavailable) becomes NaN
+        row = np.array([values.get(metric) for metric in self.metrics], dtype=np.float64)
+        self.raw.append(timestamp, row)
+        self._rollup(timestamp, row)
+
+    def _rollup(self, timestamp, row):
+        present = ~np.isnan(row)
+        self._merge(0, timestamp, row, row, np.where(present, row, 0.0), row, present.astype(np.float64))
+
+        # Retention is enforced about once a minute of sample time
+        if timestamp - self._last_expire >= 60:
+            self.expire(timestamp)
+            self._last_expire = timestamp
+
+    def add_snapshot(self, snapshot):
+        values = {"cpu": snapshot.cpu, "memory": snapshot.memory, "disk": snapshot.disk}
+        self.add(snapshot.timestamp, values)
+
+    def attach(self, sampler):
+        sampler.subscribe(self.add_snapshot)
+
+    def _merge(self, level, timestamp, mins, maxs, sums, lasts, counts):
+        if level >= len(self.tiers):
+            return
+        tier = self.tiers[level]
+        start = timestamp - timestamp % tier.resolution
+        bucket = tier.bucket
+        if bucket.start is None:
+            bucket.reset(start)
+        elif start > bucket.start:
+            self._close(level)
+            bucket.reset(start)
+        bucket.merge(mins, maxs, sums, lasts, counts)
+
+    def _close(self, level):
+        tier = self.tiers[level]
+        bucket = tier.bucket
+        if not bucket.counts.any():
+            return
+        tier.store.append(bucket.start, bucket.record())
+        # Cascade the closed bucket into the next (coarser) tier
+        self._merge(level + 1, bucket.start, bucket.mins, bucket.maxs, bucket.sums, bucket.lasts, bucket.counts)
+
+    def flush(self):
+        """Save every open bucket (e.g. before shutdown); they stay open and are resumed on reopen."""
+        arrays = {"metrics": np.array(self.metrics)}
+        for tier in self.tiers:
+            if tier.bucket.start is not None:
+                arrays[f"{tier.resolution}_start"] = np.float64(tier.bucket.start)
+                arrays[f"{tier.resolution}_state"] = tier.bucket.state()
+        partial = self.open_path + ".tmp"
+        with open(partial, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(partial, self.open_path)
+
+    def expire(self, now=None):
+        now = time.time() if now is None else now
+        self.raw.expire(now - self.raw_retention)
+        for tier in self.tiers:
+            if tier.retention is not None:
+                tier.store.expire(now - tier.retention)
+
+    def query(self, metric, start, end=None, max_points=5000):
+        """
+        Return {"timestamp", "min", "max", "mean", "last", "count"} arrays for
+        `metric`, read from the finest tier that still covers `start` and
+        yields at most `max_points` points.
+        """
+        now = time.time()
+        end = now if end is None else end
+        span = max(end - start, 0)
+
+        # Raw samples when they are still retained and few enough
+        if now - start <= self.raw_retention and self.raw.estimate(start, end) <= max_points:
+            raw = self.raw.query(start, end, columns=[metric])
+            values = raw[metric]
+            return {"timestamp": raw["timestamp"], "min": values, "max": values, "mean": values,
+                    "last": values, "count": (~np.isnan(values)).astype(np.float32)}
+
+        chosen = self.tiers[-1]
+        for tier in self.tiers:
+            covers = tier.retention is None or now - start <= tier.retention
+            if covers and span / tier.resolution <= max_points:
+                chosen = tier
+                break
+        columns = [f"{metric}_{aggregate}" for aggregate in AGGREGATES]
+        result = chosen.store.query(start, end, columns=columns)
+        series = {"timestamp": result["timestamp"]}
+        for aggregate, column in zip(AGGREGATES, columns):
+            series[aggregate] = result[column]
+        return series
+
+
+def backfill(pipeline, path, interval=1.0):
+    """Feed an existing CSV or text log through the pipeline in time order."""
+    if path.endswith(".csv"):
+        timestamps, columns = read_resource_csv(path)
+    else:
+        timestamps, columns = read_legacy_text_log(path, interval=interval)
+    order = np.argsort(timestamps, kind="stable")
+    timestamps = timestamps[order]
+    rows = np.column_stack([
+        columns[metric][order] if metric in columns else np.full(len(order), np.nan)
+        for metric in pipeline.metrics
+    ]).astype(np.float64)
+
+    # Raw samples go in as one batch; rollups still update one sample at a time
+    pipeline.raw.append_many(timestamps, {metric: rows[:, i] for i, metric in enumerate(pipeline.metrics)})
+    for timestamp, row in zip(timestamps, rows):
+        pipeline._rollup(timestamp, row)
+    pipeline.flush()
+    return len(order)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record resource samples with multi-resolution rollups.")
+    parser.add_argument("--store", default="resource_history", help="rollup store directory")
+    parser.add_argument("--backfill", nargs="*", default=[], help="logs to import before recording")
+    args = parser.parse_args()
+
+    pipeline = RollupPipeline(args.store)
+    for log in args.backfill:
+        print(f"Backfilled {backfill(pipeline, log)} samples from {log}")
+
+    from sampler import get_sampler
+
+    sampler = get_sampler()
+    pipeline.attach(sampler)
+    sampler.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nRecording stopped by user.")
+    finally:
+        sampler.stop()
+        pipeline.flush()
@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+import psutil
+
+from instrumentation import counter, histogram
+
+# One immutable reading of the host. `extra` holds the results of any
+# registered collectors (GPU, processes, ...) keyed by collector name; a
+# collector that raised on this tick maps to None.
+Snapshot = namedtuple("Snapshot", ["timestamp", "cpu", "memory", "disk", "extra"])
+
+
+def _busy_and_total(times):
+    # Same accounting as psutil: guest time is already included in user/nice
+    total = sum(times) - getattr(times, "guest", 0) - getattr(times, "guest_nice", 0)
+    idle = times.idle + getattr(times, "iowait", 0)
+    return total - idle, total
+
+
+class ResourceSampler:
+    """
+    Shared sampling engine: reads the host once per tick and hands the same
+    immutable Snapshot to every dashboard, logger and allocator attached to it.
+    """
+
+    def __init__(self, interval=1.0, disk_path="/"):
+        self.interval = interval
+        self.disk_path = disk_path
+        self._collectors = {}
+        self._subscribers = []
+        self._lock = threading.Lock()
+        # Serializes sampling so collectors run outside self._lock, one tick at a time
+        self._sample_lock = threading.Lock()
+        self._snapshot = None
+        self._taken_at = 0.0
+        self._cpu_times = psutil.cpu_times()
+        self._thread = None
+        self._stop = threading.Event()
+        self._tick_seconds = histogram("monitor_sampler_tick_seconds", "Time to take one snapshot, collectors included.")
+        self._collector_seconds = {}
+        self._cached_reads = counter("monitor_sampler_reads_total", "latest() calls by outcome.", {"result": "cached"})
+        self._sampled_reads = counter("monitor_sampler_reads_total", "latest() calls by outcome.", {"result": "sampled"})
+        self._subscriber_errors = counter("monitor_sampler_subscriber_errors_total", "Subscriber callbacks that raised.")
+        self._collector_errors = counter("monitor_sampler_collector_errors_total", "Collector calls that raised.")
+
+    def add_collector(self, name, collector):
+        # `collector` is a zero-argument callable run once per tick
+        with self._lock:
+            self._collectors[name] = collector
+            self._collector_seconds[name] = histogram(
+                "monitor_collector_seconds", "Time spent in one collector per tick.", {"collector": name}
+            )
+
+    def subscribe(self, callback):
+        # `callback(snapshot)` runs on the sampling thread after every tick
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _cpu_percent(self):
+        # CPU load is derived from our own cpu_times() deltas so sampling never
+        # disturbs the module-global psutil.cpu_percent() state of other callers
+        times = psutil.cpu_times()
+        busy, total = _busy_and_total(times)
+        last_busy, last_total = _busy_and_total(self._cpu_times)
+        self._cpu_times = times
+        if total <= last_total:
+            return 0.0
+        percent = 100.0 * (busy - last_busy) / (total - last_total)
+        return round(min(100.0, max(0.0, percent)), 1)
+
+    def _collect(self):
+        # Caller holds self._sample_lock; slow collectors do not block latest() readers
+        with self._lock:
+            collectors = [(name, collector, self._collector_seconds[name]) for name, collector in self._collectors.items()]
+        extra = {}
+        for name, collector, seconds in collectors:
+            with seconds.time():
+                try:
+                    extra[name] = collector()
+                except Exception as e:
+                    self._collector_errors.inc()
+                    print(f"Sampler collector {name!r} failed: {e}")
+                    extra[name] = None
+        return extra
+
+    def _take(self):
+        # Caller holds self._sample_lock; self._lock is only taken to publish the result
+        began = time.perf_counter()
+        extra = self._collect()
+        snapshot = Snapshot(
+            timestamp=time.time(),
+            cpu=self._cpu_percent(),
+            memory=psutil.virtual_memory().percent,
+            disk=psutil.disk_usage(self.disk_path).percent,
+            extra=MappingProxyType(extra),
+        )
+        with self._lock:
+            self._snapshot = snapshot
+            self._taken_at = time.monotonic()
+        self._tick_seconds.observe(time.perf_counter() - began)
+        return snapshot
+
+    def _publish(self, snapshot):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                self._subscriber_errors.inc()
+                print(f"Sampler subscriber {callback!r} failed: {e}")
+
+    def sample(self):
+        """Take a fresh snapshot right now and publish it to subscribers."""
+        with self._sample_lock:
+            snapshot = self._take()
+        self._publish(snapshot)
+        return snapshot
+
+    def _fresh(self, max_age):
+        # Caller holds self._lock
+        return self._snapshot is not None and time.monotonic() - self._taken_at < max_age
+
+    def latest(self, max_age=None):
+        """
+        Return the most recent snapshot, sampling only if it is older than
+        `max_age` seconds (defaults to one tick, or two while the background
+        thread is running so consumers never race it).
+        """
+        if max_age is None:
+            max_age = self.interval * (2 if self.running else 1)
+        with self._lock:
+            if self._fresh(max_age):
+                self._cached_reads.inc()
+                return self._snapshot
+        with self._sample_lock:
+            # Another reader may have sampled while this one waited
+            with self._lock:
+                if self._fresh(max_age):
+                    self._cached_reads.inc()
+                    return self._snapshot
+            self._sampled_reads.inc()
+            snapshot = self._take()
+        self._publish(snapshot)
+        return snapshot
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            self.sample()
+            # Keep a fixed cadence; if a tick overran, skip ahead instead of bursting
+            next_tick += self.interval
+            now = time.monotonic()
+            if next_tick < now:
+                next_tick = now
+            self._stop.wait(next_tick - now)
+
+
+_default_sampler = None
+_default_lock = threading.Lock()
+
+
+def get_sampler(interval=1.0):
+    """Return the process-wide sampler shared by every consumer."""
+    global _default_sampler
+    with _default_lock:
+        if _default_sampler is None:
+            _default_sampler = ResourceSampler(interval=interval)
+        return _default_sampler
@@ -0,0 +1,206 @@
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import counter, histogram
+from io_metrics import format_io
+from process_executor import TaskResult
+from process_metrics import format_top
+from sampler import get_sampler
+
+# `needs` maps a resource name ("cpu", "memory", ...) to the share of the host,
+# in percent, the task is expected to use once it has ramped up
+Task = namedtuple("Task", ["task_id", "target", "args", "needs"])
+
+DEFAULT_NEEDS = {"cpu": 25, "memory": 10}
+
+_admission_wait = histogram("monitor_scheduler_admission_wait_seconds", "Time from submit() to a task starting.")
+_decision_seconds = histogram("monitor_scheduler_decision_seconds", "Time to evaluate one admission decision.")
+_decisions = {
+    decision: counter("monitor_scheduler_decisions_total", "Admission decisions by outcome.", {"decision": decision})
+    for decision in ("admitted", "deferred")
+}
+_task_seconds = histogram("monitor_scheduler_task_seconds", "Wall time of a task from start to completion.")
+
+
+class ThresholdPolicy:
+    """
+    Admit while current usage plus reservations plus the task's needs stay
+    under every threshold. An idle scheduler only checks current usage, so a
+    task whose declared needs exceed a threshold on its own can still run.
+    """
+
+    def admit(self, needs, resources, reserved, thresholds, idle):
+        for name, threshold in thresholds.items():
+            used = resources.get(name, 0.0)
+            if idle:
+                if used >= threshold:
+                    return False
+            elif used + reserved.get(name, 0.0) + needs.get(name, 0.0) > threshold:
+                return False
+        return True
+
+
+class _Reservation:
+    def __init__(self, task, admitted_at, baseline):
+        self.task = task
+        self.admitted_at = admitted_at
+        self.baseline = baseline
+
+
+class AdmissionScheduler:
+    """
+    Event-driven task admission with resource reservations.
+
+    A task is admitted when current usage plus the reservations of tasks
+    still ramping up plus the task's own declared needs stay under every
+    threshold. A reservation starts at the task's declared needs and shrinks
+    linearly over `ramp_seconds`, and sooner as the host's measured usage
+    rises to cover it. Admission is re-evaluated whenever a task completes
+    or the sampler publishes a snapshot, and at most `max_workers` tasks run
+    at once. The admit/defer decision itself is delegated to `policy`
+    (ThresholdPolicy by default, see forecast.ForecastPolicy). `clock`
+    replaces time.monotonic, e.g. with a virtual clock (see replay.py).
+    """
+
+    def __init__(self, thresholds=None, max_workers=4, ramp_seconds=10.0,
+                 sampler=None, check_resources=None, executor=None, policy=None, clock=None):
+        self.thresholds = dict(thresholds or {"cpu": 70, "memory": 80})
+        self.max_workers = max_workers
+        self.ramp_seconds = ramp_seconds
+        self.sampler = sampler or get_sampler()
+        self.check_resources = check_resources or self._sampler_resources
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+        self.policy = policy or ThresholdPolicy()
+        self.clock = clock or time.monotonic
+        self.completed = []
+        self._pending = deque()
+        self._running = {}
+        self._submitted_at = {}
+        self._cond = threading.Condition()
+        self._waiting = False
+
+    def _sampler_resources(self):
+        snapshot = self.sampler.latest()
+        return {"cpu": snapshot.cpu, "memory": snapshot.memory}
+
+    def submit(self, task_id, target, *args, needs=None):
+        task = Task(task_id, target, args, dict(needs or DEFAULT_NEEDS))
+        with self._cond:
+            self._pending.append(task)
+            self._submitted_at[task_id] = self.clock()
+            self._cond.notify_all()
+        return task
+
+    def reserved(self, resources, now=None):
+        """Outstanding reservation per resource for tasks still ramping up."""
+        now = self.clock() if now is None else now
+        ramping = [r for r in self._running.values() if now - r.admitted_at < self.ramp_seconds]
+        ramping.sort(key=lambda r: r.admitted_at)
+        totals = {name: 0.0 for name in self.thresholds}
+        for name in totals:
+            if not ramping or name not in resources:
+                continue
+            # Usage that appeared since the oldest ramping task was admitted is
+            # credited to ramping tasks in admission order
+            rise = max(0.0, resources[name] - ramping[0].baseline.get(name, resources[name]))
+            for reservation in ramping:
+                declared = reservation.task.needs.get(name, 0.0)
+                credited = min(declared, rise)
+                rise -= credited
+                decayed = declared * (1.0 - (now - reservation.admitted_at) / self.ramp_seconds)
+                totals[name] += max(0.0, min(decayed, declared - credited))
+        return totals
+
+    def _admissible(self, task, resources, reserved):
+        return self.policy.admit(task.needs, resources, reserved, self.thresholds, idle=not self._running)
+
+    def _schedule(self):
+        # Caller holds self._cond
+        while self._pending:
+            if len(self._running) >= self.max_workers:
+                # A full pool is not a resource decision: wait for a completion quietly
+                return
+            began = time.perf_counter()
+            resources = self.check_resources()
+            reserved = self.reserved(resources)
+            task = self._pending[0]
+            admissible = self._admissible(task, resources, reserved)
+            _decision_seconds.observe(time.perf_counter() - began)
+            _decisions["admitted" if admissible else "deferred"].inc()
+            if not admissible:
+                if not self._waiting:
+                    usage = ", ".join(
+                        f"{name.upper()} {resources.get(name, 0.0):.1f}% (+{reserved[name]:.1f}% reserved)"
+                        for name in self.thresholds
+                    )
+                    print(f"Resources: {usage}")
+                    extra = self.sampler.latest().extra
+                    top = extra.get("processes")
+                    if top is not None:
+                        print(f"Top processes: {format_top(top)}")
+                    if "io" in extra:
+                        print(f"I/O: {format_io(extra['io'])}")
+                    print("Resources too high, waiting...")
+                    self._waiting = True
+                return
+            self._waiting = False
+            self._pending.popleft()
+            now = self.clock()
+            _admission_wait.observe(now - self._submitted_at.pop(task.task_id, now))
+            self._running[task.task_id] = _Reservation(task, now, dict(resources))
+            print(f"Starting {task.task_id}")
+            future = self.executor.submit(task.target, task.task_id, *task.args)
+            future.add_done_callback(lambda f, task=task: self._on_done(task, f))
+
+    def _report(self, task, future):
+        error = future.exception()
+        if error is not None:
+            print(f"{task.task_id} failed: {error!r}")
+            return
+        result = future.result()
+        if isinstance(result, TaskResult):
+            print(
+                f"{task.task_id} finished: CPU time {result.cpu_time:.1f}s, "
+                f"peak RSS {result.peak_rss / 1024 ** 2:.0f} MB, cores {list(result.cores)}"
+            )
+
+    def _on_done(self, task, future):
+        self._report(task, future)
+        with self._cond:
+            reservation = self._running.pop(task.task_id, None)
+            if reservation is not None:
+                _task_seconds.observe(self.clock() - reservation.admitted_at)
+            self.completed.append((task.task_id, future))
+            self._cond.notify_all()
+
+    def admit_pending(self):
+        """Admit whatever the policy allows right now; run() does this on every wakeup."""
+        with self._cond:
+            self._schedule()
+
+    def _on_snapshot(self, snapshot):
+        with self._cond:
+            self._cond.notify_all()
+
+    def run(self):
+        """Admit and run every submitted task; returns once all have finished."""
+        started = not self.sampler.running
+        if started:
+            self.sampler.start()
+        self.sampler.subscribe(self._on_snapshot)
+        try:
+            with self._cond:
+                while self._pending or self._running:
+                    self._schedule()
+                    # Woken by completions and sampler ticks; the timeout is a safety net
+                    self._cond.wait(timeout=self.sampler.interval * 2)
+        finally:
+            self.sampler.unsubscribe(self._on_snapshot)
+            if started:
+                self.sampler.stop()
+        return self.completed
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
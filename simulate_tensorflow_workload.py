@@ -1,10 +1,12 @@
-import tensorflow as tf
 import numpy as np
 
 def tensorflow_training_task(task_id, epochs=10, batch_size=32):
     """
     Simulates TensorFlow model training as a task.
     """
+    # Imported here so schedulers can reference the task without loading TensorFlow
+    import tensorflow as tf
+
     print(f"Starting TensorFlow Task {task_id}...")
 
     # Create dummy data
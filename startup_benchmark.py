@@ -0,0 +1,119 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules that make a cold start slow; the benchmark reports which got loaded
+HEAVY_MODULES = ["pandas", "numpy", "matplotlib", "sklearn", "openai", "azure", "tensorflow", "ray", "httpx"]
+
+# Importable entry points and Streamlit scripts to measure
+IMPORT_TARGETS = ["resource_allocator", "resource_allocator_tf", "resource_allocator_ray", "llm_pipeline"]
+RENDER_TARGETS = ["resource_monitor_web.py", "app.py"]
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_IMPORT_PROBE = """
+import json, sys, time
+began = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - began
+print(json.dumps({{"seconds": elapsed, "loaded": sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+_RENDER_PROBE = """
+import json, sys, time
+began = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+app = AppTest.from_file({script!r}, default_timeout={timeout})
+app.run()
+rendered = time.perf_counter()
+errors = [str(e.value) for e in app.exception]
+print(json.dumps({{"seconds": rendered - imported, "streamlit_import": imported - began,
+                  "errors": errors, "loaded": sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+
+def _probe(code, timeout):
+    """Run `code` in a fresh interpreter; returns its JSON result or {"error": ...}."""
+    try:
+        completed = subprocess.run(
+            [sys.executable, "-c", code], cwd=REPO_DIR, capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {"error": f"timed out after {timeout}s"}
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        return {"error": lines[-1] if lines else f"exit code {completed.returncode}"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure(kind, target, repeat=3, timeout=120):
+    """Median cold-start seconds for one import or first render over `repeat` fresh processes."""
+    if kind == "import":
+        code = _IMPORT_PROBE.format(module=target, heavy=HEAVY_MODULES)
+    else:
+        code = _RENDER_PROBE.format(script=target, timeout=timeout, heavy=HEAVY_MODULES)
+
+    runs = []
+    for _ in range(repeat):
+        result = _probe(code, timeout)
+        if "error" in result:
+            return {"kind": kind, "target": target, "error": result["error"]}
+        runs.append(result)
+    summary = {
+        "kind": kind,
+        "target": target,
+        "seconds": statistics.median(run["seconds"] for run in runs),
+        "loaded": runs[-1]["loaded"],
+    }
+    if runs[-1].get("errors"):
+        summary["render_errors"] = runs[-1]["errors"]
+    return summary
+
+
+def run_benchmark(repeat=3, timeout=120):
+    results = [measure("import", target, repeat, timeout) for target in IMPORT_TARGETS]
+    results += [measure("render", target, repeat, timeout) for target in RENDER_TARGETS]
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold import and first-render latency.")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per target")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--budget", type=float, default=None,
+                        help="exit non-zero if any measured target takes longer (seconds); "
+                             "a target that fails to import or render always does")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write results to this file")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.repeat, args.timeout)
+    over_budget = []
+    failed = []
+    for result in results:
+        label = f"{result['kind']:6} {result['target']}"
+        if "error" in result:
+            print(f"{label}: FAILED ({result['error']})")
+            failed.append(label)
+            continue
+        loaded = ", ".join(result["loaded"]) or "none"
+        print(f"{label}: {result['seconds'] * 1000:.0f} ms (heavy modules loaded: {loaded})")
+        for error in result.get("render_errors", []):
+            print(f"    render error: {error}")
+        if result.get("render_errors"):
+            failed.append(label)
+        if args.budget is not None and result["seconds"] > args.budget:
+            over_budget.append(label)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+    if over_budget:
+        print(f"Over the {args.budget}s budget: {', '.join(over_budget)}")
+    if failed or over_budget:
+        sys.exit(1)
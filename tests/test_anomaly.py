@@ -0,0 +1,94 @@
+from anomaly import SPIKE, AnomalyDetector, AnomalyEvent, AnomalyGuardPolicy, threshold_key
+
+THRESHOLDS = {"cpu": 70, "memory": 80, "gpu": 70, "gpu_memory": 80}
+
+
+class AlwaysAdmit:
+    def admit(self, needs, resources, reserved, thresholds, idle):
+        return True
+
+
+def guard_with(event):
+    detector = AnomalyDetector()
+    detector.recent.append(event)
+    return AnomalyGuardPolicy(AlwaysAdmit(), detector, hold=30.0, clock=lambda: 1010.0)
+
+
+def spike(stream, score=6.0):
+    return AnomalyEvent(1000.0, stream, SPIKE, 99.0, score, f"{stream} spiked")
+
+
+def test_threshold_key_maps_gpu_devices_to_summary_keys():
+    assert threshold_key("gpu0.utilization") == "gpu"
+    assert threshold_key("gpu12.memory") == "gpu_memory"
+    assert threshold_key("gpu0.temperature") == "gpu0.temperature"
+    assert threshold_key("process.python.12.memory") == "process.python.12.memory"
+    assert threshold_key("cpu") == "cpu"
+
+
+def test_gpu_device_spikes_hold_admission():
+    for stream in ("gpu1.utilization", "gpu0.memory", "cpu"):
+        assert not guard_with(spike(stream)).admit({}, {}, {}, THRESHOLDS, idle=False)
+
+
+def test_other_streams_and_downward_moves_do_not_hold():
+    assert guard_with(spike("gpu0.temperature")).admit({}, {}, {}, THRESHOLDS, idle=False)
+    assert guard_with(spike("gpu0.utilization", score=-6.0)).admit({}, {}, {}, THRESHOLDS, idle=False)
+    # No GPU thresholds (CPU-only allocator): GPU events are ignored
+    policy = guard_with(spike("gpu0.utilization"))
+    assert policy.admit({}, {}, {}, {"cpu": 70, "memory": 80}, idle=False)
+
+
+def steady_detector(samples=120):
+    detector = AnomalyDetector()
+    for t in range(samples):
+        wobble = 2.0 if t % 2 else -2.0
+        detector.observe({"cpu": 20.0 + wobble, "memory": 40.0 + wobble / 4}, float(t))
+    return detector
+
+
+def step(detector, start, seconds=10):
+    events = []
+    for t in range(start, start + seconds):
+        events += detector.observe({"cpu": 45.0, "memory": 48.0}, float(t))
+    return events
+
+
+def test_step_from_an_admitted_task_does_not_hold_the_queue():
+    detector = steady_detector()
+    clock = [120.0]
+    policy = AnomalyGuardPolicy(AlwaysAdmit(), detector, hold=30.0, clock=lambda: clock[0], ramp_seconds=15.0)
+    assert policy.admit({}, {}, {}, THRESHOLDS, idle=True)
+
+    # The task starts fast: an instant +25% CPU step right after admission
+    assert any(event.stream == "cpu" and event.score > 0 for event in step(detector, 120))
+    clock[0] = 130.0
+    assert policy.admit({}, {}, {}, THRESHOLDS, idle=False)
+
+
+def test_unexplained_step_still_holds_admission():
+    detector = steady_detector()
+    clock = [120.0]
+    policy = AnomalyGuardPolicy(AlwaysAdmit(), detector, hold=30.0, clock=lambda: clock[0], ramp_seconds=15.0)
+    assert policy.admit({}, {}, {}, THRESHOLDS, idle=True)
+
+    # Well after the admission's ramp, so not caused by it
+    assert step(detector, 200)
+    clock[0] = 205.0
+    assert not policy.admit({}, {}, {}, THRESHOLDS, idle=False)
+
+
+def test_outstanding_reservations_disable_the_guard():
+    policy = guard_with(spike("cpu"))
+    assert policy.admit({}, {}, {"cpu": 12.5, "memory": 0.0}, THRESHOLDS, idle=False)
+    assert not policy.admit({}, {}, {"cpu": 0.0, "memory": 0.0}, THRESHOLDS, idle=False)
+
+
+def test_io_bursts_are_not_held_on():
+    thresholds = dict(THRESHOLDS, disk_io=90, net_io=90)
+    for stream in ("disk_io", "net_io"):
+        assert guard_with(spike(stream)).admit({}, {}, {}, thresholds, idle=False)
+    detector = AnomalyDetector()
+    detector.recent.append(spike("disk_io"))
+    strict = AnomalyGuardPolicy(AlwaysAdmit(), detector, clock=lambda: 1010.0, unguarded=())
+    assert not strict.admit({}, {}, {}, thresholds, idle=False)
@@ -0,0 +1,53 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from azure_metrics import AzureMetricsFetcher, FakeMonitorClient, vm_resource_id
+
+
+def test_concurrent_fetches_share_one_request_per_resource():
+    client = FakeMonitorClient(latency=0.1)
+    fetcher = AzureMetricsFetcher(client=client, metric_names=["Percentage CPU"])
+    resource_ids = [vm_resource_id("sub", "group", f"vm-{i}") for i in range(4)]
+    results = []
+    sessions = [threading.Thread(target=lambda: results.append(fetcher.fetch(resource_ids))) for _ in range(3)]
+    for session in sessions:
+        session.start()
+    for session in sessions:
+        session.join()
+    fetcher.shutdown()
+
+    assert client.calls == len(resource_ids)
+    assert results[0] == results[1] == results[2]
+    for series in results[0].values():
+        stamps = [stamp for stamp, _ in series["Percentage CPU"]]
+        assert stamps == sorted(set(stamps))
+
+
+class _GrowingMinute:
+    """Serves one minute whose average grows each call, as Azure does for the current interval."""
+
+    def __init__(self, minute):
+        self.minute = minute
+        self.timespans = []
+        self.metrics = self
+
+    def list(self, resource_id, timespan, interval, metricnames, aggregation):
+        self.timespans.append(timespan)
+        average = 10.0 * len(self.timespans)
+        data = [SimpleNamespace(time_stamp=self.minute, average=average)]
+        return SimpleNamespace(value=[
+            SimpleNamespace(name=SimpleNamespace(value="Percentage CPU"), timeseries=[SimpleNamespace(data=data)]),
+        ])
+
+
+def test_partial_last_point_is_fetched_again_and_replaced():
+    minute = datetime.now(timezone.utc).replace(second=0, microsecond=0) - timedelta(minutes=1)
+    client = _GrowingMinute(minute)
+    fetcher = AzureMetricsFetcher(client=client, metric_names=["Percentage CPU"], cache_ttl=0)
+    resource_id = vm_resource_id("sub", "group", "vm")
+
+    assert fetcher.fetch([resource_id])[resource_id]["Percentage CPU"] == [(minute, 10.0)]
+    assert fetcher.fetch([resource_id])[resource_id]["Percentage CPU"] == [(minute, 20.0)]
+    fetcher.shutdown()
+    assert client.timespans[1].startswith(minute.isoformat())
@@ -0,0 +1,46 @@
+from benchmark_suite import BENCHMARKS, _result, compare, run_suite
+
+
+def test_compare_flags_slowdowns_and_missing_results():
+    baseline = {"results": [
+        _result("store.full_query", 10.0, "ms"),
+        _result("store.append_throughput", 1000.0, "records/s", "higher"),
+        _result("rollups.add", 1.0, "us/sample"),
+    ]}
+    report = {"benchmarks": ["store"], "results": [_result("store.full_query", 13.0, "ms")]}
+    assert compare(report, baseline) == [
+        "store.append_throughput: missing from this run",
+        "store.full_query: 10 -> 13 ms",
+    ]
+    # rollups did not run, so its absence is not a regression
+    report["results"].append(_result("store.append_throughput", 900.0, "records/s", "higher"))
+    assert compare(report, baseline) == ["store.full_query: 10 -> 13 ms"]
+
+
+def test_failed_benchmark_is_recorded_off_stdout(monkeypatch, capsys):
+    def broken(scale, workdir):
+        print("progress")
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(BENCHMARKS, "broken", broken)
+    report = run_suite(["broken"])
+    assert report["failures"] == {"broken": "RuntimeError('boom')"}
+    assert report["results"] == []
+    out, err = capsys.readouterr()
+    assert out == ""
+    assert "Benchmark broken failed" in err
+
+
+def test_failed_startup_targets_are_recorded(monkeypatch):
+    import startup_benchmark
+
+    def run_benchmark(repeat):
+        return [
+            {"kind": "import", "target": "sampler", "seconds": 0.05},
+            {"kind": "import", "target": "resource_allocator_ray", "error": "ModuleNotFoundError: ray"},
+        ]
+
+    monkeypatch.setattr(startup_benchmark, "run_benchmark", run_benchmark)
+    report = run_suite(["startup"])
+    assert [result["name"] for result in report["results"]] == ["startup.import.sampler"]
+    assert report["failures"] == {"startup": "startup.import.resource_allocator_ray: ModuleNotFoundError: ray"}
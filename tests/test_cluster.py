@@ -0,0 +1,134 @@
+import socket
+import time
+
+import pytest
+
+import instrumentation
+from cluster import _LENGTH, Agent, Collector, FrameDecoder, FrameEncoder, read_header
+
+COLUMNS = ["cpu", "memory"]
+
+
+def batch(start, count):
+    return [(start + i, {"cpu": 10.0 + i, "memory": 50.25 - i}) for i in range(count)]
+
+
+def test_frames_round_trip():
+    encoder = FrameEncoder("node-a", columns=COLUMNS, keyframe_interval=4)
+    decoder = FrameDecoder()
+    for n in range(10):
+        samples = batch(1000.0 + 3 * n, 3)
+        header = read_header(frame := encoder.encode(samples))
+        assert header.node == "node-a"
+        decoded = decoder.decode(header, frame)
+        assert decoded == [(t, [r["cpu"], r["memory"]]) for t, r in samples]
+
+
+@pytest.mark.parametrize("interval", [1, 3, 5])
+def test_keyframe_every_interval_frames(interval):
+    encoder = FrameEncoder("node-a", columns=COLUMNS, keyframe_interval=interval)
+    kinds = [read_header(encoder.encode(batch(i, 1))).keyframe for i in range(3 * interval)]
+    assert kinds == ([True] + [False] * (interval - 1)) * 3
+    encoder.reset()
+    assert read_header(encoder.encode(batch(99, 1))).keyframe
+
+
+def test_decoder_rejects_deltas_after_a_gap_until_the_next_keyframe():
+    encoder = FrameEncoder("node-a", columns=COLUMNS, keyframe_interval=3)
+    decoder = FrameDecoder()
+    frames = [encoder.encode(batch(i, 2)) for i in range(0, 12, 2)]
+    del frames[1]  # lost datagram
+    applied = [decoder.decode(read_header(frame), frame) is not None for frame in frames]
+    assert applied == [True, False, True, True, True]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_collector_drops_only_the_connection_whose_handler_raised(monkeypatch):
+    collector = Collector(host="127.0.0.1", port=0, columns=COLUMNS).start()
+    ingest = collector._ingest
+
+    def picky_ingest(frame, transport, address):
+        if read_header(frame).node == "bad":
+            raise RuntimeError("cannot handle this node")
+        ingest(frame, transport, address)
+
+    monkeypatch.setattr(collector, "_ingest", picky_ingest)
+    try:
+        bad = socket.create_connection(("127.0.0.1", collector.port))
+        frame = FrameEncoder("bad", columns=COLUMNS).encode(batch(0, 1))
+        bad.sendall(_LENGTH.pack(len(frame)) + frame)
+        bad.settimeout(5.0)
+        assert bad.recv(1) == b""  # closed by the collector
+        bad.close()
+
+        agent = Agent(("127.0.0.1", collector.port), node="good").start()
+        agent.push(time.time(), {"cpu": 12.0, "memory": 34.0})
+        assert wait_for(lambda: [status.node for status in collector.nodes()] == ["good"])
+        agent.stop()
+    finally:
+        collector.stop()
+
+
+def test_least_loaded_can_be_limited_to_some_nodes():
+    collector = Collector(columns=COLUMNS)
+    for name, cpu in (("busy", 90.0), ("idle", 5.0), ("medium", 40.0)):
+        frame = FrameEncoder(name, columns=COLUMNS).encode([(time.time(), {"cpu": cpu, "memory": 20.0})])
+        collector._ingest(frame, "udp", ("10.0.0.1", 9109))
+    assert collector.least_loaded()[0] == "idle"
+    assert collector.least_loaded(among={"busy", "medium"}) == ("medium", {"cpu": 40.0, "memory": 20.0})
+    assert collector.least_loaded(among=set()) == (None, None)
+
+
+def test_node_gauge_counts_started_collectors_only():
+    collectors = [Collector(host="127.0.0.1", port=0, columns=COLUMNS).start() for _ in range(2)]
+    try:
+        for n, collector in enumerate(collectors):
+            frame = FrameEncoder(f"node-{n}", columns=COLUMNS).encode([(time.time(), {"cpu": 1.0, "memory": 2.0})])
+            collector._ingest(frame, "udp", ("10.0.0.1", 9109))
+        nodes = instrumentation.gauge("monitor_cluster_nodes")
+        assert nodes.fn() == 2
+        collectors[0].stop()
+        assert nodes.fn() == 1
+    finally:
+        collectors[1].stop()
+    assert nodes.fn() == 0
+
+
+@pytest.mark.parametrize("transport", ["tcp", "udp"])
+def test_agents_stream_to_the_collector_over_real_sockets(transport):
+    collector = Collector(host="127.0.0.1", port=0, columns=COLUMNS).start()
+    agents = [Agent(("127.0.0.1", collector.port), node=f"{transport}-{n}", transport=transport,
+                    keyframe_interval=3).start() for n in range(2)]
+    try:
+        for i in range(10):
+            for n, agent in enumerate(agents):
+                agent.push(1000.0 + i, {"cpu": 10.0 * n + i, "memory": 50.25})
+            time.sleep(0.01)
+        names = [agent.node for agent in agents]
+        assert wait_for(lambda: [(status.node, status.samples) for status in collector.nodes()]
+                        == [(name, 10) for name in names])
+        for n, status in enumerate(collector.nodes()):
+            assert status.transport == transport
+            assert status.latest == {"timestamp": 1009.0, "cpu": 10.0 * n + 9, "memory": 50.25}
+            timestamps, values = collector.series(status.node)
+            assert list(timestamps) == [1000.0 + i for i in range(10)]
+            assert list(values["cpu"]) == [10.0 * n + i for i in range(10)]
+    finally:
+        for agent in agents:
+            agent.stop()
+        collector.stop()
+
+
+def test_stopping_a_collector_that_never_started():
+    collector = Collector(port=0)
+    collector.stop()
+    collector.start().stop()
+    collector.stop()
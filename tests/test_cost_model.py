@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+
+from cost_model import ALL_MODELS, CostModel
+
+
+def usage_frame(rows):
+    return pd.DataFrame({
+        "Timestamp": [f"2024-12-17 11:00:{i:02d}" for i in range(rows)],
+        "Total Tokens": [30 + 10 * i for i in range(rows)],
+        "Prompt Tokens": [20 + 7 * i for i in range(rows)],
+        "Cost": [(30 + 10 * i) * 2e-06 for i in range(rows)],
+        "Completion Tokens": [10 + 3 * i for i in range(rows)],
+        "Model": ["gpt-4" if i % 3 else "gpt-3.5-turbo" for i in range(rows)],
+    })
+
+
+def assert_same_stats(model, reference):
+    assert model.stats.keys() == reference.stats.keys()
+    for name, stats in reference.stats.items():
+        assert model.stats[name] == pytest.approx(stats)
+
+
+def test_catch_up_folds_only_new_rows(tmp_path):
+    frame = usage_frame(10)
+    model = CostModel(str(tmp_path / "model.json"))
+    assert model.catch_up(frame.iloc[:6]) == 6
+    assert model.catch_up(frame) == 4
+    assert model.catch_up(frame) == 0
+
+    reference = CostModel(str(tmp_path / "reference.json"))
+    reference.catch_up(frame)
+    assert_same_stats(model, reference)
+    assert model.stats[ALL_MODELS]["n"] == 10
+    assert model.predict(100) == pytest.approx(100 * 2e-06)
+
+
+def test_two_writers_sharing_a_log_stay_consistent(tmp_path):
+    path = str(tmp_path / "model.json")
+    frame = usage_frame(12)
+    dashboard, pipeline = CostModel(path), CostModel(path)
+
+    # Each process appends rows and catches up at different times
+    dashboard.catch_up(frame.iloc[:4])
+    pipeline.catch_up(frame.iloc[:9])
+    # The dashboard starts from the pipeline's saved sums, then adds row 10
+    assert dashboard.catch_up(frame.iloc[:10]) == 1
+    assert dashboard.rows == 10
+    pipeline.catch_up(frame)
+    dashboard.catch_up(frame)
+
+    reference = CostModel(str(tmp_path / "reference.json"))
+    reference.catch_up(frame)
+    for model in (dashboard, pipeline, CostModel(path)):
+        assert model.rows == 12
+        assert_same_stats(model, reference)
+
+
+def test_truncated_log_starts_over(tmp_path):
+    model = CostModel(str(tmp_path / "model.json"))
+    model.catch_up(usage_frame(10))
+    model.catch_up(usage_frame(3))
+    assert model.rows == 3
+    assert model.stats[ALL_MODELS]["n"] == 3
+
+
+def _catch_up_in_process(path, rows):
+    CostModel(path).catch_up(usage_frame(rows))
+
+
+def test_processes_catching_up_together_count_each_row_once(tmp_path):
+    import multiprocessing
+
+    path = str(tmp_path / "model.json")
+    workers = [multiprocessing.Process(target=_catch_up_in_process, args=(path, 25)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    reference = CostModel(str(tmp_path / "reference.json"))
+    reference.catch_up(usage_frame(25))
+    saved = CostModel(path)
+    assert saved.rows == 25
+    assert_same_stats(saved, reference)
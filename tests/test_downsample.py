@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from downsample import downsample, lttb, minmax
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(1)
+    x = np.cumsum(rng.uniform(0.5, 1.5, 10_000)) + 1_700_000_000
+    y = rng.normal(50, 5, len(x))
+    y[1234] = 250.0  # one-sample spike
+    y[8765] = -100.0
+    return x, y
+
+
+def test_lttb_keeps_endpoints_and_order(series):
+    x, y = series
+    picks = lttb(x, y, 500)
+    assert len(picks) == 500
+    assert picks[0] == 0 and picks[-1] == len(x) - 1
+    assert np.all(np.diff(picks) > 0)
+
+
+def test_lttb_keeps_isolated_spikes(series):
+    x, y = series
+    picks = lttb(x, y, 500)
+    assert 1234 in picks and 8765 in picks
+
+
+def test_minmax_keeps_every_bucket_extreme(series):
+    x, y = series
+    buckets = 200
+    picks = minmax(x, y, buckets)
+    assert np.all(np.diff(picks) > 0)
+    assert len(picks) <= 2 * buckets + 2
+    assert picks[0] == 0 and picks[-1] == len(x) - 1
+    assert y[picks].max() == y.max() and y[picks].min() == y.min()
+    edges = np.linspace(x[0], x[-1], buckets + 1)
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        inside = (x >= lo) & (x < hi)
+        if inside.any():
+            kept = y[picks][(x[picks] >= lo) & (x[picks] < hi)]
+            assert kept.max() == y[inside].max() and kept.min() == y[inside].min()
+
+
+def test_short_series_are_returned_untouched():
+    x = np.arange(10.0)
+    y = x ** 2
+    for method in ("lttb", "minmax"):
+        out_x, out_y = downsample(x, y, 800, method)
+        np.testing.assert_array_equal(out_x, x)
+        np.testing.assert_array_equal(out_y, y)
+
+
+def test_nan_samples_are_dropped_and_width_respected(series):
+    x, y = series
+    y = y.copy()
+    y[::7] = np.nan
+    out_x, out_y = downsample(x, y, 300)
+    assert len(out_x) == 300
+    assert not np.isnan(out_y).any()
+    out_x, out_y = downsample(None, y, 300, "minmax")
+    assert not np.isnan(out_y).any()
+    assert len(out_x) <= 2 * 300 + 2
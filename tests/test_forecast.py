@@ -0,0 +1,124 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from forecast import Forecast, ForecastPolicy, MetricForecaster, ResourceForecaster
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+        return self.now
+
+
+def test_holt_level_trend_and_variance_updates():
+    clock = FakeClock()
+    forecaster = MetricForecaster(alpha=0.5, beta=0.5, variance_alpha=0.1)
+    forecaster.update(10.0, clock())
+    assert not forecaster.ready
+    assert forecaster.forecast(5.0) == Forecast(10.0, 10.0, 10.0)
+
+    forecaster.update(20.0, clock.advance(1.0))
+    # Predicted 10, residual 10: level halfway, trend half the level change
+    assert (forecaster.level, forecaster.trend, forecaster.variance, forecaster.step) == (15.0, 2.5, 10.0, 1.0)
+
+    forecaster.update(30.0, clock.advance(2.0))
+    # Predicted 15 + 2.5 * 2 = 20, residual 10
+    assert forecaster.level == 25.0
+    assert forecaster.trend == pytest.approx(0.5 * (25.0 - 15.0) / 2.0 + 0.5 * 2.5)
+    assert forecaster.variance == pytest.approx(0.9 * 10.0 + 0.1 * 100.0)
+    assert forecaster.step == pytest.approx(1.1)
+
+    forecast = forecaster.forecast(2.2)
+    spread = math.sqrt(19.0 * (1 + 2.2 / 1.1))
+    assert forecast.mean == pytest.approx(25.0 + 3.75 * 2.2)
+    assert forecast.lower == pytest.approx(forecast.mean - spread)
+    assert forecast.upper == pytest.approx(forecast.mean + spread)
+
+
+def test_missing_and_out_of_order_samples_are_ignored():
+    clock = FakeClock()
+    forecaster = MetricForecaster()
+    forecaster.update(None, clock())
+    forecaster.update(float("nan"), clock())
+    assert forecaster.level is None
+
+    forecaster.update(40.0, clock())
+    forecaster.update(90.0, clock())
+    forecaster.update(90.0, clock() - 1.0)
+    assert (forecaster.level, forecaster.trend, forecaster.ready) == (40.0, 0.0, False)
+
+
+def test_steady_ramp_learns_its_slope_and_clips_at_100():
+    clock = FakeClock()
+    forecaster = MetricForecaster()
+    for i in range(200):
+        forecaster.update(0.25 * i, clock.advance(1.0))
+    assert forecaster.trend == pytest.approx(0.25, rel=1e-3)
+    assert forecaster.forecast(10.0).mean == pytest.approx(0.25 * 199 + 2.5, rel=1e-3)
+    assert forecaster.forecast(1000.0) == Forecast(100.0, 100.0, 100.0)
+
+
+class StubForecaster:
+    """Upper bound of the forecast per metric, set by the test."""
+
+    def __init__(self):
+        self.upper = {}
+
+    def forecast(self, name, horizon, z=1.0):
+        if name not in self.upper:
+            return None
+        return Forecast(self.upper[name], self.upper[name], self.upper[name])
+
+
+def test_policy_holds_until_the_projection_clears_the_hysteresis_band():
+    forecaster = StubForecaster()
+    policy = ForecastPolicy(forecaster, hysteresis=5.0)
+    thresholds = {"cpu": 70.0}
+    resources = {"cpu": 40.0}
+
+    def admit(upper, needs=0.0, reserved=0.0, idle=False):
+        forecaster.upper["cpu"] = upper
+        return policy.admit({"cpu": needs}, resources, {"cpu": reserved}, thresholds, idle)
+
+    assert admit(60.0, needs=10.0)
+    assert not admit(60.0, needs=10.0, reserved=5.0)
+    # Holding: within 5 points of the threshold is not enough to resume
+    assert not admit(52.0, needs=10.0, reserved=5.0)
+    assert not admit(68.0)
+    assert admit(64.0)
+    # Admitting again, so the full threshold applies
+    assert admit(69.0)
+
+
+def test_policy_ignores_reservations_when_idle_and_checks_the_current_reading():
+    forecaster = StubForecaster()
+    policy = ForecastPolicy(forecaster)
+    forecaster.upper["cpu"] = 50.0
+    assert policy.admit({"cpu": 40.0}, {"cpu": 30.0}, {"cpu": 30.0}, {"cpu": 70.0}, idle=True)
+    # A reading already over the threshold defers whatever the forecast says
+    assert not policy.admit({}, {"cpu": 75.0}, {}, {"cpu": 70.0}, idle=True)
+    # Without a forecast the current reading is the projection
+    assert not policy.admit({}, {"memory": 85.0}, {}, {"memory": 80.0}, idle=True)
+
+
+def test_policy_defers_a_rising_metric_before_it_crosses():
+    clock = FakeClock()
+    forecaster = ResourceForecaster(alpha=0.5, beta=0.5, variance_alpha=0.1)
+    policy = ForecastPolicy(forecaster, horizon=10.0, z=0.0)
+    thresholds = {"cpu": 70.0}
+    decisions = []
+    for cpu in (30.0, 35.0, 40.0, 45.0, 50.0):
+        snapshot = SimpleNamespace(cpu=cpu, memory=10.0, extra={}, timestamp=clock.advance(1.0))
+        forecaster.on_snapshot(snapshot)
+        decisions.append(policy.admit({}, {"cpu": cpu}, {}, thresholds, idle=False))
+    # 5 points a second: 50% now projects to about 100% in 10 seconds
+    assert decisions[0] and not decisions[-1]
+    assert forecaster.forecast("memory", 10.0).mean == 10.0
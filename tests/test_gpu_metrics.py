@@ -0,0 +1,24 @@
+from gpu_metrics import FakeNVML, GPUCollector, gpu_summary
+
+
+def test_collects_every_fake_device():
+    collector = GPUCollector(backend=FakeNVML([
+        {"utilization": 10, "memory_used": 4 * 1024 ** 3},
+        {"utilization": 90, "memory_used": 8 * 1024 ** 3},
+    ]))
+    gpus = collector.collect()
+    assert [gpu.index for gpu in gpus] == [0, 1]
+    assert gpu_summary(gpus) == {"gpu": 90, "gpu_memory": 50.0}
+
+
+def test_failing_device_is_skipped_and_recovers():
+    collector = GPUCollector(backend=FakeNVML([
+        {"utilization": [50, RuntimeError("GPU is lost"), 60]},
+        {"utilization": 20},
+    ]))
+    assert [gpu.utilization for gpu in collector.collect()] == [50, 20]
+    assert [gpu.index for gpu in collector.collect()] == [1]
+    assert collector.failing == {0}
+    assert [gpu.utilization for gpu in collector.collect()] == [60, 20]
+    assert collector.failing == set()
+
@@ -0,0 +1,42 @@
+import pytest
+
+from instrumentation import Registry
+
+
+def test_render_counter_gauge_and_histogram_with_labels():
+    registry = Registry()
+    registry.counter("jobs_total", "Jobs run.", {"kind": "batch"}).inc(3)
+    registry.counter("jobs_total", "Jobs run.", {"kind": "stream"}).inc()
+    registry.gauge("queue_depth", "Waiting jobs.", {"queue": 'say "hi"\n'}).set(2.5)
+    registry.gauge("workers", fn=lambda: 7)
+    latency = registry.histogram("latency_seconds", "Job latency.", {"kind": "batch"}, buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP jobs_total Jobs run.",
+        "# TYPE jobs_total counter",
+        'jobs_total{kind="batch"} 3',
+        'jobs_total{kind="stream"} 1',
+        "# HELP latency_seconds Job latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{kind="batch",le="0.1"} 2',
+        'latency_seconds_bucket{kind="batch",le="1.0"} 3',
+        'latency_seconds_bucket{kind="batch",le="+Inf"} 4',
+        'latency_seconds_sum{kind="batch"} 3.65',
+        'latency_seconds_count{kind="batch"} 4',
+        "# HELP queue_depth Waiting jobs.",
+        "# TYPE queue_depth gauge",
+        'queue_depth{queue="say \\"hi\\"\\n"} 2.5',
+        "# TYPE workers gauge",
+        "workers 7",
+    ]
+
+
+def test_same_name_and_labels_return_the_same_metric():
+    registry = Registry()
+    first = registry.counter("hits_total", labels={"a": "1", "b": "2"})
+    assert registry.counter("hits_total", labels={"b": "2", "a": "1"}) is first
+    assert registry.counter("hits_total", labels={"a": "2"}) is not first
+    with pytest.raises(ValueError):
+        registry.gauge("hits_total")
@@ -0,0 +1,63 @@
+from collections import namedtuple
+
+from io_metrics import IOCollector, counter_delta
+
+Disk = namedtuple("Disk", ["read_bytes", "write_bytes", "read_count", "write_count", "read_time", "write_time",
+                           "busy_time"])
+Nic = namedtuple("Nic", ["bytes_recv", "bytes_sent", "packets_recv", "packets_sent", "errin", "errout", "dropin",
+                         "dropout"])
+
+
+def test_counter_delta_increase_and_wraps():
+    assert counter_delta(100, 250) == 150
+    assert counter_delta(2 ** 32 - 10, 5, bits=32) == 15
+    assert counter_delta(2 ** 64 - 10, 5) == 15
+
+
+def test_counter_delta_treats_other_drops_as_resets():
+    # A reset 64-bit counter that had passed 2**31 is not a 32-bit wrap
+    assert counter_delta(3 * 2 ** 30, 1000) is None
+    assert counter_delta(2 ** 31, 0, bits=32) is None
+    assert counter_delta(500, 10, bits=32) is None
+
+
+class FakeCounters:
+    def __init__(self):
+        self.disks = {}
+        self.nics = {}
+        self.now = 0.0
+
+    def collector(self):
+        return IOCollector(disk_counters=lambda: dict(self.disks), net_counters=lambda: dict(self.nics),
+                           nic_speeds=lambda: {"eth0": 1000}, whole_disks=lambda: None, clock=lambda: self.now)
+
+
+def disk(read_bytes, busy_time=0):
+    return Disk(read_bytes, 0, read_bytes // 4096, 0, 0, 0, busy_time)
+
+
+def test_collector_rates_and_reset_device():
+    fake = FakeCounters()
+    collector = fake.collector()
+    fake.disks = {"sda": disk(3 * 2 ** 30, busy_time=1000)}
+    fake.nics = {"eth0": Nic(0, 0, 0, 0, 0, 0, 0, 0)}
+    assert collector.collect().interval is None
+
+    fake.now = 2.0
+    fake.disks = {"sda": disk(3 * 2 ** 30 + 8 * 4096, busy_time=1500)}
+    fake.nics = {"eth0": Nic(25_000_000, 1000, 10, 1, 0, 0, 0, 0)}
+    rates = collector.collect()
+    (sda,) = rates.disks
+    assert sda.read_bytes == 4 * 4096 and sda.read_iops == 4
+    assert sda.busy_percent == 25.0
+    (eth0,) = rates.nics
+    assert eth0.recv_bytes == 12_500_000
+    assert eth0.percent == 10.0
+
+    # The device was re-created: no bogus ~1 GB/s spike, just no rates for a tick
+    fake.now = 3.0
+    fake.disks = {"sda": disk(4096)}
+    assert collector.collect().disks == ()
+    fake.now = 4.0
+    fake.disks = {"sda": disk(3 * 4096)}
+    assert collector.collect().disks[0].read_bytes == 2 * 4096
@@ -0,0 +1,118 @@
+import csv
+import os
+
+import llm_log_cache
+from llm_log_cache import LLM_LOG_FIELDS, LLMUsageLog, ensure_usage_log
+
+HEADER = ",".join(LLM_LOG_FIELDS) + "\n"
+
+
+def row(i, model="gpt-4"):
+    return f"2024-01-01 00:00:{i % 60:02d},{100 + i},{60 + i},0.{i:04d},40,{model}\n"
+
+
+def write(path, text, mode="a"):
+    with open(path, mode) as file:
+        file.write(text)
+
+
+def test_partial_last_line_waits_for_the_next_load(tmp_path):
+    path = str(tmp_path / "usage.csv")
+    write(path, HEADER + row(0) + row(1)[:12], mode="w")
+    log = LLMUsageLog(path)
+    assert len(log.load()) == 1
+
+    write(path, row(1)[12:])
+    frame = log.load()
+    assert list(frame["Total Tokens"]) == [100, 101]
+    assert list(frame["Model"]) == ["gpt-4", "gpt-4"]
+
+
+def test_appended_rows_are_parsed_incrementally(tmp_path):
+    path = str(tmp_path / "usage.csv")
+    write(path, HEADER + row(0), mode="w")
+    log = LLMUsageLog(path)
+    first = log.load()
+    parsed = llm_log_cache._rows_parsed.value
+
+    # Enough appends to grow the column buffers a few times
+    for i in range(1, 50):
+        write(path, row(i))
+        frame = log.load()
+        assert len(frame) == i + 1
+    assert llm_log_cache._rows_parsed.value - parsed == 49
+    assert list(frame["Prompt Tokens"]) == [60 + i for i in range(50)]
+    assert frame["Cost"].iloc[-1] == 0.0049
+    # Earlier frames are not changed by later loads
+    assert len(first) == 1 and first["Total Tokens"].iloc[0] == 100
+
+
+def test_non_numeric_values_become_nan_and_widen_the_column(tmp_path):
+    path = str(tmp_path / "usage.csv")
+    write(path, HEADER + row(0), mode="w")
+    log = LLMUsageLog(path)
+    assert log.load()["Total Tokens"].dtype.kind == "i"
+
+    write(path, "2024-01-01 00:00:01,oops,1,0.1,1,gpt-4\n")
+    frame = log.load()
+    assert frame["Total Tokens"].iloc[0] == 100
+    assert frame["Total Tokens"].isna().iloc[1]
+    assert len(log.valid_rows()) == 1
+
+
+def test_truncated_or_replaced_file_is_read_again(tmp_path):
+    path = str(tmp_path / "usage.csv")
+    write(path, HEADER + row(0) + row(1) + row(2), mode="w")
+    log = LLMUsageLog(path)
+    assert len(log.load()) == 3
+
+    write(path, HEADER + row(7), mode="w")
+    assert list(log.load()["Total Tokens"]) == [107]
+
+    replacement = str(tmp_path / "usage.new")
+    write(replacement, HEADER + row(8) + row(9), mode="w")
+    os.replace(replacement, path)
+    assert list(log.load()["Total Tokens"]) == [108, 109]
+
+
+def test_same_size_rewrite_is_read_again(tmp_path):
+    path = str(tmp_path / "usage.csv")
+    write(path, HEADER + row(1), mode="w")
+    log = LLMUsageLog(path)
+    log.load()
+
+    stat = os.stat(path)
+    write(path, HEADER + row(2), mode="r+")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert list(log.load()["Total Tokens"]) == [102]
+
+
+def test_unchanged_file_returns_the_same_frame(tmp_path):
+    path = str(tmp_path / "usage.csv")
+    write(path, HEADER + row(0), mode="w")
+    log = LLMUsageLog(path)
+    frame = log.load()
+    assert log.load() is frame
+
+    write(path, row(1))
+    assert log.load() is not frame
+
+
+def test_missing_file_loads_empty(tmp_path):
+    assert LLMUsageLog(str(tmp_path / "absent.csv")).load().empty
+
+
+def test_ensure_usage_log_upgrades_old_header_once(tmp_path):
+    path = str(tmp_path / "usage.csv")
+    write(path, "Timestamp,Total Tokens,Prompt Tokens,Cost\n2024-01-01 00:00:00,10,6,0.01\n", mode="w")
+    ensure_usage_log(path)
+    with open(path, newline="") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == LLM_LOG_FIELDS
+    assert len(rows) == 2
+
+    # Later calls in this process are no-ops, even if the file changed
+    write(path, "Timestamp,Total Tokens\n", mode="w")
+    ensure_usage_log(path)
+    with open(path) as file:
+        assert file.read() == "Timestamp,Total Tokens\n"
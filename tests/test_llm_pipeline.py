@@ -0,0 +1,123 @@
+import asyncio
+import csv
+import multiprocessing
+import time
+
+import pytest
+
+from fake_llm_server import start_fake_server
+from llm_pipeline import LLMPipeline
+from log_writer import BackgroundLogWriter, file_lock
+
+
+@pytest.fixture
+def fake_server():
+    server, url = start_fake_server(latency=0.2)
+    yield server, url
+    server.shutdown()
+
+
+def test_cancelling_the_first_caller_leaves_coalesced_callers_served(fake_server):
+    server, url = fake_server
+
+    async def scenario():
+        async with LLMPipeline(base_url=url, api_key="fake", log_file=None) as pipeline:
+            first = asyncio.ensure_future(pipeline.complete("same prompt"))
+            await asyncio.sleep(0.05)
+            waiters = [asyncio.ensure_future(pipeline.complete("same prompt")) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            first.cancel()
+            results = await asyncio.gather(*waiters)
+            assert first.cancelled()
+            return pipeline, results
+
+    pipeline, results = asyncio.run(scenario())
+    assert all("response" in result and result["cached"] for result in results)
+    assert server.requests == 1
+    assert pipeline.stats["coalesced"] == 3
+    assert pipeline.stats["errors"] == 0
+
+
+def test_cancelled_shared_request_is_sent_again(fake_server):
+    server, url = fake_server
+
+    async def scenario():
+        async with LLMPipeline(base_url=url, api_key="fake", log_file=None) as pipeline:
+            first = asyncio.ensure_future(pipeline.complete("same prompt"))
+            await asyncio.sleep(0.05)
+            waiter = asyncio.ensure_future(pipeline.complete("same prompt"))
+            await asyncio.sleep(0.01)
+            pipeline._in_flight[("gpt-3.5-turbo", "same prompt")].cancel()
+            return await asyncio.gather(first, waiter)
+
+    results = asyncio.run(scenario())
+    assert all("response" in result for result in results)
+    # One re-issued request, shared by both callers
+    assert server.requests == 2
+
+
+def test_result_is_cached_even_if_every_caller_left(fake_server):
+    server, url = fake_server
+
+    async def scenario():
+        async with LLMPipeline(base_url=url, api_key="fake", log_file=None) as pipeline:
+            first = asyncio.ensure_future(pipeline.complete("same prompt"))
+            await asyncio.sleep(0.05)
+            first.cancel()
+            await asyncio.sleep(0.3)
+            return await pipeline.complete("same prompt")
+
+    result = asyncio.run(scenario())
+    assert result["cached"]
+    assert server.requests == 1
+
+
+def _append_rows(path, writer_id, rows):
+    for i in range(rows):
+        with file_lock(path), open(path, "a", newline="") as file:
+            csv.writer(file).writerow([f"other-{writer_id}", i, "x" * 200])
+
+
+def test_shared_writer_rows_never_interleave_with_other_processes(tmp_path):
+    path = str(tmp_path / "usage.csv")
+    writer = BackgroundLogWriter(path, ["who", "i", "payload"], batch_size=64, flush_interval=0.01, shared=True)
+    others = [multiprocessing.Process(target=_append_rows, args=(path, n, 200)) for n in range(2)]
+    for process in others:
+        process.start()
+    for i in range(2000):
+        writer.write(["writer", i, "y" * 200])
+    writer.close()
+    for process in others:
+        process.join()
+
+    with open(path, newline="") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ["who", "i", "payload"]
+    assert len(rows) == 1 + 2000 + 2 * 200
+    assert all(len(row) == 3 and len(row[2]) == 200 for row in rows[1:])
+
+
+def test_blocked_log_write_does_not_stall_the_event_loop(fake_server, tmp_path):
+    server, url = fake_server
+
+    async def scenario():
+        async with LLMPipeline(base_url=url, api_key="fake", log_file=str(tmp_path / "usage.csv")) as pipeline:
+            # As if the writer queue were full: write() blocks for a while
+            pipeline._writer.write = lambda record: time.sleep(0.5)
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            counting = asyncio.ensure_future(ticker())
+            result = await pipeline.complete("prompt")
+            counting.cancel()
+            return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+    assert "response" in result
+    # Latency 0.2s plus the 0.5s write: other coroutines kept running throughout
+    assert ticks > 40
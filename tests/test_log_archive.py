@@ -0,0 +1,91 @@
+import os
+import shutil
+import warnings
+
+import numpy as np
+import pytest
+
+from log_archive import FLOAT, INT, STRING, ArchiveReader, ArchiveWriter, archive_csv, export_csv, write_sample_logs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_archive(path, rows, block_rows=100):
+    timestamps = 1_700_000_000 + np.arange(rows) * 1.5
+    with ArchiveWriter(str(path), ["cpu", "count", "model"], [FLOAT, INT, STRING], block_rows=block_rows) as writer:
+        for i, timestamp in enumerate(timestamps):
+            writer.append(timestamp, [round(i % 97 / 3, 2), i, f"m{i % 3}"])
+    return timestamps
+
+
+def test_round_trip_and_filters(tmp_path):
+    path = tmp_path / "log.rma"
+    timestamps = write_archive(path, 1000)
+    reader = ArchiveReader(str(path))
+    data = reader.query()
+    assert np.array_equal(data["timestamp"], timestamps)
+    assert data["count"].tolist() == list(range(1000))
+    assert list(data["model"][:4]) == ["m0", "m1", "m2", "m0"]
+    assert len(reader.blocks()) == 10
+
+    window = reader.query(start=timestamps[150], end=timestamps[249], columns=["count"])
+    assert window["count"].tolist() == list(range(150, 250))
+    busy = reader.query(where={"cpu": (30, None)})
+    assert len(busy["cpu"]) and (busy["cpu"] >= 30).all()
+
+
+@pytest.mark.parametrize("log", ["resource_logs.csv", "llm_usage_logs.csv"])
+def test_repository_logs_round_trip_byte_exact(tmp_path, log):
+    path = str(tmp_path / log)
+    shutil.copy(os.path.join(ROOT, log), path)
+    archive, rows = archive_csv(path)
+    assert rows > 0
+    export_csv(archive, path + ".out")
+    with open(path) as original, open(path + ".out") as exported:
+        assert original.read() == exported.read()
+
+
+def test_sample_logs_round_trip(tmp_path):
+    for path in write_sample_logs(str(tmp_path), 500):
+        archive, rows = archive_csv(path)
+        assert rows == 500
+        with open(path) as f:
+            assert len(ArchiveReader(archive).query()["timestamp"]) == len(f.readlines()) - 1
+
+
+def test_short_rows_make_the_column_float(tmp_path):
+    path = tmp_path / "short.csv"
+    path.write_text("Time,A,B\n1700000000,1,2\n1700000001,3\n1700000002,5,6\n")
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        archive, rows = archive_csv(str(path))
+    reader = ArchiveReader(archive)
+    assert reader.kinds == [INT, FLOAT]
+    values = reader.query()["B"]
+    assert values[0] == 2 and np.isnan(values[1]) and values[2] == 6
+
+
+@pytest.mark.parametrize("cut", [3, 20, 60])
+def test_torn_last_block_is_ignored_and_overwritten(tmp_path, cut):
+    path = tmp_path / "torn.rma"
+    write_archive(path, 300)
+    complete = ArchiveReader(str(path)).blocks()
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - cut)
+
+    reader = ArchiveReader(str(path))
+    assert len(reader.blocks()) == len(complete) - 1
+    assert len(reader.query()["timestamp"]) == 200
+
+    with ArchiveWriter(str(path), ["cpu", "count", "model"], [FLOAT, INT, STRING]) as writer:
+        writer.append(1_800_000_000, [1.0, 7, "late"])
+    data = ArchiveReader(str(path)).query()
+    assert len(data["timestamp"]) == 201
+    assert data["model"][-1] == "late"
+
+
+def test_append_requires_same_columns(tmp_path):
+    path = tmp_path / "log.rma"
+    write_archive(path, 10)
+    with pytest.raises(ValueError):
+        ArchiveWriter(str(path), ["cpu"], [FLOAT])
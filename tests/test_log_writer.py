@@ -0,0 +1,88 @@
+import csv
+import gc
+import time
+import weakref
+
+import pytest
+
+import instrumentation
+from log_writer import BackgroundLogWriter
+
+
+def read_rows(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_records_are_written_in_order(tmp_path):
+    path = str(tmp_path / "log.csv")
+    writer = BackgroundLogWriter(path, ["i", "value"], batch_size=7, flush_interval=0.01)
+    for i in range(100):
+        writer.write((i, i * 2))
+    writer.close()
+    assert read_rows(path) == [["i", "value"]] + [[str(i), str(i * 2)] for i in range(100)]
+    assert writer.written == 100
+
+
+def test_rotation_keeps_backup_count(tmp_path):
+    path = str(tmp_path / "log.csv")
+    writer = BackgroundLogWriter(path, ["i"], batch_size=1, flush_interval=0.01, max_bytes=50, backup_count=2)
+    for i in range(200):
+        writer.write((i,))
+    writer.close()
+    backups = [p for p in tmp_path.iterdir() if p.name.startswith("log.csv.")]
+    assert len(backups) == 2
+    assert read_rows(path)[0] == ["i"]
+
+
+def test_write_fails_fast_once_the_thread_died(tmp_path):
+    def broken_echo(record):
+        raise OSError("disk gone")
+
+    writer = BackgroundLogWriter(str(tmp_path / "log.csv"), ["i"], max_queue=1, flush_interval=0.01,
+                                 when_full="block", echo=broken_echo)
+    writer.write((0,))
+    writer._thread.join(timeout=5)
+    assert isinstance(writer.error, OSError)
+
+    began = time.monotonic()
+    with pytest.raises(RuntimeError, match="disk gone"):
+        for i in range(5):
+            writer.write((i,))
+    assert time.monotonic() - began < 1
+    writer.close()
+
+
+def test_rotation_never_deletes_side_files(tmp_path):
+    path = str(tmp_path / "log.csv")
+    side_files = [path + suffix for suffix in (".lock", ".costmodel.json", ".costmodel.json.tmp", ".notes")]
+    for side in side_files:
+        with open(side, "w") as f:
+            f.write("keep me")
+    writer = BackgroundLogWriter(path, ["i"], batch_size=1, flush_interval=0.01, max_bytes=50, backup_count=1,
+                                 shared=True)
+    for i in range(200):
+        writer.write((i,))
+    writer.close()
+    assert all((tmp_path / side).exists() for side in side_files)
+    assert len(writer._backups()) == 1
+
+
+def test_queue_depth_gauge_covers_every_writer_and_keeps_none_alive(tmp_path):
+    first = BackgroundLogWriter(str(tmp_path / "depth.csv"), ["i"], flush_interval=0.01)
+    (tmp_path / "other").mkdir()
+    second = BackgroundLogWriter(str(tmp_path / "other" / "depth.csv"), ["i"], flush_interval=0.01)
+    depth = instrumentation.gauge("monitor_log_queue_depth", labels={"log": "depth.csv"})
+    # Stand-ins for records the writer threads have not picked up yet
+    first._queue.qsize = lambda: 3
+    second._queue.qsize = lambda: 4
+    assert depth.fn() == 7
+
+    queue = weakref.ref(first._queue)
+    first.close()
+    assert depth.fn() == 4
+    del first
+    gc.collect()
+    assert queue() is None
+    second.close()
+    assert depth.fn() == 0
@@ -0,0 +1,27 @@
+import pytest
+
+import process_executor
+from process_executor import ProcessTaskExecutor
+
+
+@pytest.fixture
+def four_cores(monkeypatch):
+    monkeypatch.setattr(process_executor, "_available_cores", lambda: [0, 1, 2, 3])
+
+
+def test_workers_are_clamped_to_whole_core_groups(four_cores):
+    executor = ProcessTaskExecutor(max_workers=8, cores_per_worker=3)
+    assert executor.max_workers == 1
+    assert executor.slots == [(0, 1, 2)]
+    executor.shutdown()
+
+    executor = ProcessTaskExecutor(max_workers=3)
+    assert executor.slots == [(0,), (1,), (2,)]
+    executor.shutdown()
+
+
+def test_more_cores_per_worker_than_available_is_rejected(four_cores):
+    with pytest.raises(ValueError):
+        ProcessTaskExecutor(cores_per_worker=5)
+    with pytest.raises(ValueError):
+        ProcessTaskExecutor(max_workers=0)
@@ -0,0 +1,174 @@
+import contextlib
+from types import SimpleNamespace
+
+import psutil
+import pytest
+
+import process_metrics
+from process_metrics import ProcessCollector, format_top
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeHost:
+    """
+    Stand-in for the psutil process table: pid -> {"name", "cpu", "rss"},
+    plus "denied" and a "generation" bumped when a PID is reused.
+    """
+
+    def __init__(self):
+        self.table = {}
+        self.created = 0
+
+    def add(self, pid, name, cpu=0.0, rss=1024 ** 2, denied=False):
+        generation = self.table[pid]["generation"] + 1 if pid in self.table else 0
+        self.table[pid] = {"name": name, "cpu": cpu, "rss": rss, "denied": denied, "generation": generation}
+
+    def pids(self):
+        return sorted(self.table)
+
+    def Process(self, pid):
+        self.created += 1
+        return FakeProcess(self, pid)
+
+
+class FakeProcess:
+    def __init__(self, host, pid):
+        self.host, self.pid = host, pid
+        self.generation = self._entry()["generation"]
+
+    def _entry(self):
+        # Like psutil, reads go to whatever process has the PID now
+        entry = self.host.table.get(self.pid)
+        if entry is None:
+            raise psutil.NoSuchProcess(self.pid)
+        if entry["denied"]:
+            raise psutil.AccessDenied(self.pid)
+        return entry
+
+    def oneshot(self):
+        return contextlib.nullcontext()
+
+    def name(self):
+        return self._entry()["name"]
+
+    def cpu_times(self):
+        return SimpleNamespace(user=self._entry()["cpu"], system=0.0)
+
+    def memory_info(self):
+        return SimpleNamespace(rss=self._entry()["rss"])
+
+    def is_running(self):
+        entry = self.host.table.get(self.pid)
+        return entry is not None and entry["generation"] == self.generation
+
+
+@pytest.fixture
+def host(monkeypatch):
+    host, clock = FakeHost(), FakeClock()
+    monkeypatch.setattr(process_metrics.psutil, "pids", host.pids)
+    monkeypatch.setattr(process_metrics.psutil, "Process", host.Process)
+    monkeypatch.setattr(process_metrics, "time", SimpleNamespace(monotonic=clock, perf_counter=clock))
+    return host, clock
+
+
+def names(rows):
+    return [stats.name for stats in rows]
+
+
+def test_top_n_by_cpu_and_rss_from_cpu_time_deltas(host):
+    host, clock = host
+    for pid, (name, rss) in enumerate([("a", 10), ("b", 40), ("c", 30), ("d", 20)], start=1):
+        host.add(pid, name, rss=rss * 1024 ** 2)
+    collector = ProcessCollector(top_n=2, min_interval=0, scan_ticks=1)
+    first = collector.refresh()
+    # First sighting: no CPU time delta yet
+    assert first.count == 4 and all(stats.cpu == 0.0 for stats in first.by_cpu)
+    assert names(first.by_rss) == ["b", "c"]
+
+    clock.now += 2.0
+    for pid, seconds in ((1, 1.0), (2, 0.2), (3, 1.6), (4, 0.0)):
+        host.table[pid]["cpu"] += seconds
+    table = collector.refresh()
+    assert [(stats.name, stats.cpu) for stats in table.by_cpu] == [("c", 80.0), ("a", 50.0)]
+    assert format_top(table, limit=1) == "c (3) 80.0% CPU 30 MB"
+
+
+def test_collect_returns_the_cached_table_within_min_interval(host):
+    host, clock = host
+    host.add(1, "a")
+    collector = ProcessCollector(min_interval=2.0)
+    table = collector.collect()
+    reads = collector.last_reads
+
+    host.add(2, "b")
+    clock.now += 1.0
+    assert collector.collect() is table
+    assert collector.last_reads == reads
+
+    clock.now += 1.0
+    assert collector.collect().count == 2
+    # psutil.Process objects are kept by PID across refreshes
+    assert host.created == 2
+
+
+def test_idle_processes_are_read_in_a_rotating_slice(host):
+    host, clock = host
+    for pid in range(1, 11):
+        host.add(pid, f"p{pid}")
+    collector = ProcessCollector(top_n=1, min_interval=0, scan_ticks=5)
+    collector.refresh()
+    reads = []
+    for _ in range(5):
+        clock.now += 1.0
+        collector.refresh()
+        reads.append(collector.last_reads)
+    # One top row read every time, plus a fifth of the idle rest
+    assert all(count <= 1 + 2 for count in reads)
+    assert sum(reads) < 5 * 10
+
+    # A process that turns busy shows up within scan_ticks refreshes
+    host.table[7]["cpu"] += 1.0
+    tops = []
+    for _ in range(5):
+        clock.now += 1.0
+        tops.append(names(collector.refresh().by_cpu))
+    assert ["p7"] in tops
+
+
+def test_exited_and_denied_processes_are_skipped(host, monkeypatch):
+    host, clock = host
+    host.add(1, "a", rss=3 * 1024 ** 2)
+    host.add(2, "secret", denied=True)
+    host.add(3, "gone")
+    collector = ProcessCollector(min_interval=0, scan_ticks=1)
+
+    # pid 3 exits between listing and reading
+    listed = host.pids()
+    del host.table[3]
+    monkeypatch.setattr(process_metrics.psutil, "pids", lambda: listed)
+    table = collector.refresh()
+    assert names(table.by_rss) == ["a"]
+
+    monkeypatch.setattr(process_metrics.psutil, "pids", host.pids)
+    del host.table[1]
+    clock.now += 1.0
+    assert collector.refresh().count == 0
+
+
+def test_reused_pid_is_read_as_a_new_process(host):
+    host, clock = host
+    host.add(1, "old", cpu=50.0)
+    collector = ProcessCollector(min_interval=0, scan_ticks=1)
+    collector.refresh()
+
+    host.add(1, "new", cpu=0.5)
+    clock.now += 1.0
+    table = collector.refresh()
+    assert [(stats.name, stats.cpu) for stats in table.by_cpu] == [("new", 0.0)]
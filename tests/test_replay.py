@@ -0,0 +1,54 @@
+import time
+
+import numpy as np
+
+from replay import SimTask, Simulation, Trace, format_report, synthetic_trace, task_mix
+
+
+def flat_trace(hours=1.0, **levels):
+    timestamps = 1_700_000_000 + np.arange(int(hours * 3600), dtype=np.float64)
+    return Trace(timestamps, {name: np.full(len(timestamps), value) for name, value in levels.items()})
+
+
+def test_light_background_drains_every_task():
+    tasks = task_mix(8, kinds=("cpu",), arrival_interval=30)
+    report = Simulation(flat_trace(cpu=10, memory=20), tasks, policy="threshold").run()
+    assert report["completed"] == 8
+    assert report["undrained"] == 0
+    assert report["background_violation_seconds"] == 0
+
+
+def test_saturated_background_stops_at_the_default_cap():
+    tasks = [SimTask(f"t{i}", "cpu", 0.0, 60.0, {"cpu": 25}, {"cpu": 25}) for i in range(3)]
+    simulation = Simulation(flat_trace(cpu=10, memory=90), tasks, policy="threshold")
+    began = time.perf_counter()
+    report = simulation.run()
+    assert time.perf_counter() - began < 30
+    assert report["completed"] == 0
+    assert report["undrained"] == 3
+    assert report["simulated_seconds"] >= simulation.max_seconds
+    assert "3 task(s) undrained" in format_report([report])
+
+
+def test_declared_needs_choice():
+    tasks = task_mix(4, kinds=("cpu",), arrival_interval=0)
+    by_allocator = Simulation(flat_trace(cpu=10, memory=20), tasks, policy="threshold")
+    by_task = Simulation(flat_trace(cpu=10, memory=20), tasks, policy="threshold", needs="task")
+    assert by_allocator.declared_needs == {"cpu": 30, "memory": 10}
+    assert by_task.declared_needs is None
+
+
+def test_ray_admits_without_reserving():
+    tasks = task_mix(8, kinds=("cpu",), arrival_interval=0)
+    simulation = Simulation(flat_trace(cpu=10, memory=20), tasks, "resource_allocator_ray", "threshold")
+    report = simulation.run()
+    assert report["completed"] == 8
+    # All four slots fill on the first step since no needs are declared
+    assert simulation.waits[:4] == [0.0] * 4
+
+
+def test_synthetic_day_is_deterministic():
+    first = synthetic_trace(hours=1, seed=3)
+    second = synthetic_trace(hours=1, seed=3)
+    assert np.array_equal(first.columns["cpu"], second.columns["cpu"])
+    assert first.at(first.duration + 10) == first.at(10)
@@ -0,0 +1,146 @@
+import importlib
+import sys
+import types
+
+import pytest
+
+
+class FakeRef:
+    def __init__(self, value=None, error=None):
+        self.value, self.error = value, error
+
+
+class FakeRemote:
+    def __init__(self, ray, fn, options=None):
+        self.ray, self.fn, self.opts = ray, fn, options or {}
+
+    def options(self, **options):
+        return FakeRemote(self.ray, self.fn, {**self.opts, **options})
+
+    def remote(self, *args, **kwargs):
+        # Runs eagerly; the result is only handed out through wait()/get()
+        try:
+            ref = FakeRef(value=self.fn(*args, **kwargs))
+        except Exception as e:
+            ref = FakeRef(error=e)
+        self.ray.outstanding.append(ref)
+        self.ray.peak = max(self.ray.peak, len(self.ray.outstanding))
+        self.ray.submitted.append((args[0], self.opts))
+        return ref
+
+
+def fake_ray_module():
+    ray = types.ModuleType("ray")
+    ray.outstanding, ray.submitted, ray.peak, ray.waits = [], [], 0, 0
+    ray.is_initialized = lambda: True
+    ray.init = lambda *args, **kwargs: None
+    ray.nodes = lambda: []
+    ray.remote = lambda fn: FakeRemote(ray, fn)
+
+    def wait(refs, num_returns=1, timeout=None):
+        ray.waits += 1
+        # Completes the oldest submission first
+        done = [ref for ref in ray.outstanding if ref in refs][:num_returns]
+        for ref in done:
+            ray.outstanding.remove(ref)
+        return done, [ref for ref in refs if ref not in done]
+
+    def get(ref):
+        if ref.error is not None:
+            raise ref.error
+        return ref.value
+
+    ray.wait, ray.get = wait, get
+    util = types.ModuleType("ray.util")
+    strategies = types.ModuleType("ray.util.scheduling_strategies")
+    strategies.NodeAffinitySchedulingStrategy = lambda node_id, soft: ("node", node_id, soft)
+    ray.util, util.scheduling_strategies = util, strategies
+    return {"ray": ray, "ray.util": util, "ray.util.scheduling_strategies": strategies}
+
+
+class FakeSampler:
+    def __init__(self):
+        self.running, self.stops = False, 0
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+        self.stops += 1
+
+    def latest(self):
+        return types.SimpleNamespace(extra={})
+
+
+class ScriptedPolicy:
+    """Defers the first `defer` admission checks, then admits."""
+
+    def __init__(self, defer=0):
+        self.defer, self.checks = defer, []
+
+    def admit(self, needs, resources, reserved, thresholds, idle=False):
+        self.checks.append(idle)
+        if self.defer:
+            self.defer -= 1
+            return False
+        return True
+
+
+@pytest.fixture
+def allocator(monkeypatch):
+    modules = fake_ray_module()
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    monkeypatch.delitem(sys.modules, "resource_allocator_ray", raising=False)
+    allocator = importlib.import_module("resource_allocator_ray")
+    sampler = FakeSampler()
+    monkeypatch.setattr(allocator, "get_sampler", lambda: sampler)
+    monkeypatch.setattr(allocator, "start_monitoring", lambda: None)
+    monkeypatch.setattr(allocator, "check_resources", lambda: {"cpu": 10.0, "memory": 20.0})
+    yield allocator, modules["ray"], sampler
+    sys.modules.pop("resource_allocator_ray", None)
+
+
+def work(task_id, duration=0):
+    if task_id == "Task-3":
+        raise ValueError("boom")
+    return f"{task_id} done"
+
+
+def test_completions_are_drained_one_at_a_time(allocator):
+    allocator, ray, sampler = allocator
+    results, failed = allocator.resource_allocator_ray(
+        num_tasks=6, max_in_flight=2, task=ray.remote(work), retry_delay=0, policy=ScriptedPolicy())
+
+    assert results == {f"Task-{i}": f"Task-{i} done" for i in (1, 2, 4, 5, 6)}
+    assert list(failed) == ["Task-3"]
+    assert ray.peak == 2
+    assert ray.waits == 6
+    assert [task_id for task_id, _ in ray.submitted] == [f"Task-{i}" for i in range(1, 7)]
+    assert ray.submitted[0][1] == {"num_cpus": 1}
+    assert sampler.stops == 1
+
+
+def test_deferred_tasks_stay_queued_and_are_retried(allocator, capsys):
+    allocator, ray, sampler = allocator
+    policy = ScriptedPolicy(defer=3)
+    results, failed = allocator.resource_allocator_ray(
+        num_tasks=2, max_in_flight=2, task=ray.remote(work), retry_delay=0, policy=policy)
+
+    assert set(results) == {"Task-1", "Task-2"} and not failed
+    assert capsys.readouterr().out.count("Resources too high, deferring 2 task(s)") == 3
+    # Nothing was running while deferring, so the policy was told the pool is idle
+    assert policy.checks[:3] == [True, True, True]
+
+
+def test_sampler_is_stopped_when_the_loop_raises(allocator, monkeypatch):
+    allocator, ray, sampler = allocator
+
+    def broken_wait(refs, num_returns=1, timeout=None):
+        raise RuntimeError("cluster went away")
+
+    monkeypatch.setattr(ray, "wait", broken_wait)
+    with pytest.raises(RuntimeError):
+        allocator.resource_allocator_ray(num_tasks=2, task=ray.remote(work), retry_delay=0, policy=ScriptedPolicy())
+    assert sampler.stops == 1 and not sampler.running
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from ring_buffer import RingBuffer
+
+
+def test_view_is_oldest_first_across_wraparound():
+    buffer = RingBuffer(4, columns=2)
+    for i in range(10):
+        buffer.append([i, 10 * i])
+        expected = list(range(max(0, i - 3), i + 1))
+        assert len(buffer) == len(expected)
+        assert list(buffer.column(0)) == expected
+        assert list(buffer.column(1)) == [10 * v for v in expected]
+    assert list(buffer.latest()) == [9, 90]
+
+
+def test_view_is_read_only_and_contiguous_per_column():
+    buffer = RingBuffer(3)
+    for i in range(5):
+        buffer.append([i])
+    view = buffer.view()
+    assert view[0].flags["C_CONTIGUOUS"]
+    with pytest.raises(ValueError):
+        view[0, 0] = 1.0
+
+
+def test_empty_and_cleared_buffers():
+    buffer = RingBuffer(2)
+    assert buffer.view().shape == (1, 0)
+    with pytest.raises(IndexError):
+        buffer.latest()
+    buffer.append([1.0])
+    buffer.clear()
+    assert len(buffer) == 0
+    with pytest.raises(ValueError):
+        RingBuffer(0)
+
+
+def test_holds_the_last_capacity_samples():
+    rng = np.random.default_rng(0)
+    buffer = RingBuffer(50)
+    values = rng.random(500)
+    for value in values:
+        buffer.append([value])
+    np.testing.assert_array_equal(buffer.column(0), values[-50:])
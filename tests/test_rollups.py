@@ -0,0 +1,60 @@
+from rollups import RollupPipeline
+
+T0 = 1_700_000_040.0  # on a whole minute
+
+
+def minute_records(directory):
+    pipeline = RollupPipeline(directory, metrics=["cpu"])
+    return pipeline.tiers[0].store.query(columns=["cpu_count", "cpu_mean", "cpu_max"])
+
+
+def test_flush_then_more_data_writes_each_minute_once(tmp_path):
+    pipeline = RollupPipeline(str(tmp_path), metrics=["cpu"])
+    for i in range(30):
+        pipeline.add(T0 + i, {"cpu": 10.0})
+    pipeline.flush()
+    for i in range(30, 60):
+        pipeline.add(T0 + i, {"cpu": 30.0})
+    pipeline.add(T0 + 60, {"cpu": 50.0})
+
+    records = pipeline.tiers[0].store.query(columns=["cpu_count", "cpu_mean", "cpu_max"])
+    assert list(records["timestamp"]) == [T0]
+    assert list(records["cpu_count"]) == [60]
+    assert records["cpu_mean"][0] == 20.0
+    assert records["cpu_max"][0] == 30.0
+
+
+def test_reopened_pipeline_resumes_open_buckets(tmp_path):
+    pipeline = RollupPipeline(str(tmp_path), metrics=["cpu"])
+    for i in range(30):
+        pipeline.add(T0 + i, {"cpu": 10.0})
+    pipeline.flush()
+    # Nothing closed yet, so nothing written to the minute tier
+    assert len(minute_records(str(tmp_path))["timestamp"]) == 0
+
+    reopened = RollupPipeline(str(tmp_path), metrics=["cpu"])
+    for i in range(30, 60):
+        reopened.add(T0 + i, {"cpu": 30.0})
+    reopened.add(T0 + 60, {"cpu": 50.0})
+    reopened.flush()
+
+    records = minute_records(str(tmp_path))
+    assert list(records["timestamp"]) == [T0]
+    assert list(records["cpu_count"]) == [60]
+    assert records["cpu_mean"][0] == 20.0
+
+
+def test_hour_tier_counts_every_sample_once(tmp_path):
+    pipeline = RollupPipeline(str(tmp_path), metrics=["cpu"])
+    hour = T0 - T0 % 3600
+    for i in range(0, 3600, 10):
+        pipeline.add(hour + i, {"cpu": float(i % 100)})
+        if i % 600 == 0:
+            pipeline.flush()
+    pipeline.add(hour + 3600, {"cpu": 0.0})
+    pipeline.add(hour + 3660, {"cpu": 0.0})
+
+    records = pipeline.tiers[1].store.query(columns=["cpu_count", "cpu_min", "cpu_max"])
+    assert list(records["timestamp"]) == [hour]
+    assert list(records["cpu_count"]) == [360]
+    assert (records["cpu_min"][0], records["cpu_max"][0]) == (0.0, 90.0)
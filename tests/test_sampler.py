@@ -0,0 +1,43 @@
+import threading
+import time
+
+from sampler import ResourceSampler
+
+
+def test_failing_collector_does_not_stop_sampling():
+    sampler = ResourceSampler(interval=0.01)
+    sampler.add_collector("broken", lambda: 1 / 0)
+    sampler.add_collector("ok", lambda: 42)
+    sampler.start()
+    try:
+        time.sleep(0.1)
+        assert sampler.running
+        snapshot = sampler.latest()
+    finally:
+        sampler.stop()
+    assert snapshot.extra["broken"] is None
+    assert snapshot.extra["ok"] == 42
+
+
+def test_slow_collector_does_not_block_cached_reads():
+    sampler = ResourceSampler(interval=60.0)
+    sampler.sample()
+    release = threading.Event()
+    sampler.add_collector("slow", release.wait)
+    worker = threading.Thread(target=sampler.sample)
+    worker.start()
+    try:
+        began = time.monotonic()
+        snapshot = sampler.latest()
+        assert time.monotonic() - began < 0.5
+        assert "slow" not in snapshot.extra
+    finally:
+        release.set()
+        worker.join()
+
+
+def test_latest_reuses_a_fresh_snapshot():
+    sampler = ResourceSampler(interval=60.0)
+    first = sampler.latest()
+    assert sampler.latest() is first
+    assert sampler.latest(max_age=0) is not first
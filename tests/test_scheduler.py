@@ -0,0 +1,115 @@
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+from scheduler import AdmissionScheduler, ThresholdPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ManualExecutor:
+    """Hands out futures the test resolves itself."""
+
+    def __init__(self):
+        self.started = {}
+
+    def submit(self, target, task_id, *args):
+        future = self.started[task_id] = Future()
+        return future
+
+    def finish(self, task_id):
+        self.started[task_id].set_result(None)
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class FakeSampler:
+    interval = 1.0
+
+    def latest(self):
+        return SimpleNamespace(extra={})
+
+
+@pytest.fixture
+def setup():
+    clock = FakeClock()
+    usage = {"cpu": 10.0, "memory": 20.0}
+    executor = ManualExecutor()
+    scheduler = AdmissionScheduler(thresholds={"cpu": 70, "memory": 80}, max_workers=3, ramp_seconds=10.0,
+                                   sampler=FakeSampler(), check_resources=lambda: dict(usage),
+                                   executor=executor, clock=clock)
+    return scheduler, clock, usage, executor
+
+
+def submit(scheduler, *task_ids, cpu=30):
+    for task_id in task_ids:
+        scheduler.submit(task_id, lambda task_id: None, needs={"cpu": cpu, "memory": 5})
+
+
+def test_reservations_hold_back_tasks_until_they_ramp_up(setup):
+    scheduler, clock, usage, executor = setup
+    submit(scheduler, "a", "b", "c")
+    scheduler.admit_pending()
+    # 10% used + 30% reserved for "a" + 30% for "b" is 70%, under the threshold; "c" would exceed it
+    assert list(executor.started) == ["a", "b"]
+
+    clock.now = 5.0
+    scheduler.admit_pending()
+    # Both reservations have halved to 15%: 10% used + 30% reserved + 30% for "c" is 70% again
+    assert list(executor.started) == ["a", "b", "c"]
+
+
+def test_reservation_decays_and_is_credited_with_measured_rise(setup):
+    scheduler, clock, usage, executor = setup
+    submit(scheduler, "a")
+    scheduler.admit_pending()
+    clock.now = 5.0
+    assert scheduler.reserved(usage)["cpu"] == pytest.approx(15.0)
+    # 20% of the 30% declared has shown up: only 10% is still reserved
+    assert scheduler.reserved(dict(usage, cpu=30.0))["cpu"] == pytest.approx(10.0)
+    clock.now = 10.0
+    assert scheduler.reserved(usage)["cpu"] == 0.0
+
+
+def test_completion_frees_a_worker_slot(setup):
+    scheduler, clock, usage, executor = setup
+    scheduler.max_workers = 1
+    submit(scheduler, "a", "b", cpu=0)
+    scheduler.admit_pending()
+    assert list(executor.started) == ["a"]
+    executor.finish("a")
+    scheduler.admit_pending()
+    assert list(executor.started) == ["a", "b"]
+    assert [task_id for task_id, _ in scheduler.completed] == ["a"]
+
+
+def test_threshold_policy_lets_an_idle_host_run_an_oversized_task():
+    policy = ThresholdPolicy()
+    thresholds = {"cpu": 70}
+    assert policy.admit({"cpu": 90}, {"cpu": 10}, {}, thresholds, idle=True)
+    assert not policy.admit({"cpu": 90}, {"cpu": 10}, {}, thresholds, idle=False)
+    assert not policy.admit({"cpu": 0}, {"cpu": 75}, {}, thresholds, idle=True)
+
+
+def test_full_pool_is_not_counted_as_a_resource_deferral(setup, capsys):
+    from scheduler import _decisions
+
+    scheduler, clock, usage, executor = setup
+    scheduler.max_workers = 1
+    scheduler.thresholds = {"cpu": 1000, "memory": 1000}
+    submit(scheduler, "a", "b")
+    deferred = _decisions["deferred"].value
+    scheduler.admit_pending()
+    scheduler.admit_pending()
+    assert list(executor.started) == ["a"]
+    assert _decisions["deferred"].value == deferred
+    assert "Resources too high" not in capsys.readouterr().out
+    assert not scheduler._waiting
@@ -0,0 +1,64 @@
+import csv
+
+import numpy as np
+
+from timeseries_store import Segment, TimeSeriesStore, import_log, record_dtype
+
+
+def write_structured_log(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "cpu", "memory", "disk"])
+        writer.writerows(rows)
+
+
+def test_reimporting_a_log_adds_nothing(tmp_path):
+    log = str(tmp_path / "resource_log.csv")
+    write_structured_log(log, [[1000.0 + i, 10 + i, 50, 70] for i in range(5)])
+    store = TimeSeriesStore(str(tmp_path / "store"))
+
+    assert import_log(store, log) == 5
+    assert import_log(store, log) == 0
+    assert len(store.query()["timestamp"]) == 5
+
+
+def test_import_appends_only_rows_after_the_last_one(tmp_path):
+    log = str(tmp_path / "resource_log.csv")
+    store = TimeSeriesStore(str(tmp_path / "store"))
+    write_structured_log(log, [[1000.0 + i, 10 + i, 50, 70] for i in range(3)])
+    import_log(store, log)
+    write_structured_log(log, [[1000.0 + i, 10 + i, 50, 70] for i in range(6)])
+
+    assert import_log(store, log) == 3
+    result = store.query()
+    assert list(result["timestamp"]) == [1000.0 + i for i in range(6)]
+    assert list(result["cpu"]) == [10 + i for i in range(6)]
+    assert np.isnan(result["gpu"]).all()
+
+
+def test_query_range_and_reopen(tmp_path):
+    directory = str(tmp_path / "store")
+    store = TimeSeriesStore(directory, columns=["cpu"], segment_records=4)
+    store.append_many(np.arange(10, dtype=np.float64), {"cpu": np.arange(10, dtype=np.float32)})
+
+    reopened = TimeSeriesStore(directory)
+    assert len(reopened.segments) == 3
+    assert reopened.last_timestamp == 9.0
+    assert list(reopened.query(3, 6)["cpu"]) == [3, 4, 5, 6]
+
+
+def test_duplicate_timestamps_across_an_index_boundary(tmp_path):
+    segment = Segment(str(tmp_path / "0.seg"), columns=["cpu"])
+    stride = segment.stride
+    timestamps = np.arange(3 * stride, dtype=np.float64)
+    # Rows stride-5 .. stride+4 share one timestamp, which is also the indexed first row of block 1
+    timestamps[stride - 5:stride + 5] = stride
+    timestamps[stride + 5:] += 10
+    records = np.zeros(len(timestamps), dtype=record_dtype(["cpu"]))
+    records["timestamp"] = timestamps
+    records["cpu"] = np.arange(len(timestamps))
+    segment.append(records)
+
+    result = segment.query(stride, stride, ["cpu"])
+    assert list(result["cpu"]) == list(range(stride - 5, stride + 5))
+    assert segment.estimate(stride, stride) >= 10
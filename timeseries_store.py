@@ -0,0 +1,367 @@
+import argparse
+import csv
+import os
+import re
+import struct
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Canonical metric columns for resource history; missing readings are NaN
+RESOURCE_COLUMNS = ["cpu", "memory", "disk", "gpu", "gpu_memory"]
+
+MAGIC = b"RMTS"
+VERSION = 1
+# Records start on a page boundary so mmapped reads line up with the OS pages
+HEADER_SIZE = 4096
+PAGE_SIZE = 4096
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx"
+
+
+def record_dtype(columns):
+    return np.dtype([("timestamp", "<f8")] + [(name, "<f4") for name in columns])
+
+
+class Segment:
+    """
+    One append-only segment file: a fixed header followed by fixed-width
+    records (float64 timestamp + one float32 per column).
+
+    A sidecar `.idx` file holds the first timestamp of every `stride`
+    records (about one page of data), so a range query binary-searches the
+    index and only maps the pages that can contain matching rows.
+    """
+
+    def __init__(self, path, columns=None):
+        self.path = path
+        self.index_path = path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+        if os.path.exists(path):
+            self.columns = self._read_header()
+        else:
+            if columns is None:
+                raise FileNotFoundError(path)
+            self.columns = list(columns)
+            self._write_header()
+        self.dtype = record_dtype(self.columns)
+        self.stride = max(1, PAGE_SIZE // self.dtype.itemsize)
+        # A torn trailing record from a crash is ignored
+        self._count = (os.path.getsize(self.path) - HEADER_SIZE) // self.dtype.itemsize
+        self._last = None
+        self._index = self._load_index()
+
+    def _write_header(self):
+        names = "\0".join(self.columns).encode()
+        header = MAGIC + struct.pack("<HH", VERSION, len(self.columns)) + names
+        if len(header) > HEADER_SIZE:
+            raise ValueError("too many columns for segment header")
+        with open(self.path, "wb") as f:
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+
+    def _read_header(self):
+        with open(self.path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        if header[:4] != MAGIC:
+            raise ValueError(f"{self.path} is not a resource time-series segment")
+        version, ncols = struct.unpack("<HH", header[4:8])
+        if version != VERSION:
+            raise ValueError(f"unsupported segment version {version}")
+        names = header[8:].rstrip(b"\0").decode().split("\0")
+        return names[:ncols]
+
+    def __len__(self):
+        return self._count
+
+    def _records(self):
+        if self._count == 0:
+            return np.zeros(0, dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode="r", offset=HEADER_SIZE, shape=(self._count,))
+
+    def _load_index(self):
+        expected = -(-len(self) // self.stride)
+        if os.path.exists(self.index_path):
+            index = np.fromfile(self.index_path, dtype="<f8")
+            if len(index) == expected:
+                return index
+        # Missing or stale sidecar: rebuild it with one strided pass
+        index = np.array(self._records()["timestamp"][::self.stride], dtype="<f8")
+        index.tofile(self.index_path)
+        return index
+
+    @property
+    def first_timestamp(self):
+        return self._index[0] if len(self._index) else None
+
+    @property
+    def last_timestamp(self):
+        if self._last is None and self._count:
+            self._last = float(self._records()["timestamp"][self._count - 1])
+        return self._last
+
+    def append(self, records):
+        """Append a structured array of records (timestamps already sorted)."""
+        if not len(records):
+            return
+        count = len(self)
+        with open(self.path, "r+b") as f:
+            # Overwrite any torn tail left behind by a crash
+            f.seek(HEADER_SIZE + count * self.dtype.itemsize)
+            f.write(records.tobytes())
+            f.truncate()
+        self._count += len(records)
+        self._last = float(records["timestamp"][-1])
+
+        # Index every record that starts a new stride
+        positions = np.arange(count, count + len(records))
+        new_entries = records["timestamp"][positions % self.stride == 0]
+        if len(new_entries):
+            with open(self.index_path, "ab") as f:
+                f.write(new_entries.astype("<f8").tobytes())
+            self._index = np.concatenate([self._index, new_entries])
+
+    def _blocks(self, start, end):
+        # The block before the first index entry >= start: with duplicate timestamps, rows
+        # equal to start can sit at the end of that block
+        first_block = max(0, np.searchsorted(self._index, start, side="left") - 1)
+        last_block = np.searchsorted(self._index, end, side="right")
+        return first_block, last_block
+
+    def estimate(self, start, end):
+        """Upper bound on the records in [start, end], from the index alone."""
+        first_block, last_block = self._blocks(start, end)
+        return max(0, min(last_block * self.stride, len(self)) - first_block * self.stride)
+
+    def query(self, start, end, columns):
+        """Return the records with start <= timestamp <= end as plain arrays."""
+        if not len(self._index):
+            return None
+        first_block, last_block = self._blocks(start, end)
+        records = self._records()[first_block * self.stride:last_block * self.stride]
+        timestamps = records["timestamp"]
+        lo = np.searchsorted(timestamps, start, side="left")
+        hi = np.searchsorted(timestamps, end, side="right")
+        window = records[lo:hi]
+        result = {"timestamp": np.array(window["timestamp"])}
+        for name in columns:
+            result[name] = np.array(window[name])
+        return result
+
+
+class TimeSeriesStore:
+    """
+    Directory of segments for one fixed set of columns.
+
+    Segments are named after their first timestamp and roll over every
+    `segment_records` records, so old history can be dropped file by file.
+    """
+
+    def __init__(self, directory, columns=RESOURCE_COLUMNS, segment_records=1 << 20):
+        self.directory = directory
+        self.segment_records = segment_records
+        os.makedirs(directory, exist_ok=True)
+        self.segments = [Segment(os.path.join(directory, name)) for name in self._segment_names()]
+        if self.segments:
+            self.columns = self.segments[-1].columns
+        else:
+            self.columns = list(columns)
+        self.dtype = record_dtype(self.columns)
+
+    def _segment_names(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+
+    @property
+    def last_timestamp(self):
+        return self.segments[-1].last_timestamp if self.segments else None
+
+    def _new_segment(self, timestamp):
+        name = f"{int(timestamp * 1000):015d}{SEGMENT_SUFFIX}"
+        segment = Segment(os.path.join(self.directory, name), self.columns)
+        self.segments.append(segment)
+        return segment
+
+    def append(self, timestamp, values):
+        """Append one sample; `values` is a sequence or a dict keyed by column."""
+        if isinstance(values, dict):
+            values = [values.get(name, np.nan) for name in self.columns]
+        records = np.zeros(1, dtype=self.dtype)
+        records["timestamp"] = timestamp
+        for name, value in zip(self.columns, values):
+            records[name] = np.nan if value is None else value
+        self.append_records(records)
+
+    def append_many(self, timestamps, columns):
+        """Append a batch given an array of timestamps and a dict of column arrays."""
+        records = np.zeros(len(timestamps), dtype=self.dtype)
+        records["timestamp"] = timestamps
+        for name in self.columns:
+            records[name] = columns.get(name, np.nan)
+        self.append_records(records)
+
+    def append_records(self, records):
+        if not len(records):
+            return
+        timestamps = records["timestamp"]
+        last = self.last_timestamp
+        if np.any(np.diff(timestamps) < 0) or (last is not None and timestamps[0] < last):
+            raise ValueError("timestamps must be appended in non-decreasing order")
+
+        while len(records):
+            segment = self.segments[-1] if self.segments else None
+            if segment is None or len(segment) >= self.segment_records:
+                segment = self._new_segment(records["timestamp"][0])
+            room = self.segment_records - len(segment)
+            segment.append(records[:room])
+            records = records[room:]
+
+    def expire(self, before):
+        """Delete whole segments whose samples are all older than `before`."""
+        removed = 0
+        while len(self.segments) > 1 and self.segments[1].first_timestamp <= before:
+            segment = self.segments.pop(0)
+            os.remove(segment.path)
+            if os.path.exists(segment.index_path):
+                os.remove(segment.index_path)
+            removed += 1
+        return removed
+
+    def _segments_in_range(self, start, end):
+        for i, segment in enumerate(self.segments):
+            next_first = self.segments[i + 1].first_timestamp if i + 1 < len(self.segments) else None
+            if segment.first_timestamp is None or segment.first_timestamp > end:
+                continue
+            if next_first is not None and next_first < start:
+                continue
+            yield segment
+
+    def estimate(self, start=None, end=None):
+        """Cheap upper bound on the number of samples a query would return."""
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        return sum(segment.estimate(start, end) for segment in self._segments_in_range(start, end))
+
+    def query(self, start=None, end=None, columns=None):
+        """
+        Return {"timestamp": array, column: array, ...} for samples in
+        [start, end]; only segments and index blocks in range are touched.
+        """
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        columns = self.columns if columns is None else list(columns)
+        parts = []
+        for segment in self._segments_in_range(start, end):
+            part = segment.query(start, end, columns)
+            if part is not None:
+                parts.append(part)
+
+        keys = ["timestamp"] + columns
+        if not parts:
+            return {key: np.zeros(0, dtype=np.float64 if key == "timestamp" else np.float32) for key in keys}
+        return {key: np.concatenate([part[key] for part in parts]) for key in keys}
+
+
+# --- Importers for the existing text logs ---
+
+def _parse_time(value):
+    return datetime.strptime(value.strip(), "%Y-%m-%d %H:%M:%S").timestamp()
+
+
+def _percent(value):
+    try:
+        return float(value.strip().rstrip("%"))
+    except ValueError:
+        return np.nan
+
+
+def read_resource_csv(path):
+    """
+    Read resource_logs.csv (Time, CPU, Memory, GPU, GPU memory) or the
+    structured resource_log.csv written by basic_monitor.
+    """
+    timestamps = []
+    rows = {name: [] for name in RESOURCE_COLUMNS}
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        structured = header[0] == "timestamp"
+        if structured:
+            mapping = {name: header.index(name) for name in RESOURCE_COLUMNS if name in header}
+        else:
+            mapping = {"cpu": 1, "memory": 2, "gpu": 3, "gpu_memory": 4}
+        for row in reader:
+            if not row:
+                continue
+            timestamps.append(float(row[0]) if structured else _parse_time(row[0]))
+            for name in RESOURCE_COLUMNS:
+                rows[name].append(_percent(row[mapping[name]]) if name in mapping else np.nan)
+    return np.array(timestamps, dtype=np.float64), {name: np.array(values, dtype=np.float32) for name, values in rows.items()}
+
+
+_LEGACY_LINE = re.compile(r"CPU:\s*([\d.]+)%,\s*Memory:\s*([\d.]+)%,\s*Disk:\s*([\d.]+)%")
+_LEGACY_FIELD = re.compile(r"(CPU|Memory|Disk) Usage:\s*([\d.]+)%")
+
+
+def read_legacy_text_log(path, start=None, interval=1.0):
+    """
+    Read resource_log.txt in either of its historical layouts. The file has no
+    timestamps, so samples are spaced `interval` seconds apart starting at
+    `start` (default: counted back from the file's modification time).
+    """
+    samples = []
+    current = {}
+    with open(path) as f:
+        for line in f:
+            match = _LEGACY_LINE.search(line)
+            if match:
+                samples.append(tuple(float(v) for v in match.groups()))
+                continue
+            match = _LEGACY_FIELD.search(line)
+            if match:
+                current[match.group(1)] = float(match.group(2))
+            elif line.strip() == "---" and current:
+                samples.append((current.get("CPU", np.nan), current.get("Memory", np.nan), current.get("Disk", np.nan)))
+                current = {}
+    if current:
+        samples.append((current.get("CPU", np.nan), current.get("Memory", np.nan), current.get("Disk", np.nan)))
+
+    if start is None:
+        start = os.path.getmtime(path) - interval * max(len(samples) - 1, 0)
+    timestamps = start + interval * np.arange(len(samples), dtype=np.float64)
+    values = np.array(samples, dtype=np.float32).reshape(-1, 3)
+    columns = {name: np.full(len(samples), np.nan, dtype=np.float32) for name in RESOURCE_COLUMNS}
+    columns["cpu"], columns["memory"], columns["disk"] = values[:, 0], values[:, 1], values[:, 2]
+    return timestamps, columns
+
+
+def import_log(store, path, start=None, interval=1.0):
+    """Import a CSV or legacy text log into `store`. Returns rows imported."""
+    if path.endswith(".csv"):
+        timestamps, columns = read_resource_csv(path)
+    else:
+        timestamps, columns = read_legacy_text_log(path, start=start, interval=interval)
+
+    # Sort, and skip anything the store already holds (its last timestamp included)
+    order = np.argsort(timestamps, kind="stable")
+    timestamps = timestamps[order]
+    columns = {name: values[order] for name, values in columns.items()}
+    last = store.last_timestamp
+    if last is not None:
+        keep = timestamps > last
+        timestamps = timestamps[keep]
+        columns = {name: values[keep] for name, values in columns.items()}
+    store.append_many(timestamps, columns)
+    return len(timestamps)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import resource logs into the binary time-series store.")
+    parser.add_argument("logs", nargs="+", help="resource_logs.csv, resource_log.csv or resource_log.txt files")
+    parser.add_argument("--store", default="resource_history", help="store directory")
+    parser.add_argument("--interval", type=float, default=1.0, help="sample spacing for untimestamped text logs")
+    args = parser.parse_args()
+
+    store = TimeSeriesStore(args.store)
+    for log in args.logs:
+        began = time.perf_counter()
+        count = import_log(store, log, interval=args.interval)
+        print(f"Imported {count} samples from {log} in {time.perf_counter() - began:.2f}s")
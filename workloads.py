@@ -0,0 +1,123 @@
+import functools
+import os
+import tempfile
+import time
+
+# Synthetic, TensorFlow-free tasks with a known shape. Every task has the
+# allocator task signature `target(task_id, *args)` and returns a dict
+# describing the work it did. No randomness is involved: the same arguments
+# always produce the same load profile.
+
+_SLICE = 0.05  # seconds per duty-cycle slice
+
+
+def _duty(shape, progress, period_fraction, peak):
+    # Fraction of a slice spent busy, for `progress` in [0, 1)
+    if shape == "constant":
+        return peak
+    if shape == "ramp":
+        return peak * progress
+    if shape == "square":
+        return peak if (progress / period_fraction) % 1.0 < 0.5 else 0.0
+    raise ValueError(f"Unknown workload shape: {shape}")
+
+
+def cpu_burn(task_id, duration=2.0, shape="constant", peak=1.0, period=1.0):
+    """
+    Keep one core busy for `duration` seconds following `shape`:
+    "constant" (busy `peak` of the time), "ramp" (0 up to `peak`) or
+    "square" (alternating `peak` and idle every `period` / 2 seconds).
+    """
+    began = time.perf_counter()
+    busy_seconds = 0.0
+    iterations = 0
+    checksum = 1
+    while True:
+        elapsed = time.perf_counter() - began
+        if elapsed >= duration:
+            break
+        busy = _SLICE * _duty(shape, elapsed / duration, period / duration, peak)
+        slice_began = time.perf_counter()
+        while time.perf_counter() - slice_began < busy:
+            # A small integer LCG: cheap, deterministic and not optimized away
+            for _ in range(1000):
+                checksum = (checksum * 1103515245 + 12345) & 0x7FFFFFFF
+            iterations += 1000
+        busy_seconds += time.perf_counter() - slice_began
+        idle = _SLICE - (time.perf_counter() - slice_began)
+        if idle > 0:
+            time.sleep(idle)
+    return {"task_id": task_id, "kind": "cpu", "iterations": iterations, "busy_seconds": busy_seconds,
+            "checksum": checksum}
+
+
+def memory_alloc(task_id, megabytes=256, steps=4, hold=1.0):
+    """
+    Allocate `megabytes` of resident memory in `steps` equal increments
+    (touching every page), hold it for `hold` seconds, then release it.
+    """
+    chunk_size = megabytes * 1024 ** 2 // steps
+    step_delay = hold / (2 * steps)
+    chunks = []
+    for i in range(steps):
+        # bytearray(n) pages are not resident until written; writing one byte per page makes it resident
+        chunk = bytearray(chunk_size)
+        chunk[::4096] = bytes([i % 256]) * len(range(0, chunk_size, 4096))
+        chunks.append(chunk)
+        time.sleep(step_delay)
+    time.sleep(hold / 2)
+    allocated = sum(len(chunk) for chunk in chunks)
+    del chunks
+    return {"task_id": task_id, "kind": "memory", "bytes": allocated}
+
+
+def disk_io(task_id, megabytes=64, block_kb=1024, directory=None, fsync=True):
+    """Write `megabytes` of a fixed pattern in `block_kb` blocks, read it back, delete it."""
+    block = bytes(range(256)) * (block_kb * 1024 // 256)
+    blocks = max(1, megabytes * 1024 // block_kb)
+    fd, path = tempfile.mkstemp(prefix=f"workload-{task_id}-", dir=directory)
+    try:
+        began = time.perf_counter()
+        with os.fdopen(fd, "wb") as f:
+            for _ in range(blocks):
+                f.write(block)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        write_seconds = time.perf_counter() - began
+
+        began = time.perf_counter()
+        read = 0
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(len(block))
+                if not data:
+                    break
+                read += len(data)
+        read_seconds = time.perf_counter() - began
+    finally:
+        os.remove(path)
+    return {"task_id": task_id, "kind": "io", "bytes": read, "write_seconds": write_seconds,
+            "read_seconds": read_seconds}
+
+
+WORKLOADS = {"cpu": cpu_burn, "memory": memory_alloc, "io": disk_io}
+
+# Expected host usage in percent, for the scheduler's reservations
+WORKLOAD_NEEDS = {"cpu": {"cpu": 25, "memory": 1}, "memory": {"cpu": 5, "memory": 5}, "io": {"cpu": 10, "memory": 1}}
+
+
+def workload_mix(count, kinds=("cpu", "memory", "io"), **kwargs):
+    """
+    `count` tasks cycling through `kinds`, as (task_id, target, needs) tuples
+    ready for AdmissionScheduler.submit(task_id, target, needs=needs). Extra
+    keyword arguments configure every task of that kind, e.g.
+    workload_mix(6, cpu={"duration": 1}). Targets are picklable, so they also
+    run on a ProcessTaskExecutor.
+    """
+    tasks = []
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        target = functools.partial(WORKLOADS[kind], **kwargs.get(kind, {}))
+        tasks.append((f"{kind}-{i + 1}", target, WORKLOAD_NEEDS[kind]))
+    return tasks